@@ -13,13 +13,7 @@ os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'  # Disable oneDNN messages
 import warnings
 warnings.filterwarnings('ignore')  # Suppress all warnings for clean output
 
-# Import tensorflow after setting environment variables
-# Don't set any TensorFlow logging here since environment variables handle it
-try:
-    import tensorflow as tf
-    # Disable TensorFlow warnings completely
-    tf.get_logger().setLevel('ERROR')
-except ImportError:
-    pass  # TensorFlow not installed
+# TensorFlow itself is imported by the modules that use it (see device_config),
+# so the NumPy backend can be used without loading it
 
 __version__ = "0.1.8"
\ No newline at end of file
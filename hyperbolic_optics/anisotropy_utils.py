@@ -149,7 +149,7 @@ def anisotropy_rotation_all_axes(matrix, theta, phi, beta):
     rotation_y = rotation_y[tf.newaxis, :, tf.newaxis, :, :]
     rotation_z = rotation_z[tf.newaxis, tf.newaxis, :, :, :]
 
-    total_rotation = rotation_z @ rotation_y @ rotation_x
+    total_rotation = tf.cast(rotation_z @ rotation_y @ rotation_x, dtype=tf.complex128)
 
     matrix = matrix[:, tf.newaxis, tf.newaxis, tf.newaxis, :, :]
     total_rotation = total_rotation[tf.newaxis, ...]
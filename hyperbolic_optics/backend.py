@@ -0,0 +1,75 @@
+"""
+Selection of the compute backend that executes payloads.
+
+"tensorflow" runs hyperbolic_optics.structure.Structure. "numpy" runs
+hyperbolic_optics.numpy_backend.NumpyStructure, which never imports TensorFlow.
+The process default is read from the HYPERBOLIC_OPTICS_BACKEND environment
+variable and can be changed with set_backend; create_structure and execute
+also take a backend per call. Backend modules are imported on first use.
+"""
+
+import os
+
+BACKENDS = ("tensorflow", "numpy")
+
+_default_backend = os.environ.get("HYPERBOLIC_OPTICS_BACKEND", "tensorflow")
+
+
+def _check_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Backend {name} not implemented, expected one of {', '.join(BACKENDS)}")
+    return name
+
+
+def get_backend():
+    """Return the name of the process default backend."""
+    return _check_backend(_default_backend)
+
+
+def set_backend(name):
+    """Set the process default backend."""
+    global _default_backend
+    _default_backend = _check_backend(name)
+
+
+def create_structure(backend=None, **options):
+    """
+    Create an unexecuted structure for a backend.
+
+    Args:
+        backend (str, optional): "tensorflow" or "numpy"; the process default
+            when omitted.
+        **options: Keyword arguments for the structure class. The NumPy
+            backend takes none.
+    """
+    backend = get_backend() if backend is None else _check_backend(backend)
+    if backend == "numpy":
+        from hyperbolic_optics.numpy_backend import NumpyStructure
+
+        return NumpyStructure(**options)
+
+    from hyperbolic_optics.structure import Structure
+
+    return Structure(**options)
+
+
+def execute(payload, backend=None, memory_budget=None, **options):
+    """
+    Create a structure for a backend, execute the payload on it and return it.
+
+    Args:
+        payload (dict): The payload.
+        backend (str, optional): "tensorflow" or "numpy"; the process default
+            when omitted.
+        memory_budget (int, optional): Memory budget of Structure.execute, in
+            bytes. The NumPy backend does not chunk, and takes none.
+        **options: Keyword arguments for the structure class.
+    """
+    structure = create_structure(backend, **options)
+    if memory_budget is None:
+        structure.execute(payload)
+    elif (get_backend() if backend is None else backend) == "numpy":
+        raise NotImplementedError("Memory budgets are only supported by the tensorflow backend")
+    else:
+        structure.execute(payload, memory_budget)
+    return structure
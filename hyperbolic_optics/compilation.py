@@ -0,0 +1,105 @@
+"""
+Graph compilation of Structure.execute.
+
+A payload is split into a template, holding everything that changes the shape
+or control flow of the calculation (scenario type, layer sequence, materials),
+and a vector of the numeric fields that only change values (angles, frequency,
+thicknesses, rotations, ambient permittivities). One tf.function is traced per
+template and reused for every payload that shares it, so sweeping thickness or
+rotation does not retrace.
+"""
+
+import copy
+import json
+import numbers
+
+DYNAMIC_SCENARIO_FIELDS = ("incidentAngle", "azimuthal_angle", "frequency")
+DYNAMIC_LAYER_FIELDS = ("thickness", "rotationX", "rotationY", "rotationZ")
+
+# Layers whose real permittivity only enters the calculation as a value
+DYNAMIC_PERMITTIVITY_LAYERS = ("Ambient Incident Layer", "Semi Infinite Isotropic Layer")
+
+PLACEHOLDER = "__dynamic__"
+
+_TRACE_CACHE = {}
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def split_payload(payload):
+    """
+    Separate the numeric fields of a payload from its structure.
+
+    Args:
+        payload (dict): A dictionary containing the scenario data and layers.
+
+    Returns:
+        tuple: (template, paths, values) where template is a copy of the payload
+            with each dynamic field replaced by a placeholder, paths locates those
+            fields and values holds their numbers in the same order.
+    """
+    template = copy.deepcopy(payload)
+    paths = []
+    values = []
+
+    scenario_data = template.get("ScenarioData", {})
+    for field in DYNAMIC_SCENARIO_FIELDS:
+        if _is_number(scenario_data.get(field)):
+            paths.append(("ScenarioData", field))
+            values.append(float(scenario_data[field]))
+            scenario_data[field] = PLACEHOLDER
+
+    for index, layer in enumerate(template.get("Layers", [])):
+        fields = DYNAMIC_LAYER_FIELDS
+        if layer.get("type") in DYNAMIC_PERMITTIVITY_LAYERS:
+            fields = fields + ("permittivity",)
+        for field in fields:
+            if _is_number(layer.get(field)):
+                paths.append(("Layers", index, field))
+                values.append(float(layer[field]))
+                layer[field] = PLACEHOLDER
+
+    return template, tuple(paths), values
+
+
+def fill_payload(template, paths, values):
+    """Return a copy of the template with the placeholders replaced by values."""
+    payload = copy.deepcopy(template)
+    for path, value in zip(paths, values):
+        container = payload
+        for key in path[:-1]:
+            container = container[key]
+        container[path[-1]] = value
+    return payload
+
+
+def template_key(template, *options):
+    """Hashable key identifying one traced function."""
+    return (json.dumps(template, sort_keys=True),) + options
+
+
+def get_compiled_function(key, build):
+    """
+    Return the compiled function stored under key, building it on first use.
+
+    Args:
+        key (tuple): Key returned by template_key.
+        build (callable): Called without arguments to create the tf.function.
+    """
+    if key not in _TRACE_CACHE:
+        _TRACE_CACHE[key] = build()
+    return _TRACE_CACHE[key]
+
+
+def trace_count():
+    """Total number of graph traces performed by the cached functions."""
+    return sum(
+        function.experimental_get_tracing_count() for function in _TRACE_CACHE.values()
+    )
+
+
+def clear_compiled_functions():
+    """Drop every cached compiled function."""
+    _TRACE_CACHE.clear()
@@ -1,5 +1,8 @@
 import tensorflow as tf
 
+# Disable TensorFlow warnings completely
+tf.get_logger().setLevel("ERROR")
+
 # Set the default device to GPU if available, otherwise use CPU
 default_device = (
     "/device:CPU:0" if tf.config.list_physical_devices("GPU") else "/device:CPU:0"
@@ -0,0 +1,238 @@
+"""
+Fused evaluation of the Lorentz oscillator permittivities of materials.
+
+Each dispersive permittivity component of the configured materials follows one
+of two models of the frequency w in cm^-1:
+
+    product:  eps_inf * prod_n (w_Ln^2 - w^2 - i w g_Ln) / (w_Tn^2 - w^2 - i w g_Tn)
+    sum:      eps_inf + sum_n c_n A_n^2 / (w_Tn^2 - w^2 - i w g_Tn)
+
+The product gives a principal axis of a uniaxial crystal; the sum gives a
+component of a monoclinic crystal, c_n being the projection of oscillator n on
+that component. A DispersionModel stacks the components of any number of
+materials and axes and evaluates all of them on a frequency tensor of any shape
+in one pass: one product over the factors of every product component, padded
+to a common number of oscillators, and one contraction of the oscillator
+responses with a matrix of weights for the sum components. Oscillators shared
+by several components, such as the Bu modes of Gallium Oxide, are evaluated
+once, as are repeated frequencies, e.g. those of a flattened Points grid.
+
+    eps_quartz, eps_gallium_oxide = permittivity_tensors([Quartz(), GalliumOxide()], frequency)
+"""
+
+import numpy as np
+import tensorflow as tf
+
+from hyperbolic_optics.material_params import derived_cache
+from hyperbolic_optics.tensor_utils import to_complex128
+
+PRODUCT = "product"
+SUM = "sum"
+
+# Models of the materials evaluated so far, keyed by their dispersion keys
+_MODELS = derived_cache()
+
+
+def _constant(rows, width, padding):
+    """Stack 1-D parameter arrays into a [rows, width] complex128 tensor, padded at the end."""
+    padded = np.full((len(rows), width), padding, dtype=np.complex128)
+    for index, row in enumerate(rows):
+        padded[index, : row.shape[0]] = row
+    return tf.constant(padded, dtype=tf.complex128)
+
+
+class DispersionModel:
+    """
+    Stacked oscillator parameters of a list of permittivity components.
+
+    Each component is a (model, parameters) pair:
+
+    - (PRODUCT, {"high_freq", "omega_tn", "gamma_tn", "omega_ln", "gamma_ln"}),
+      the layout of an axis of a uniaxial material in material_params.json.
+    - (SUM, {"high_freq", "oscillators", "weight"}), where oscillators holds the
+      "amplitude", "omega_tn" and "gamma_tn" of the modes and weight, which may
+      be omitted for 1, their projections on the component. Components given
+      the same oscillators mapping share their evaluation.
+
+    Attributes:
+        size (int): Number of components, the last axis of evaluate.
+    """
+
+    def __init__(self, components):
+        """
+        Stack the parameters of the components into constant tensors.
+
+        The tensors are created eagerly, so compiled graphs capture them as
+        constants, as for material_parameter_tensors.
+
+        Args:
+            components (list): The (model, parameters) pairs, in output order.
+        """
+        self.size = len(components)
+        products = [(index, parameters) for index, (model, parameters) in enumerate(components) if model == PRODUCT]
+        sums = [(index, parameters) for index, (model, parameters) in enumerate(components) if model == SUM]
+        unknown = {model for model, _ in components} - {PRODUCT, SUM}
+        if unknown:
+            raise ValueError(f"Unknown dispersion model(s): {', '.join(sorted(map(str, unknown)))}")
+
+        order = [index for index, _ in products] + [index for index, _ in sums]
+        with tf.init_scope():
+            self._order = None if order == sorted(order) else tf.constant(np.argsort(order), dtype=tf.int32)
+            self._product = self._stack_products([parameters for _, parameters in products]) if products else None
+            self._sum = self._stack_sums([parameters for _, parameters in sums]) if sums else None
+
+    @staticmethod
+    def _stack_products(components):
+        """Product parameters as [components, oscillators] tensors, with a mask of the real factors."""
+        names = ("omega_tn", "gamma_tn", "omega_ln", "gamma_ln")
+        rows = {name: [np.atleast_1d(np.asarray(parameters[name], dtype=np.complex128)) for parameters in components]
+                for name in names}
+        lengths = [row.shape[0] for row in rows["omega_tn"]]
+        width = max(lengths)
+        # Padded factors read 1/1, and are replaced by exactly 1 through the mask
+        stacked = {name: _constant(rows[name], width, 1.0) for name in names}
+        return {
+            "high_freq": tf.constant([complex(np.asarray(parameters["high_freq"])) for parameters in components],
+                                     dtype=tf.complex128),
+            "omega_tn_squared": stacked["omega_tn"] ** 2.0,
+            "gamma_tn": stacked["gamma_tn"],
+            "omega_ln_squared": stacked["omega_ln"] ** 2.0,
+            "gamma_ln": stacked["gamma_ln"],
+            "mask": tf.constant(np.arange(width)[np.newaxis, :] < np.asarray(lengths)[:, np.newaxis]),
+        }
+
+    @staticmethod
+    def _stack_sums(components):
+        """Sum parameters as one axis of distinct oscillators and a [components, oscillators] weight matrix."""
+        offsets = {}
+        oscillators = []
+        for parameters in components:
+            key = id(parameters["oscillators"])
+            if key not in offsets:
+                offsets[key] = sum(item["omega_tn"].shape[0] for item in oscillators)
+                oscillators.append({name: np.atleast_1d(np.asarray(parameters["oscillators"][name], dtype=np.complex128))
+                                    for name in ("amplitude", "omega_tn", "gamma_tn")})
+        total = sum(item["omega_tn"].shape[0] for item in oscillators)
+
+        weights = np.zeros((len(components), total), dtype=np.complex128)
+        for row, parameters in enumerate(components):
+            start = offsets[id(parameters["oscillators"])]
+            count = np.atleast_1d(np.asarray(parameters["oscillators"]["omega_tn"])).shape[0]
+            weight = parameters.get("weight")
+            weights[row, start:start + count] = 1.0 if weight is None else np.asarray(weight, dtype=np.complex128)
+
+        def concatenated(name):
+            return tf.constant(np.concatenate([item[name] for item in oscillators]), dtype=tf.complex128)
+
+        return {
+            "high_freq": tf.constant([complex(np.asarray(parameters["high_freq"])) for parameters in components],
+                                     dtype=tf.complex128),
+            "amplitude_squared": concatenated("amplitude") ** 2.0,
+            "omega_tn_squared": concatenated("omega_tn") ** 2.0,
+            "gamma_tn": concatenated("gamma_tn"),
+            "weights": tf.constant(weights, dtype=tf.complex128),
+        }
+
+    def evaluate(self, frequency):
+        """
+        Evaluate every component at once.
+
+        Args:
+            frequency (float or tf.Tensor): Frequencies in cm^-1, a number or a
+                tensor of any shape.
+
+        Returns:
+            tf.Tensor: complex128 components of shape frequency.shape + [size].
+        """
+        frequency = to_complex128(frequency)
+        if tf.executing_eagerly() and frequency.shape.rank:
+            # Evaluate repeated frequencies once, then scatter them back
+            values, inverse = np.unique(frequency.numpy(), return_inverse=True)
+            if values.size < frequency.shape.num_elements():
+                components = self._evaluate(tf.constant(values, dtype=tf.complex128))
+                components = tf.gather(components, np.reshape(inverse, [-1]))
+                return tf.reshape(components, frequency.shape.as_list() + [self.size])
+        return self._evaluate(frequency)
+
+    def _evaluate(self, frequency):
+        """Evaluate the stacked components on a complex128 frequency tensor."""
+        parts = []
+        if self._product is not None:
+            parameters = self._product
+            # [..., components, oscillators]
+            expanded = frequency[..., tf.newaxis, tf.newaxis]
+            top_line = parameters["omega_ln_squared"] - expanded**2.0 - 1j * expanded * parameters["gamma_ln"]
+            bottom_line = parameters["omega_tn_squared"] - expanded**2.0 - 1j * expanded * parameters["gamma_tn"]
+            factors = tf.where(parameters["mask"], top_line / bottom_line, tf.ones([], dtype=tf.complex128))
+            parts.append(parameters["high_freq"] * tf.reduce_prod(factors, axis=-1))
+        if self._sum is not None:
+            parameters = self._sum
+            # [..., oscillators]
+            expanded = frequency[..., tf.newaxis]
+            response = parameters["amplitude_squared"] / (
+                parameters["omega_tn_squared"] - expanded**2.0 - 1j * expanded * parameters["gamma_tn"]
+            )
+            parts.append(parameters["high_freq"] + tf.linalg.matvec(parameters["weights"], response))
+
+        components = parts[0] if len(parts) == 1 else tf.concat(parts, axis=-1)
+        if self._order is not None:
+            components = tf.gather(components, self._order, axis=-1)
+        return components
+
+
+def dispersion_model(materials):
+    """
+    Return the DispersionModel of the components of several materials, in order,
+    and the number of components of each.
+
+    Models are cached under the dispersion_key of the materials, when they all
+    have one, until the material parameters are invalidated.
+    """
+    keys = tuple(getattr(material, "dispersion_key", None) for material in materials)
+    cacheable = None not in keys
+    entry = _MODELS.get(keys) if cacheable else None
+    if entry is None:
+        with tf.init_scope():
+            components = [material.dispersion_components() for material in materials]
+            entry = (DispersionModel([component for group in components for component in group]),
+                     [len(group) for group in components])
+        if cacheable:
+            _MODELS[keys] = entry
+    return entry
+
+
+def permittivity_components(materials, frequency):
+    """
+    Evaluate the dispersive components of several materials in one fused call.
+
+    Args:
+        materials (list): Materials with dispersion_components, e.g. Quartz and
+            GalliumOxide instances.
+        frequency (float or tf.Tensor): Frequencies in cm^-1, of any shape.
+
+    Returns:
+        list: For each material, a complex128 tensor of shape
+            frequency.shape + [components of the material].
+    """
+    model, sizes = dispersion_model(materials)
+    components = model.evaluate(frequency)
+    if len(sizes) == 1:
+        return [components]
+    return tf.split(components, sizes, axis=-1)
+
+
+def permittivity_tensors(materials, frequency):
+    """
+    Permittivity tensors of several dispersive materials on one frequency tensor.
+
+    Args:
+        materials (list): Materials with dispersion_components.
+        frequency (float or tf.Tensor): Frequencies in cm^-1, of any shape.
+
+    Returns:
+        list: For each material, a complex128 tensor of shape frequency.shape + [3, 3].
+    """
+    return [
+        material.assemble_permittivity_tensor(components)
+        for material, components in zip(materials, permittivity_components(materials, frequency))
+    ]
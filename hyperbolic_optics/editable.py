@@ -0,0 +1,134 @@
+"""
+Editable structure for interactive what-if calculations.
+
+An EditableStructure is executed once on construction and then kept up to date
+through small edits such as set_layer(2, rotationZ=45). Every layer is cached
+under its payload data and the inputs it shares with the rest of the stack (the
+scenario grid, k_x, k_0 and any sweep). After an edit only the layers whose key
+changed are rebuilt, and the stack is multiplied again from the cached layer
+matrices, so the cost of an edit is that of the edited layer. Edits to the
+scenario or to the prism permittivity change k_x, and rebuild every layer, as
+do runs split into chunks (Volume grids), whose chunks each build their own
+layers.
+"""
+
+import copy
+import hashlib
+import json
+
+import numpy as np
+
+from hyperbolic_optics.material_registry import registration_generation
+from hyperbolic_optics.sweeps import is_pointwise, swept_field
+from hyperbolic_optics.structure import Structure
+
+
+class EditableStructure(Structure):
+    """
+    A structure that stays executed and recomputes only the layers an edit changes.
+
+    Attributes:
+        payload (dict): The current payload; edit it through the methods below.
+        rebuilt_layers (list): Indices of the layers built by the last update.
+    """
+
+    def __init__(self, payload, **options):
+        """
+        Execute the payload.
+
+        Args:
+            payload (dict): Scenario data, layers and optional sweep, as for
+                Structure.execute. The structure keeps its own copy.
+            **options: Options of Structure, except compiled.
+        """
+        if options.get("compiled"):
+            raise ValueError("An EditableStructure cannot be compiled; it caches its layers instead")
+        super().__init__(**options)
+        self.payload = copy.deepcopy(payload)
+        self.rebuilt_layers = []
+        self._layer_cache = {}
+        self._used_keys = set()
+        self._context = None
+        self.update()
+
+    def set_layer(self, index, **fields):
+        """Change fields of one layer, e.g. set_layer(2, rotationZ=45.0), and update."""
+        self.payload["Layers"][index].update(fields)
+        self.update()
+
+    def replace_layer(self, index, layer_data):
+        """Replace one layer with new layer data and update."""
+        self.payload["Layers"][index] = copy.deepcopy(layer_data)
+        self.update()
+
+    def insert_layer(self, index, layer_data):
+        """Insert a layer before the given index and update."""
+        self.payload["Layers"].insert(index, copy.deepcopy(layer_data))
+        self.update()
+
+    def remove_layer(self, index):
+        """Remove one layer and update."""
+        del self.payload["Layers"][index]
+        self.update()
+
+    def set_scenario(self, **fields):
+        """Change fields of the scenario data and update; every layer is rebuilt."""
+        self.payload["ScenarioData"].update(fields)
+        self.update()
+
+    def set_sweep(self, sweep):
+        """Set, or with None remove, the sweep of the payload and update."""
+        if sweep is None:
+            self.payload.pop("Sweep", None)
+        else:
+            self.payload["Sweep"] = copy.deepcopy(sweep)
+        self.update()
+
+    def update(self):
+        """Recompute the reflection coefficients of the current payload."""
+        self.rebuilt_layers = []
+        self.execute(self.payload)
+
+    def get_layers(self, layer_data_list, lazy_profiles=None):
+        """Create the layers, reusing the cached layers whose inputs are unchanged."""
+        self.layers = []
+        self._context = None
+        self._used_keys = set()
+        super().get_layers(layer_data_list, lazy_profiles)
+        # Keep only the current layers, so the cache holds one stack at most
+        self._layer_cache = {key: self._layer_cache[key] for key in self._used_keys}
+
+    def build_layer(self, index, layer_data, points, lazy_profiles):
+        """Return the cached layer for the same inputs, or build and cache it."""
+        key = (
+            self.shared_inputs_key(),
+            json.dumps(layer_data, sort_keys=True),
+            # A material registered in code may be replaced under the same name
+            registration_generation(layer_data.get("material")),
+            is_pointwise(self.sweep, index),
+            swept_field(self.sweep, index),
+            lazy_profiles,
+        )
+        self._used_keys.add(key)
+        layer = self._layer_cache.get(key)
+        if layer is None:
+            layer = super().build_layer(index, layer_data, points, lazy_profiles)
+            self._layer_cache[key] = layer
+            self.rebuilt_layers.append(index)
+        return layer
+
+    def shared_inputs_key(self):
+        """Digest of the inputs that every layer depends on, computed once per update."""
+        if self._context is None:
+            digest = hashlib.sha256(str(self.scenario.type).encode())
+            for value in (self.incident_angle, self.azimuthal_angle, self.frequency, self.k_x, self.k_0):
+                if value is None:
+                    digest.update(b"None")
+                    continue
+                array = np.asarray(value)
+                digest.update(str(array.shape).encode())
+                digest.update(array.tobytes())
+            if self.sweep is not None:
+                digest.update(json.dumps(self.payload.get("Sweep"), sort_keys=True).encode())
+            self._context = digest.hexdigest()
+        return self._context
@@ -0,0 +1,170 @@
+"""
+Sampling of the scenario axes.
+
+Each swept axis of a scenario (incident angle, azimuthal angle, frequency) can
+be given in the payload as
+
+- nothing, for the default grid of the scenario;
+- a list of explicit values;
+- a dict with any of "min", "max", "points" and "spacing", where missing
+  entries fall back to the default grid and spacing is one of SPACINGS.
+
+The Points scenario instead takes flat lists of scattered points, read by
+scattered_points. Angles are given in degrees and frequencies in cm^-1. Kept
+free of TensorFlow so that both backends build identical grids.
+"""
+
+import math as m
+from collections.abc import Mapping
+
+import numpy as np
+
+SPACINGS = ("linear", "cosine", "log")
+
+# Number of frequencies when neither the payload nor the material gives one
+DEFAULT_FREQUENCY_POINTS = 410
+
+DEGREES = m.pi / 180.0
+
+# Default (min, max, points) of each swept angle axis, in radians. The ends are
+# offset slightly to avoid the singular grazing and zero angles
+INCIDENT_ANGLE_GRID = (-m.pi / 2. + 1.e-9, m.pi / 2. - 1.e-9, 360)
+AZIMUTHAL_ANGLE_GRID = (0. + 1.e-15, 2. * m.pi - 1.e-15, 360)
+DISPERSION_INCIDENT_ANGLE_GRID = (0. + 1.e-8, m.pi / 2. - 1.e-8, 180)
+DISPERSION_AZIMUTHAL_ANGLE_GRID = (1.e-5, 2. * m.pi - 1.e-5, 480)
+VOLUME_INCIDENT_ANGLE_GRID = (0. + 1.e-8, m.pi / 2. - 1.e-8, 90)
+VOLUME_AZIMUTHAL_ANGLE_GRID = (1.e-5, 2. * m.pi - 1.e-5, 180)
+
+GRID_KEYS = ("min", "max", "points", "spacing")
+
+
+def is_grid_spec(spec):
+    """True when a payload value describes a grid rather than a single value."""
+    return isinstance(spec, (Mapping, list, tuple, np.ndarray))
+
+
+def has_range(spec):
+    """True when a grid spec can be sampled without a default range."""
+    if isinstance(spec, Mapping):
+        return spec.get("min") is not None and spec.get("max") is not None
+    return is_grid_spec(spec)
+
+
+def spaced_values(start, stop, points, spacing="linear"):
+    """
+    Sample [start, stop] with the given number of points.
+
+    Args:
+        start (float): First value.
+        stop (float): Last value.
+        points (int): Number of values.
+        spacing (str): "linear" for equal steps, "cosine" to cluster the points
+            towards both ends, or "log" for equal ratios (start and stop must be
+            non-zero and of the same sign).
+
+    Returns:
+        np.ndarray: The float64 values.
+    """
+    if spacing == "linear":
+        return np.linspace(start, stop, points)
+    if spacing == "cosine":
+        fraction = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, points)))
+        return start + (stop - start) * fraction
+    if spacing == "log":
+        if start * stop <= 0:
+            raise ValueError("Log spacing requires a range that does not contain zero")
+        return np.geomspace(start, stop, points)
+    raise ValueError(f"Spacing {spacing} not implemented, expected one of {', '.join(SPACINGS)}")
+
+
+def axis_grid(spec, default_min=None, default_max=None, default_points=None, scale=1.0):
+    """
+    Build the values of one scenario axis from its payload spec.
+
+    Args:
+        spec (None, list or dict): The payload entry for the axis.
+        default_min (float): Start of the default grid, already in output units.
+        default_max (float): End of the default grid, already in output units.
+        default_points (int): Number of points of the default grid.
+        scale (float): Factor from payload units to output units, e.g. pi / 180
+            for angles returned in radians.
+
+    Returns:
+        np.ndarray: The float64 values of the axis.
+    """
+    if spec is None:
+        spec = {}
+
+    if not isinstance(spec, Mapping):
+        values = np.asarray(spec, dtype=np.float64)
+        if values.ndim != 1 or values.size == 0:
+            raise ValueError("An explicit grid must be a non-empty list of numbers")
+        return values * scale
+
+    unknown = set(spec) - set(GRID_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown grid keys {', '.join(sorted(unknown))}, expected {', '.join(GRID_KEYS)}")
+
+    start = default_min if spec.get("min") is None else float(spec["min"]) * scale
+    stop = default_max if spec.get("max") is None else float(spec["max"]) * scale
+    points = default_points if spec.get("points") is None else int(spec["points"])
+    if start is None or stop is None:
+        raise ValueError("Grid needs a min and max when the axis has no default range")
+    if points < 1:
+        raise ValueError("Grid needs at least one point")
+
+    return spaced_values(start, stop, points, spec.get("spacing", "linear"))
+
+
+def angle_grid(spec, default_grid, grazing=False):
+    """
+    Angles in radians from a payload grid spec in degrees, or the default grid.
+
+    As the default grids do, angles exactly at zero are offset by 1e-15 and, for
+    angles of incidence (grazing=True), those at +-90 degrees are moved 1e-9
+    inwards, where the semi-infinite layers would divide by zero.
+
+    Args:
+        spec: The payload entry for the axis; anything but a grid spec selects
+            the default grid.
+        default_grid (tuple): (min, max, points) of the default grid in radians.
+        grazing (bool): Whether the axis is an angle of incidence.
+
+    Returns:
+        np.ndarray: The float64 angles.
+    """
+    values = axis_grid(spec if is_grid_spec(spec) else None, *default_grid, scale=DEGREES)
+    values = np.where(values == 0.0, 1.e-15, values)
+    if grazing:
+        at_grazing = np.isclose(np.abs(values), m.pi / 2., rtol=0.0, atol=1.e-12)
+        values = np.where(at_grazing, np.sign(values) * (m.pi / 2. - 1.e-9), values)
+    return values
+
+
+def scattered_points(incident_angle, azimuthal_angle, frequency):
+    """
+    Flat arrays of the (incident angle, azimuthal angle, frequency) points of a
+    Points scenario.
+
+    Args:
+        incident_angle (float or list): Incident angles in degrees.
+        azimuthal_angle (float or list): Azimuthal angles in degrees.
+        frequency (float or list): Frequencies in cm^-1.
+
+    Returns:
+        tuple: The incident and azimuthal angles in radians and the frequencies,
+            as float64 arrays of one common length. Single numbers are repeated
+            for every point.
+    """
+    if incident_angle is None or azimuthal_angle is None or frequency is None:
+        raise ValueError("Points scenario needs incidentAngle, azimuthal_angle and frequency")
+
+    values = [np.asarray(value, dtype=np.float64) for value in (incident_angle, azimuthal_angle, frequency)]
+    if any(value.ndim > 1 or value.size == 0 for value in values):
+        raise ValueError("Points scenario values must be numbers or non-empty flat lists")
+    try:
+        incident_angle, azimuthal_angle, frequency = np.broadcast_arrays(*[np.atleast_1d(value) for value in values])
+    except ValueError:
+        raise ValueError("Points scenario lists must all have the same length") from None
+
+    return incident_angle * DEGREES, azimuthal_angle * DEGREES, np.array(frequency)
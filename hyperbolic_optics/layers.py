@@ -6,17 +6,25 @@ Stage 2 Refactor: Updated to properly handle both eps and mu tensors from materi
 from abc import ABC, abstractmethod
 import math as m
 import tensorflow as tf
+from hyperbolic_optics.material_registry import get_material
 from hyperbolic_optics.materials import (
     Air,
-    CalciteUpper,
-    Quartz,
-    Sapphire,
-    CalciteLower,
-    GalliumOxide,
     ArbitraryMaterial,
+    IsotropicMaterial,
+    TabulatedMaterial,
+    UniaxialMaterial,
 )
 from hyperbolic_optics.waves import Wave
-from hyperbolic_optics.anisotropy_utils import anisotropy_rotation_one_axis, anisotropy_rotation_one_value
+from hyperbolic_optics.tensor_utils import to_float64, to_radians
+from hyperbolic_optics.anisotropy_utils import (
+    anisotropy_rotation_all_axes,
+    anisotropy_rotation_one_axis,
+    anisotropy_rotation_one_value,
+)
+
+# Largest xy or yz entry, relative to the largest entry of eps or mu, for which a
+# rotated layer is treated as not mixing p and s waves
+DECOUPLING_TOLERANCE = 1e-7
 
 
 class AmbientMedium:
@@ -49,7 +57,10 @@ class AmbientIncidentMedium(AmbientMedium):
         """
         super().__init__(run_on_device_decorator)
         self.permittivity = permittivity
-        self.theta = tf.cast(tf.math.asin(kx / (permittivity**0.5)), dtype=tf.float64)
+        # Clamped because a tensor permittivity (as in a prism sweep) can round the
+        # ratio just past one at grazing incidence
+        sin_theta = tf.clip_by_value(to_float64(kx) / to_float64(permittivity) ** 0.5, -1.0, 1.0)
+        self.theta = tf.math.asin(sin_theta)
 
     def construct_tensor(self):
         """
@@ -201,19 +212,20 @@ class AmbientExitMedium(AmbientMedium):
             N_exit * tf.ones_like(cos_theta_f)],
             axis=-1)
 
-        matrix = tf.stack([element1, element2, element3, element4], axis=1)
+        # Rows on the second-to-last axis, so a scalar angle gives a single [4, 4] matrix
+        matrix = tf.stack([element1, element2, element3, element4], axis=-2)
         return tf.cast(matrix, dtype=tf.complex128)
 
 
 class Layer(ABC):
     """Abstract base class for a layer in the device."""
 
-    def __init__(self, data, scenario, kx, k0):
+    def __init__(self, data, scenario, kx, k0, eigen_solver="eig", lazy_profiles=False, stack_solver="transfer"):
         self.type = data.get("type")
         self.material = data.get("material", None)
-        self.rotationX = tf.cast(m.radians(data.get("rotationX", 0)), dtype=tf.float64)
-        self.rotationY = tf.cast(m.radians(data.get("rotationY", 0)), dtype=tf.float64) + 1e-8
-        self.rotationZ = tf.cast(m.radians(data.get("rotationZ", 0)), dtype=tf.float64) + 1.e-9
+        self.rotationX = to_radians(data.get("rotationX", 0))
+        self.rotationY = to_radians(data.get("rotationY", 0)) + 1e-8
+        self.rotationZ = to_radians(data.get("rotationZ", 0)) + 1.e-9
         self.rotationZ_type = data.get("rotationZType", "relative")
         self.kx = kx
         self.k0 = k0
@@ -227,45 +239,57 @@ class Layer(ABC):
         self.eps_tensor = None
         self.mu_tensor = None
 
+        # Requested eigen solver; layers fall back to "eig" when no closed form applies
+        self.eigen_solver = eigen_solver
+        self.principal_permittivities = None
+
+        # In lean mode the field profile is only built when it is first read
+        self.lazy_profiles = lazy_profiles
+        self._profile = None
+
+        # With the scattering stack solver finite layers keep their modes instead of a matrix
+        self.stack_solver = stack_solver
+        self.modes = None
+
+        # Whether p and s waves propagate independently in the layer
+        self.decoupled = False
+
+        # Shape that the point axis is restored to when the layer was solved over
+        # the flattened points of a sweep
+        self.grid_shape = None
+
         self.thickness = data.get("thickness", None)
-        if self.thickness:
-            self.thickness = float(self.thickness) * 1e-4
+        if self.thickness is not None:
+            self.thickness = to_float64(self.thickness) * 1e-4
 
     def material_factory(self):
         """Create the material object based on the material name or specifications.
         
-        This method handles both predefined materials (like Quartz, Sapphire) and
+        This method handles predefined materials (like Quartz, Sapphire),
+        tabulated materials specified by a dictionary with a "table" file, and
         arbitrary materials specified via a dictionary of parameters.
         
         Returns:
             Material object: An instance of a material class with the specified properties
         """
-        if isinstance(self.material, dict):
+        if isinstance(self.material, dict) and "table" in self.material:
+            self.material = TabulatedMaterial.from_material_data(self.material)
+        elif isinstance(self.material, dict):
             # Create an ArbitraryMaterial instance instead of returning the dict
             self.material = ArbitraryMaterial(self.material)
-        elif self.material == "Quartz":
-            self.material = Quartz()
-        elif self.material == "Sapphire":
-            self.material = Sapphire()
-        elif self.material == "Calcite":
-            self.material = CalciteUpper()
-        elif self.material == "CalciteLower":
-            self.material = CalciteLower()
-        elif self.material == "GalliumOxide":
-            self.material = GalliumOxide()
         else:
-            raise NotImplementedError(f"Material {self.material} not implemented")
+            self.material = get_material(self.material)
 
     def calculate_z_rotation(self):
         """
         Calculate the rotation of the layer in the z direction.
 
-        If the scenario is dispersion, azimuthal, or simple, the rotation is relative to
+        If the scenario is dispersion, azimuthal, simple, points or volume, the rotation is relative to
         the azimuthal angle, but can be defined to be static while all other
         layers are rotated. If it's relative, the rotation is added to the
         azimuthal angle as it has been 'shifted'.
         """
-        if self.scenario in ["Dispersion", "Azimuthal", "Simple"]:
+        if self.scenario in ["Dispersion", "Azimuthal", "Simple", "Points", "Volume"]:
             if self.rotationZ_type == "relative":
                 self.rotationZ = self.azimuthal_angle + self.rotationZ
             elif self.rotationZ_type == "static":
@@ -279,31 +303,74 @@ class Layer(ABC):
         """Calculate both permittivity and magnetic tensors for the layer."""
         self.material_factory()
         
-        if self.scenario in ["Incident", "Azimuthal"]:
-            self.eps_tensor = tf.cast(self.material.fetch_permittivity_tensor(), dtype=tf.complex128)
-            self.mu_tensor = tf.cast(self.material.fetch_magnetic_tensor(), dtype=tf.complex128)
-        elif self.scenario in ["Dispersion", "Simple"]:
-            self.eps_tensor = tf.cast(
-                self.material.fetch_permittivity_tensor_for_freq(self.frequency),
-                dtype=tf.complex128,
-            )
-            self.mu_tensor = tf.cast(
-                self.material.fetch_magnetic_tensor_for_freq(self.frequency),
-                dtype=tf.complex128,
+        # Named materials are shared between layers, so they are evaluated on
+        # the layer's frequencies rather than set to them
+        eps_tensor, mu_tensor = self.material.fetch_tensors_for_freq(self.frequency)
+        self.eps_tensor = tf.cast(eps_tensor, dtype=tf.complex128)
+        self.mu_tensor = tf.cast(mu_tensor, dtype=tf.complex128)
+        # A constant mu keeps size-1 frequency axes, so that the rotations and
+        # the per-mode indexing of Wave line it up with eps
+        for _ in range(len(self.eps_tensor.shape) - len(self.mu_tensor.shape)):
+            self.mu_tensor = self.mu_tensor[tf.newaxis, ...]
+
+    def select_eigen_solver(self, material):
+        """
+        Keep the analytic eigen solver only for uniaxial and isotropic materials.
+
+        Must be called before the tensors are rotated, so that the ordinary and
+        extraordinary permittivities can be read off the diagonal.
+        """
+        if self.eigen_solver == "analytic" and isinstance(material, (UniaxialMaterial, IsotropicMaterial)):
+            self.principal_permittivities = (self.eps_tensor[..., 0, 0], self.eps_tensor[..., 2, 2])
+        else:
+            self.eigen_solver = "eig"
+
+    def check_decoupled(self):
+        """
+        Whether p and s waves do not mix in the layer, i.e. its rotated eps and mu
+        have no xy, yx, yz or zy entries beyond DECOUPLING_TOLERANCE of their
+        largest entry. The tolerance covers the small offsets added to the
+        rotation angles. Tensors that are not known yet, as in a compiled graph,
+        are taken to mix.
+        """
+        if not tf.executing_eagerly():
+            return False
+        for tensor in (self.eps_tensor, self.mu_tensor):
+            coupling = tf.stack(
+                [tensor[..., 0, 1], tensor[..., 1, 0], tensor[..., 1, 2], tensor[..., 2, 1]], axis=-1
             )
+            scale = float(tf.reduce_max(tf.math.abs(tensor)))
+            if float(tf.reduce_max(tf.math.abs(coupling))) > DECOUPLING_TOLERANCE * scale:
+                return False
+        return True
 
     def rotate_tensors(self):
         """Rotate both permittivity and magnetic tensors according to the rotation angles."""
-        if self.scenario in ["Incident", "Dispersion"]:
+        if self.scenario in ["Incident", "Dispersion", "Points"]:
             rotation_func = anisotropy_rotation_one_value
         elif self.scenario == "Azimuthal":
             rotation_func = anisotropy_rotation_one_axis
         elif self.scenario == "Simple":
             rotation_func = anisotropy_rotation_one_value
+        elif self.scenario == "Volume":
+            rotation_func = self.rotation_over_azimuth
 
         self.eps_tensor = rotation_func(self.eps_tensor, self.rotationX, self.rotationY, self.rotationZ)
         self.mu_tensor = rotation_func(self.mu_tensor, self.rotationX, self.rotationY, self.rotationZ)
 
+    @staticmethod
+    def rotation_over_azimuth(matrix, rotationX, rotationY, rotationZ):
+        """
+        Rotate [frequency, 3, 3] tensors, or a frequency-independent [3, 3] one, by
+        every angle in rotationZ, giving [frequency, azimuth, 3, 3].
+        """
+        if len(matrix.shape) == 2:
+            matrix = matrix[tf.newaxis, ...]
+        rotated = anisotropy_rotation_all_axes(
+            matrix, rotationX[tf.newaxis], rotationY[tf.newaxis], rotationZ
+        )
+        return rotated[:, 0, 0, ...]
+
     # DEPRECATED: Remove this method in favor of calculate_tensors()
     def calculate_eps_tensor(self):
         """Calculate the permittivity tensor for the layer. DEPRECATED - use calculate_tensors()."""
@@ -320,6 +387,58 @@ class Layer(ABC):
                      DeprecationWarning, stacklevel=2)
         self.rotate_tensors()
 
+    @property
+    def profile(self):
+        """Poynting-sorted WaveProfile of the layer, or None for closed-form layers."""
+        if self._profile is None and self.lazy_profiles:
+            wave = self.build_wave()
+            if wave is not None:
+                self._profile, _ = wave.execute()
+                if self.grid_shape is not None:
+                    self._profile.reshape_batch(self.grid_shape)
+        return self._profile
+
+    @profile.setter
+    def profile(self, value):
+        self._profile = value
+
+    def build_wave(self):
+        """Return the Wave that solves the layer, or None for closed-form layers."""
+        return None
+
+    def create_wave_matrix(self):
+        """
+        Solve the layer's partial waves, keeping the profile unless in lean mode.
+
+        A decoupled layer in a transfer-matrix stack is instead built from the
+        closed form of its 2x2 p and s blocks, and its profile is solved when it
+        is first read.
+        """
+        wave = self.build_wave()
+        if self.decoupled and self.stack_solver == "transfer":
+            self.lazy_profiles = True
+            self.matrix = wave.decoupled_transfer_matrix()
+            return
+        self.profile, self.matrix = wave.execute(with_profile=not self.lazy_profiles)
+        self.modes = wave.modes
+
+    def reshape_points(self, grid_shape):
+        """
+        Restore the results of a layer solved over flattened points to a grid.
+
+        Args:
+            grid_shape (list): Shape of the [sweep, *grid] axes the points were
+                flattened from.
+        """
+        self.grid_shape = grid_shape
+        if self.matrix is not None:
+            self.matrix = tf.reshape(self.matrix, grid_shape + [4, 4])
+        if self.modes is not None:
+            eigenvectors, phases = self.modes
+            self.modes = (tf.reshape(eigenvectors, grid_shape + [4, 4]), tf.reshape(phases, grid_shape + [4]))
+        if self._profile is not None:
+            self._profile.reshape_batch(grid_shape)
+
     @abstractmethod
     def create(self):
         pass
@@ -328,9 +447,11 @@ class Layer(ABC):
 class PrismLayer(Layer):
     """The incident coupling prism layer."""
 
-    def __init__(self, data, scenario, kx, k0):
-        super().__init__(data, scenario, kx, k0)
-        self.eps_prism = tf.cast(data.get("permittivity", 5.5), dtype=tf.float64)
+    def __init__(self, data, scenario, kx, k0, eigen_solver="eig", lazy_profiles=False, stack_solver="transfer"):
+        super().__init__(data, scenario, kx, k0, eigen_solver, lazy_profiles, stack_solver)
+        self.eigen_solver = None  # Closed-form ambient medium, no eigenproblem
+        self.decoupled = True
+        self.eps_prism = to_float64(data.get("permittivity", 5.5))
         self.create()
 
     def create(self):
@@ -344,17 +465,24 @@ class PrismLayer(Layer):
             self.matrix = prism.construct_tensor()[:, tf.newaxis, ...]
         elif self.scenario == "Simple":
             self.matrix = prism.construct_tensor_singular()
+        elif self.scenario == "Points":
+            self.matrix = prism.construct_tensor()
+        elif self.scenario == "Volume":
+            self.matrix = prism.construct_tensor()[tf.newaxis, :, tf.newaxis, ...]
 
 
 class AirGapLayer(Layer):
     """The airgap/isotropic middle layer."""
 
-    def __init__(self, data, scenario, kx, k0):
-        super().__init__(data, scenario, kx, k0)
+    def __init__(self, data, scenario, kx, k0, eigen_solver="eig", lazy_profiles=False, stack_solver="transfer"):
+        super().__init__(data, scenario, kx, k0, eigen_solver, lazy_profiles, stack_solver)
         
         # Handle complex permittivity input
         perm = data.get("permittivity", 1.0)
-        if isinstance(perm, dict):
+        if tf.is_tensor(perm):
+            # One permittivity per point of a sweep
+            self.permittivity = perm
+        elif isinstance(perm, dict):
             if "real" in perm or "imag" in perm:
                 self.permittivity = complex(perm.get('real', 0), perm.get('imag', 0))
             else:
@@ -367,7 +495,9 @@ class AirGapLayer(Layer):
         
         # CHANGED: Handle magnetic permeability input
         mu = data.get("permeability", 1.0)
-        if isinstance(mu, dict):
+        if tf.is_tensor(mu):
+            self.permeability = mu
+        elif isinstance(mu, dict):
             if "real" in mu or "imag" in mu:
                 self.permeability = complex(mu.get('real', 0), mu.get('imag', 0))
             else:
@@ -384,6 +514,11 @@ class AirGapLayer(Layer):
         # CHANGED: Get both tensors from the material
         self.eps_tensor = self.isotropic_material.fetch_permittivity_tensor()
         self.mu_tensor = self.isotropic_material.fetch_magnetic_tensor()
+
+        # The partial waves of an isotropic layer are always solved in closed form
+        self.eigen_solver = "analytic"
+        self.decoupled = True
+        self.principal_permittivities = (self.eps_tensor[..., 0, 0], self.eps_tensor[..., 2, 2])
         
         self.calculate_mode()
         self.create()
@@ -398,74 +533,114 @@ class AirGapLayer(Layer):
             self.mode = "simple_airgap"
         elif self.scenario == "Simple":
             self.mode = "simple_scalar_airgap"
+        elif self.scenario == "Points":
+            # k_x already runs along the points, as for a crystal layer
+            self.mode = "Points"
+        elif self.scenario == "Volume":
+            self.mode = "volume_airgap"
 
-    def create(self):
+    def build_wave(self):
         # CHANGED: Pass both tensors instead of duplicating the eps tensor
-        self.profile, self.matrix = Wave(
+        return Wave(
             self.kx,
             self.eps_tensor,
             self.mu_tensor,  # Now passing the actual magnetic tensor
             self.mode,
             k_0=self.k0,
             thickness=self.thickness,
-        ).execute()
+            eigen_solver=self.eigen_solver,
+            principal_permittivities=self.principal_permittivities,
+            stack_solver=self.stack_solver,
+        )
+
+    def create(self):
+        """
+        Build the layer from the closed form of an isotropic medium.
+
+        The transfer stack takes the matrix from Wave.isotropic_transfer_matrix and
+        leaves the field profile, which the matrix does not need, to be solved when
+        it is first read. The scattering stack takes its modes from the analytic
+        wave solver.
+        """
+        if self.stack_solver == "transfer":
+            self.lazy_profiles = True
+            self.matrix = self.build_wave().isotropic_transfer_matrix()
+        else:
+            self.create_wave_matrix()
 
 
 class CrystalLayer(Layer):
     """Anisotropic crystal of arbitrary orientation and thickness."""
 
-    def __init__(self, data, scenario, kx, k0):
-        super().__init__(data, scenario, kx, k0)
+    def __init__(self, data, scenario, kx, k0, eigen_solver="eig", lazy_profiles=False, stack_solver="transfer"):
+        super().__init__(data, scenario, kx, k0, eigen_solver, lazy_profiles, stack_solver)
         # CHANGED: Use the new unified tensor calculation methods
         self.calculate_tensors()  # Get both eps and mu tensors
+        self.select_eigen_solver(self.material)
         self.calculate_z_rotation()
         self.rotate_tensors()  # Rotate both tensors
+        self.decoupled = self.check_decoupled()
         self.create()
 
-    def create(self):
+    def build_wave(self):
         # CHANGED: Pass both tensors to Wave
-        self.profile, self.matrix = Wave(
+        return Wave(
             self.kx,
             self.eps_tensor,
             self.mu_tensor,  # Now using the actual magnetic tensor from material
             self.scenario,
             k_0=self.k0,
             thickness=self.thickness,
-        ).execute()
+            eigen_solver=self.eigen_solver,
+            principal_permittivities=self.principal_permittivities,
+            stack_solver=self.stack_solver,
+        )
+
+    def create(self):
+        self.create_wave_matrix()
 
 
 class SemiInfiniteCrystalLayer(Layer):
     """Anisotropic semi-infinite crystal layer."""
 
-    def __init__(self, data, scenario, kx, k0):
-        super().__init__(data, scenario, kx, k0)
+    def __init__(self, data, scenario, kx, k0, eigen_solver="eig", lazy_profiles=False, stack_solver="transfer"):
+        super().__init__(data, scenario, kx, k0, eigen_solver, lazy_profiles, stack_solver)
         self.calculate_z_rotation()
         # CHANGED: Use the new unified tensor calculation methods
         self.calculate_tensors()  # Get both eps and mu tensors
+        self.select_eigen_solver(self.material)
         self.rotate_tensors()  # Rotate both tensors
+        self.decoupled = self.check_decoupled()
         self.create()
 
-    def create(self):
+    def build_wave(self):
         # CHANGED: Pass both tensors to Wave
-        self.profile, self.matrix = Wave(
+        return Wave(
             self.kx,
             self.eps_tensor,
             self.mu_tensor,  # Now using the actual magnetic tensor from material
             self.scenario,
             semi_infinite=True,
-        ).execute()
+            eigen_solver=self.eigen_solver,
+            principal_permittivities=self.principal_permittivities,
+            stack_solver=self.stack_solver,
+        )
+
+    def create(self):
+        self.create_wave_matrix()
 
 
 class IsotropicSemiInfiniteLayer(Layer):
     """Isotropic semi-infinite layer with a given permittivity."""
 
-    def __init__(self, data, scenario, kx, k0):
-        super().__init__(data, scenario, kx, k0)
+    def __init__(self, data, scenario, kx, k0, eigen_solver="eig", lazy_profiles=False, stack_solver="transfer"):
+        super().__init__(data, scenario, kx, k0, eigen_solver, lazy_profiles, stack_solver)
+        self.eigen_solver = None  # Closed-form ambient medium, no eigenproblem
+        self.decoupled = True
         self.eps_incident = (tf.cast(kx, dtype=tf.float64) / tf.sin(self.incident_angle)) ** 2
-        self.eps_exit = tf.cast(data.get("permittivity"), dtype=tf.float64)
-
-        if not self.eps_exit:
+        if data.get("permittivity") is None:
             raise ValueError("No exit permittivity provided for isotropic semi-infinite layer")
+        self.eps_exit = to_float64(data.get("permittivity"))
 
         self.create()
 
@@ -478,9 +653,10 @@ class IsotropicSemiInfiniteLayer(Layer):
             self.matrix = exit_medium.construct_tensor()[tf.newaxis, tf.newaxis, ...]
         elif self.scenario == "Dispersion":
             self.matrix = exit_medium.construct_tensor()[:, tf.newaxis, ...]
-        elif self.scenario == "Simple":
-            # For simple scenario, just get the scalar tensor without additional dimensions
-            self.matrix = exit_medium.construct_tensor_singular()
+        elif self.scenario in ["Simple", "Points"]:
+            self.matrix = exit_medium.construct_tensor()
+        elif self.scenario == "Volume":
+            self.matrix = exit_medium.construct_tensor()[tf.newaxis, :, tf.newaxis, ...]
 
 
 class LayerFactory:
@@ -495,10 +671,10 @@ class LayerFactory:
             "Semi Infinite Isotropic Layer": IsotropicSemiInfiniteLayer,
         }
 
-    def create_layer(self, layer_data, scenario, kx, k0):
+    def create_layer(self, layer_data, scenario, kx, k0, eigen_solver="eig", lazy_profiles=False, stack_solver="transfer"):
         """Create a layer from the layer data."""
         layer_class = self.layer_classes.get(layer_data["type"])
         if layer_class is not None:
-            return layer_class(layer_data, scenario, kx, k0)
+            return layer_class(layer_data, scenario, kx, k0, eigen_solver, lazy_profiles, stack_solver)
         else:
             raise ValueError(f"Invalid layer type {layer_data['type']}")
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Access to the material parameter configuration.
+
+Kept free of TensorFlow so that the NumPy backend can read the same parameters.
+The JSON file is parsed once per process and shared, read-only, by every
+material. Backends keep values derived from it (such as ready-made tensors) in
+caches obtained from derived_cache, which invalidate_material_parameters empties
+together with the parsed file, e.g. after editing material_params.json.
+"""
+
+import json
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+_lock = threading.Lock()
+_parameters = None
+_derived_caches = []
+
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def load_material_parameters():
+    """Return the material parameters, parsing the JSON configuration file on first use."""
+    global _parameters
+    with _lock:
+        if _parameters is None:
+            config_path = Path(__file__).parent / "material_params.json"
+            with open(config_path, "r") as f:
+                _parameters = _freeze(json.load(f))
+        return _parameters
+
+
+def derived_cache():
+    """Return a new dict that is emptied whenever the parameters are invalidated."""
+    cache = {}
+    with _lock:
+        _derived_caches.append(cache)
+    return cache
+
+
+def invalidate_material_parameters():
+    """Drop the parsed parameters and every derived cache; the file is re-read on next use."""
+    global _parameters
+    with _lock:
+        _parameters = None
+        for cache in _derived_caches:
+            cache.clear()
+
+
+def registered_material(name):
+    """
+    Return the "material_registry" entry of a material name: the "group" and
+    "key" of its parameters and, optionally, the "variant" giving its frequency
+    range.
+
+    Raises:
+        NotImplementedError: When no material of that name is configured.
+    """
+    registry = load_material_parameters().get("material_registry", {})
+    if not isinstance(name, str) or name not in registry:
+        raise NotImplementedError(f"Material {name} not implemented")
+    return registry[name]
+
+
+def default_frequency_range(entry):
+    """The (default_min, default_max) range of a material_registry entry, in cm^-1."""
+    params = load_material_parameters()[entry["group"]][entry["key"]]
+    if entry.get("variant") is not None:
+        params = params["variants"][entry["variant"]]
+    frequency_range = params["frequency_range"]
+    return frequency_range["default_min"], frequency_range["default_max"]
@@ -0,0 +1,147 @@
+"""
+Registry of the material names accepted in layer data.
+
+A name maps to a factory taking freq_min, freq_max and mu_r keyword arguments
+and returning a material. The configured names come from the
+"material_registry" section of material_params.json, where each name points at
+the parameters of a material in one of the groups of GROUP_FACTORIES:
+
+    "MyCrystal": {"group": "uniaxial_materials", "key": "my_crystal"}
+
+so a crystal added to the file, with its oscillators under that key, can be
+used without code changes. register_material adds factories in code, and
+takes precedence over the file.
+
+Instances are built once per (name, frequency range, mu_r) and shared by every
+layer and structure. Layers only read materials, through the *_for_freq
+methods, so a shared instance is never modified. The instances are dropped
+together with the parameters by invalidate_material_parameters.
+
+A factory registered in code has no content that can be hashed, so payloads
+naming one are not stored in the on-disk result cache, and in-process caches
+key them by registration_generation.
+
+    quartz = get_material("Quartz")
+    register_material("Quartz-Hot", lambda **options: HotQuartz(**options))
+"""
+
+import functools
+import threading
+
+import tensorflow as tf
+
+from hyperbolic_optics.material_params import derived_cache, load_material_parameters, registered_material
+from hyperbolic_optics.materials import (
+    OscillatorMaterial,
+    ParameterizedMonoclinicMaterial,
+    ParameterizedUniaxialMaterial,
+)
+
+# Material class of each parameter group, called with the key of the parameters
+GROUP_FACTORIES = {
+    "uniaxial_materials": ParameterizedUniaxialMaterial,
+    "monoclinic_materials": ParameterizedMonoclinicMaterial,
+    "oscillator_materials": OscillatorMaterial,
+}
+
+_lock = threading.Lock()
+# Factories registered in code, by name
+_factories = {}
+# Number of times each name was registered or unregistered in code
+_generations = {}
+# Shared instances by (name, freq_min, freq_max, mu_r)
+_instances = derived_cache()
+
+
+def register_material(name, factory):
+    """
+    Register, or replace, the factory of a material name.
+
+    Args:
+        name (str): The name used as "material" in layer data.
+        factory (callable): Called with freq_min, freq_max and mu_r keyword
+            arguments, returns a material.
+    """
+    with _lock:
+        _factories[name] = factory
+        _generations[name] = _generations.get(name, 0) + 1
+        for key in [key for key in _instances if key[0] == name]:
+            del _instances[key]
+
+
+def unregister_material(name):
+    """Remove a factory registered in code; configured names fall back to the file."""
+    with _lock:
+        if _factories.pop(name, None) is not None:
+            _generations[name] = _generations.get(name, 0) + 1
+        for key in [key for key in _instances if key[0] == name]:
+            del _instances[key]
+
+
+def is_registered(name):
+    """Whether a factory for the name was registered in code."""
+    with _lock:
+        return name in _factories
+
+
+def registration_generation(name):
+    """
+    Counter of a name that changes whenever a factory is registered or removed
+    for it in code, for caches of the current process. Anything but a name,
+    such as inline material parameters, gives 0.
+    """
+    if not isinstance(name, str):
+        return 0
+    with _lock:
+        return _generations.get(name, 0)
+
+
+def material_names():
+    """Sorted names of every registered and configured material."""
+    with _lock:
+        names = set(_factories)
+    return sorted(names | set(load_material_parameters().get("material_registry", {})))
+
+
+def material_factory(name):
+    """
+    Return the factory of a material name.
+
+    Raises:
+        NotImplementedError: When the name is neither registered nor configured.
+    """
+    with _lock:
+        factory = _factories.get(name)
+    if factory is not None:
+        return factory
+    entry = registered_material(name)
+    group_factory = GROUP_FACTORIES.get(entry["group"])
+    if group_factory is None:
+        raise NotImplementedError(f"Material {name} is in group {entry['group']}, which has no material class")
+    options = {"variant": entry["variant"]} if entry.get("variant") is not None else {}
+    return functools.partial(group_factory, entry["key"], **options)
+
+
+def get_material(name, freq_min=None, freq_max=None, mu_r=1.0):
+    """
+    Return the shared instance of a material.
+
+    Args:
+        name (str): A registered or configured material name, e.g. "Quartz".
+        freq_min (float, optional): Start of the default frequency range.
+        freq_max (float, optional): End of the default frequency range.
+        mu_r (complex): Isotropic relative permeability.
+
+    Raises:
+        NotImplementedError: When the name is neither registered nor configured.
+    """
+    key = (name, freq_min, freq_max, mu_r)
+    material = _instances.get(key)
+    if material is None:
+        factory = material_factory(name)
+        # Built eagerly, so that instances first requested while tracing hold no graph tensors
+        with tf.init_scope():
+            material = factory(freq_min=freq_min, freq_max=freq_max, mu_r=mu_r)
+        with _lock:
+            material = _instances.setdefault(key, material)
+    return material
@@ -2,26 +2,66 @@
 Materials refactor - Stage 1: Add magnetic tensor support to all materials
 """
 
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+
 import tensorflow as tf
 import numpy as np
-import json
-from pathlib import Path
 from hyperbolic_optics.device_config import run_on_device
+from hyperbolic_optics.dispersion import (
+    PRODUCT,
+    SUM,
+    DispersionModel,
+    permittivity_components,
+    permittivity_tensors,
+)
+from hyperbolic_optics.grids import DEFAULT_FREQUENCY_POINTS
+from hyperbolic_optics.material_params import derived_cache, load_material_parameters
+from hyperbolic_optics.tabulated import INTERPOLATIONS, interpolate_tables, load_table
+from hyperbolic_optics.tensor_utils import to_complex128, to_float64
+
+# Oscillator parameters as complex128 tensors, shared by every instance of a material
+_PARAMETER_TENSORS = derived_cache()
+
+
+def _to_parameter_tensors(value):
+    """Recursively convert configuration numbers and lists to complex128 tensors."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _to_parameter_tensors(item) for key, item in value.items()})
+    return tf.constant(value, dtype=tf.complex128)
+
+
+def material_parameter_tensors(group, material_type):
+    """
+    Return the "parameters" entry of a configured material as complex128 tensors.
+
+    The tensors are built once per load of the parameter file and shared by all
+    materials. They are created eagerly, so compiled graphs capture them as
+    constants instead of rebuilding them.
+
+    Args:
+        group (str): Configuration group, e.g. "uniaxial_materials".
+        material_type (str): Material key within the group, e.g. "quartz".
+    """
+    key = (group, material_type)
+    tensors = _PARAMETER_TENSORS.get(key)
+    if tensors is None:
+        with tf.init_scope():
+            tensors = _to_parameter_tensors(load_material_parameters()[group][material_type]["parameters"])
+        _PARAMETER_TENSORS[key] = tensors
+    return tensors
 
-def load_material_parameters():
-    """Load material parameters from the JSON configuration file."""
-    config_path = Path(__file__).parent / "material_params.json"
-    with open(config_path, "r") as f:
-        return json.load(f)
 
 class BaseMaterial:
     """Base class for all materials providing common functionality."""
     
-    def __init__(self, frequency_length=410, run_on_device_decorator=run_on_device):
+    def __init__(self, frequency_length=DEFAULT_FREQUENCY_POINTS, run_on_device_decorator=run_on_device):
         self.frequency_length = frequency_length
         self.run_on_device = run_on_device_decorator
         self.name = "Base Material"
         self.frequency = None
+        self.frequency_range = None
         # NEW: Default magnetic permeability
         self.mu_r = 1.0
     
@@ -35,92 +75,83 @@ class BaseMaterial:
             freq_min = freq_range["default_min"]
         if freq_max is None:
             freq_max = freq_range["default_max"]
-            
+
+        self.frequency_range = (freq_min, freq_max)
         self.frequency = tf.cast(
-            tf.linspace(freq_min, freq_max, self.frequency_length),
+            tf.linspace(to_float64(freq_min), to_float64(freq_max), self.frequency_length),
             dtype=tf.complex128
         )
     
-    def _create_isotropic_mu_tensor_like(self, eps_tensor):
-        """Create isotropic magnetic tensor with same shape as eps_tensor."""
-        # Get the shape of eps_tensor without the last two dimensions (which are 3x3)
-        batch_shape = tf.shape(eps_tensor)[:-2]
-        
-        # Create identity matrix
-        identity = tf.eye(3, dtype=tf.complex128)
-        
-        # Broadcast to match eps_tensor shape
-        # Add batch dimensions to identity
-        for _ in range(len(eps_tensor.shape) - 2):
-            identity = tf.expand_dims(identity, 0)
-        
-        # Tile to match batch dimensions
-        tile_multiples = tf.concat([batch_shape, [1, 1]], axis=0)
-        mu_tensor = tf.tile(identity, tile_multiples)
-        
-        return tf.cast(self.mu_r, dtype=tf.complex128) * mu_tensor
-    
+    def set_frequency(self, frequency):
+        """Evaluate the material on the given frequencies (cm^-1) instead of its default grid."""
+        self.frequency = to_complex128(frequency)
+        self.frequency_length = int(self.frequency.shape[0])
+
+    def isotropic_magnetic_tensor(self):
+        """mu_r times the identity, a [3, 3] tensor that broadcasts over any frequencies."""
+        return to_complex128(self.mu_r)[..., tf.newaxis, tf.newaxis] * tf.eye(3, dtype=tf.complex128)
+
     # NEW: All materials must implement this
     @run_on_device
     def fetch_magnetic_tensor(self):
-        """Fetch magnetic permeability tensor. Default is isotropic."""
-        eps_tensor = self.fetch_permittivity_tensor()
-        return self._create_isotropic_mu_tensor_like(eps_tensor)
+        """Fetch magnetic permeability tensor. Default is isotropic and frequency-independent."""
+        return self.isotropic_magnetic_tensor()
     
     @run_on_device
     def fetch_magnetic_tensor_for_freq(self, requested_frequency):
-        """Fetch magnetic tensor for specific frequency. Default is isotropic."""
-        eps_tensor = self.fetch_permittivity_tensor_for_freq(requested_frequency)
-        return self._create_isotropic_mu_tensor_like(eps_tensor)
+        """Fetch magnetic tensor for specific frequency. Default is isotropic and frequency-independent."""
+        return self.isotropic_magnetic_tensor()
+
+    @run_on_device
+    def fetch_tensors(self):
+        """Fetch the permittivity and magnetic tensors on the frequency range in one evaluation."""
+        return self.fetch_tensors_for_freq(self.frequency)
+
+    @run_on_device
+    def fetch_tensors_for_freq(self, requested_frequency):
+        """
+        Fetch the permittivity and magnetic tensors on the given frequencies in
+        one evaluation.
+
+        Returns:
+            tuple: (eps, mu). eps has shape requested_frequency.shape + [3, 3]
+                for dispersive materials; mu is the [3, 3] constant of
+                fetch_magnetic_tensor_for_freq unless the material is
+                dispersive in mu, and broadcasts over the shape of eps.
+        """
+        return (
+            self.fetch_permittivity_tensor_for_freq(requested_frequency),
+            self.fetch_magnetic_tensor_for_freq(requested_frequency),
+        )
 
 class UniaxialMaterial(BaseMaterial):
     """Base class for anisotropic materials with a single optical axis."""
     
     @run_on_device
     def permittivity_calc_for_freq(self, frequency, high_freq, omega_tn, gamma_tn, omega_ln, gamma_ln):
-        """Calculate permittivity for a given frequency using provided parameters."""
-        frequency = tf.expand_dims(tf.constant([frequency], dtype=tf.complex128), 0)
-        omega_ln_expanded = tf.expand_dims(omega_ln, 1)
-        gamma_ln_expanded = tf.expand_dims(gamma_ln, 1)
-        omega_tn_expanded = tf.expand_dims(omega_tn, 1)
-        gamma_tn_expanded = tf.expand_dims(gamma_tn, 1)
-
-        top_line = (
-            omega_ln_expanded**2.0
-            - frequency**2.0
-            - 1j * frequency * gamma_ln_expanded
-        )
-        bottom_line = (
-            omega_tn_expanded**2.0
-            - frequency**2.0
-            - 1j * frequency * gamma_tn_expanded
-        )
-        result = top_line / bottom_line
-
-        return (high_freq * tf.reduce_prod(result, axis=0))[0]
+        """Calculate permittivity at the given frequencies, a number or a tensor of any shape, using provided parameters."""
+        parameters = {
+            "high_freq": high_freq,
+            "omega_tn": omega_tn,
+            "gamma_tn": gamma_tn,
+            "omega_ln": omega_ln,
+            "gamma_ln": gamma_ln,
+        }
+        return DispersionModel([(PRODUCT, parameters)]).evaluate(frequency)[..., 0]
 
     @run_on_device
     def permittivity_calc(self, high_freq, omega_tn, gamma_tn, omega_ln, gamma_ln):
         """Calculate permittivity over the frequency range."""
-        frequency = tf.expand_dims(self.frequency, 0)
-        omega_ln_expanded = tf.expand_dims(omega_ln, 1)
-        gamma_ln_expanded = tf.expand_dims(gamma_ln, 1)
-        omega_tn_expanded = tf.expand_dims(omega_tn, 1)
-        gamma_tn_expanded = tf.expand_dims(gamma_tn, 1)
-
-        top_line = (
-            omega_ln_expanded**2.0
-            - frequency**2.0
-            - 1j * frequency * gamma_ln_expanded
-        )
-        bottom_line = (
-            omega_tn_expanded**2.0
-            - frequency**2.0
-            - 1j * frequency * gamma_tn_expanded
-        )
-        result = top_line / bottom_line
+        return self.permittivity_calc_for_freq(self.frequency, high_freq, omega_tn, gamma_tn, omega_ln, gamma_ln)
 
-        return high_freq * tf.reduce_prod(result, axis=0)
+    def dispersion_components(self):
+        """The ordinary and extraordinary axes, as components of the dispersion engine."""
+        params = self.permittivity_parameters()
+        return [(PRODUCT, params["ordinary"]), (PRODUCT, params["extraordinary"])]
+
+    def assemble_permittivity_tensor(self, components):
+        """Create permittivity tensor from [..., 2] ordinary and extraordinary components."""
+        return self._create_permittivity_tensor(components[..., 1], components[..., 0])
 
     def _create_permittivity_tensor(self, eps_ext, eps_ord):
         """Create permittivity tensor from extraordinary and ordinary values."""
@@ -130,35 +161,38 @@ class UniaxialMaterial(BaseMaterial):
     @run_on_device
     def fetch_permittivity_tensor(self):
         """Fetch full permittivity tensor."""
-        eps_ext, eps_ord = self.permittivity_fetch()
-        return self._create_permittivity_tensor(eps_ext, eps_ord)
+        return permittivity_tensors([self], self.frequency)[0]
 
     @run_on_device
     def fetch_permittivity_tensor_for_freq(self, requested_frequency):
-        """Fetch permittivity tensor for a specific frequency."""
-        params = self.permittivity_parameters()
-        eps_ext = self.permittivity_calc_for_freq(requested_frequency, **params["extraordinary"])
-        eps_ord = self.permittivity_calc_for_freq(requested_frequency, **params["ordinary"])
-        return self._create_permittivity_tensor(eps_ext, eps_ord)
+        """Fetch permittivity tensor for a frequency, or a tensor of frequencies of any shape."""
+        return permittivity_tensors([self], requested_frequency)[0]
 
     @run_on_device
     def permittivity_fetch(self):
         """Fetch permittivity values for ordinary and extraordinary axes."""
-        params = self.permittivity_parameters()
-        eps_ext = self.permittivity_calc(**params["extraordinary"])
-        eps_ord = self.permittivity_calc(**params["ordinary"])
-        return eps_ext, eps_ord
+        components = permittivity_components([self], self.frequency)[0]
+        return components[..., 1], components[..., 0]
 
 class ParameterizedUniaxialMaterial(UniaxialMaterial):
     """Base class for uniaxial materials with parameters from configuration."""
     
-    def __init__(self, material_type, freq_min=None, freq_max=None, mu_r=1.0):
+    def __init__(self, material_type, freq_min=None, freq_max=None, mu_r=1.0, variant=None):
         super().__init__()
         params = load_material_parameters()["uniaxial_materials"][material_type]
         self.name = params.get("name", "Unnamed Material")
         self.material_type = material_type
+        self.dispersion_key = ("uniaxial_materials", material_type)
         # NEW: Store magnetic permeability
         self.mu_r = mu_r
+
+        if variant is not None:
+            # A variant has its own name and frequency range, and shares the oscillators
+            variants = params.get("variants", {})
+            if variant not in variants:
+                raise ValueError(f"{self.name} variant must be one of {', '.join(map(repr, variants))}")
+            params = variants[variant]
+            self.name = params.get("name", self.name)
         
         if "frequency_range" in params:
             self._initialize_frequency_range(params, freq_min, freq_max)
@@ -168,14 +202,7 @@ class ParameterizedUniaxialMaterial(UniaxialMaterial):
     @run_on_device
     def permittivity_parameters(self):
         """Get permittivity parameters from configuration."""
-        params = load_material_parameters()["uniaxial_materials"][self.material_type]["parameters"]
-        return {
-            axis: {
-                key: tf.constant(value, dtype=tf.complex128)
-                for key, value in axis_params.items()
-            }
-            for axis, axis_params in params.items()
-        }
+        return material_parameter_tensors("uniaxial_materials", self.material_type)
 
 # Concrete uniaxial materials - now with magnetic support
 class Quartz(ParameterizedUniaxialMaterial):
@@ -193,16 +220,9 @@ class Calcite(ParameterizedUniaxialMaterial):
     def __init__(self, freq_min=None, freq_max=None, variant=None, mu_r=1.0):
         if variant is None:
             raise ValueError("Calcite material must be instantiated with a variant ('lower' or 'upper')")
-        
-        calcite_config = load_material_parameters()["uniaxial_materials"]["calcite"]
-        super().__init__("calcite", freq_min, freq_max, mu_r)
-        
-        if variant not in calcite_config["variants"]:
+        if variant not in load_material_parameters()["uniaxial_materials"]["calcite"]["variants"]:
             raise ValueError("Calcite variant must be either 'lower' or 'upper'")
-                
-        variant_params = calcite_config["variants"][variant]
-        self.name = variant_params.get("name", self.name)
-        self._initialize_frequency_range(variant_params, freq_min, freq_max)
+        super().__init__("calcite", freq_min, freq_max, mu_r, variant=variant)
 
 class CalciteLower(Calcite):
     """Lower frequency range Calcite implementation."""
@@ -216,98 +236,182 @@ class CalciteUpper(Calcite):
 
 class MonoclinicMaterial(BaseMaterial):
     """Base class for monoclinic materials with more complex permittivity tensors."""
-    
-    def _calculate_bu_components(self, parameters, frequency):
-        """Calculate Bu mode components of permittivity."""
-        partial_calc_tn_bu = parameters["Bu"]["amplitude"]**2. / (
-            parameters["Bu"]["omega_tn"]**2.0 
-            - frequency**2.0 
-            - 1j * frequency * parameters["Bu"]["gamma_tn"]
-        )
 
-        alpha_rad = parameters["Bu"]["alpha_tn"] * np.pi / 180.0
+    def dispersion_components(self):
+        """
+        The xx, yy, zz and xy components, as components of the dispersion engine:
+        the Bu modes projected on the xy plane at their angles alpha_tn, and the
+        Au modes along z.
+        """
+        parameters = self.permittivity_parameters()
+        bu = parameters["Bu"]
+        au = parameters["Au"]
+
+        alpha_rad = bu["alpha_tn"] * np.pi / 180.0
         cos_alpha = tf.cos(alpha_rad)
         sin_alpha = tf.sin(alpha_rad)
 
-        eps_xx_bu = tf.reduce_sum(partial_calc_tn_bu * cos_alpha**2.0, axis=1)
-        eps_xy_bu = tf.reduce_sum(partial_calc_tn_bu * sin_alpha * cos_alpha, axis=1)
-        eps_yy_bu = tf.reduce_sum(partial_calc_tn_bu * sin_alpha**2.0, axis=1)
+        return [
+            (SUM, {"high_freq": bu["high_freq"]["xx"], "oscillators": bu, "weight": cos_alpha**2.0}),
+            (SUM, {"high_freq": bu["high_freq"]["yy"], "oscillators": bu, "weight": sin_alpha**2.0}),
+            (SUM, {"high_freq": au["high_freq"], "oscillators": au}),
+            (SUM, {"high_freq": bu["high_freq"]["xy"], "oscillators": bu, "weight": sin_alpha * cos_alpha}),
+        ]
 
-        return eps_xx_bu, eps_xy_bu, eps_yy_bu
+    def assemble_permittivity_tensor(self, components):
+        """Create the permittivity tensor from [..., 4] xx, yy, zz and xy components."""
+        return self._create_permittivity_tensor(*tf.unstack(components, axis=-1))
 
-    def _calculate_au_component(self, parameters, frequency):
-        """Calculate Au mode component of permittivity."""
-        partial_calc_tn_au = parameters["Au"]["amplitude"]**2. / (
-            parameters["Au"]["omega_tn"]**2.0 
-            - frequency**2.0 
-            - 1j * frequency * parameters["Au"]["gamma_tn"]
+    def _create_permittivity_tensor(self, eps_xx, eps_yy, eps_zz, eps_xy):
+        """Create the full [..., 3, 3] permittivity tensor."""
+        zeros = tf.zeros_like(eps_xx)
+        return tf.stack(
+            [
+                tf.stack([eps_xx, eps_xy, zeros], axis=-1),
+                tf.stack([eps_xy, eps_yy, zeros], axis=-1),
+                tf.stack([zeros, zeros, eps_zz], axis=-1),
+            ],
+            axis=-2,
         )
-        return tf.reduce_sum(partial_calc_tn_au, axis=1)
 
-class GalliumOxide(MonoclinicMaterial):
+    @run_on_device
+    def permittivity_calc(self):
+        """Calculate the xx, yy, zz and xy permittivity components over the frequency range."""
+        return tuple(tf.unstack(permittivity_components([self], self.frequency)[0], axis=-1))
+
+    @run_on_device
+    def fetch_permittivity_tensor(self):
+        """Get the full permittivity tensor."""
+        return permittivity_tensors([self], self.frequency)[0]
+
+    @run_on_device
+    def fetch_permittivity_tensor_for_freq(self, requested_frequency):
+        """Get permittivity tensor for a frequency, or a tensor of frequencies of any shape."""
+        return permittivity_tensors([self], requested_frequency)[0]
+
+class ParameterizedMonoclinicMaterial(MonoclinicMaterial):
+    """Base class for monoclinic materials with Bu and Au oscillators from configuration."""
+
+    def __init__(self, material_type, freq_min=None, freq_max=None, mu_r=1.0):
+        super().__init__()
+        params = load_material_parameters()["monoclinic_materials"][material_type]
+        self.name = params.get("name", "Unnamed Material")
+        self.material_type = material_type
+        self.dispersion_key = ("monoclinic_materials", material_type)
+        self.mu_r = mu_r  # NEW: Store magnetic permeability
+        self._initialize_frequency_range(params, freq_min, freq_max)
+
+    @run_on_device
+    def permittivity_parameters(self):
+        """Get permittivity parameters from configuration."""
+        return material_parameter_tensors("monoclinic_materials", self.material_type)
+
+class GalliumOxide(ParameterizedMonoclinicMaterial):
     """Gallium Oxide implementation."""
     
     def __init__(self, freq_min=None, freq_max=None, mu_r=1.0):
+        super().__init__("gallium_oxide", freq_min, freq_max, mu_r)
+
+class OscillatorMaterial(BaseMaterial):
+    """
+    Biaxial or monoclinic material from arbitrarily oriented Lorentz oscillators.
+
+    Each oscillator n adds A_n^2 d_n d_n^T / (w_Tn^2 - w^2 - i w g_Tn) to the
+    high-frequency tensor, d_n being the unit vector at polar_angle theta_n
+    from z and azimuthal_angle phi_n from x (in degrees). The parameters in the
+    "oscillator_materials" group of material_params.json read
+
+        "high_freq": {"xx": 3.75, "yy": 3.21, "zz": 3.71, "xy": -0.08},
+        "oscillators": {"amplitude": [...], "omega_tn": [...], "gamma_tn": [...],
+                        "polar_angle": [...], "azimuthal_angle": [...]}
+
+    where omitted high_freq entries are 1 on the diagonal and 0 elsewhere, and
+    a number gives an isotropic high_freq. The six independent components share
+    one oscillator evaluation, contracted with the [6, oscillators] matrix of
+    the d_i d_j projections by the dispersion engine.
+    """
+
+    COMPONENTS = ("xx", "yy", "zz", "xy", "xz", "yz")
+    OSCILLATOR_KEYS = ("amplitude", "omega_tn", "gamma_tn", "polar_angle", "azimuthal_angle")
+
+    def __init__(self, material_type, freq_min=None, freq_max=None, mu_r=1.0):
         super().__init__()
-        params = load_material_parameters()["monoclinic_materials"]["gallium_oxide"]
-        self.name = params["name"]
-        self.mu_r = mu_r  # NEW: Store magnetic permeability
+        params = load_material_parameters()["oscillator_materials"][material_type]
+        self.name = params.get("name", "Unnamed Material")
+        self.material_type = material_type
+        self.dispersion_key = ("oscillator_materials", material_type)
+        self.mu_r = mu_r
+        self._check_parameters(params["parameters"])
         self._initialize_frequency_range(params, freq_min, freq_max)
 
+    def _check_parameters(self, parameters):
+        """Raise a ValueError for parameters the dispersion_components cannot read."""
+        high_freq = parameters.get("high_freq", 1.0)
+        if isinstance(high_freq, Mapping):
+            unknown = set(high_freq) - set(self.COMPONENTS)
+            if unknown:
+                raise ValueError(f"{self.name} has unknown high_freq components {', '.join(sorted(unknown))}")
+        oscillators = parameters.get("oscillators", {})
+        missing = [key for key in self.OSCILLATOR_KEYS if key not in oscillators]
+        if missing:
+            raise ValueError(f"{self.name} oscillators need {', '.join(missing)}")
+        lengths = {len(np.atleast_1d(oscillators[key])) for key in self.OSCILLATOR_KEYS}
+        if len(lengths) > 1:
+            raise ValueError(f"{self.name} oscillators must give {', '.join(self.OSCILLATOR_KEYS)} for every mode")
+
     @run_on_device
     def permittivity_parameters(self):
-        """Get Gallium Oxide permittivity parameters."""
-        return load_material_parameters()["monoclinic_materials"]["gallium_oxide"]["parameters"]
+        """Get permittivity parameters from configuration."""
+        return material_parameter_tensors("oscillator_materials", self.material_type)
 
-    def _create_permittivity_tensor(self, eps_xx, eps_yy, eps_zz, eps_xy):
-        """Create the full permittivity tensor."""
+    def dispersion_components(self):
+        """The xx, yy, zz, xy, xz and yz components, as sums over the same oscillators."""
+        parameters = self.permittivity_parameters()
+        oscillators = parameters["oscillators"]
+        high_freq = parameters.get("high_freq", tf.constant(1.0, dtype=tf.complex128))
+
+        polar = oscillators["polar_angle"] * np.pi / 180.0
+        azimuthal = oscillators["azimuthal_angle"] * np.pi / 180.0
+        direction = {
+            "x": tf.sin(polar) * tf.cos(azimuthal),
+            "y": tf.sin(polar) * tf.sin(azimuthal),
+            "z": tf.cos(polar),
+        }
+
+        components = []
+        for component in self.COMPONENTS:
+            if isinstance(high_freq, Mapping):
+                default = 1.0 if component[0] == component[1] else 0.0
+                component_high_freq = high_freq.get(component, default)
+            else:
+                component_high_freq = high_freq if component[0] == component[1] else 0.0
+            weight = direction[component[0]] * direction[component[1]]
+            components.append(
+                (SUM, {"high_freq": component_high_freq, "oscillators": oscillators, "weight": weight})
+            )
+        return components
+
+    def assemble_permittivity_tensor(self, components):
+        """Create the symmetric [..., 3, 3] tensor from [..., 6] xx, yy, zz, xy, xz and yz components."""
+        eps_xx, eps_yy, eps_zz, eps_xy, eps_xz, eps_yz = tf.unstack(components, axis=-1)
         return tf.stack(
             [
-                [eps_xx, eps_xy, tf.zeros_like(eps_xx)],
-                [eps_xy, eps_yy, tf.zeros_like(eps_xx)],
-                [tf.zeros_like(eps_xx), tf.zeros_like(eps_xx), eps_zz]
+                tf.stack([eps_xx, eps_xy, eps_xz], axis=-1),
+                tf.stack([eps_xy, eps_yy, eps_yz], axis=-1),
+                tf.stack([eps_xz, eps_yz, eps_zz], axis=-1),
             ],
-            axis=-1,
+            axis=-2,
         )
 
-    @run_on_device
-    def permittivity_calc(self):
-        """Calculate all permittivity components."""
-        parameters = self.permittivity_parameters()
-        frequency = self.frequency[:, tf.newaxis]
-        
-        eps_xx_bu, eps_xy_bu, eps_yy_bu = self._calculate_bu_components(parameters, frequency)
-        eps_zz_au = self._calculate_au_component(parameters, frequency)
-
-        eps_xx = parameters["Bu"]["high_freq"]["xx"] + eps_xx_bu
-        eps_xy = parameters["Bu"]["high_freq"]["xy"] + eps_xy_bu
-        eps_yy = parameters["Bu"]["high_freq"]["yy"] + eps_yy_bu
-        eps_zz = parameters["Au"]["high_freq"] + eps_zz_au
-
-        return eps_xx, eps_yy, eps_zz, eps_xy
-
     @run_on_device
     def fetch_permittivity_tensor(self):
         """Get the full permittivity tensor."""
-        eps_xx, eps_yy, eps_zz, eps_xy = self.permittivity_calc()
-        tensor = self._create_permittivity_tensor(eps_xx, eps_yy, eps_zz, eps_xy)
-        return tf.transpose(tensor, perm=[1, 2, 0])
+        return permittivity_tensors([self], self.frequency)[0]
 
     @run_on_device
     def fetch_permittivity_tensor_for_freq(self, requested_frequency):
-        """Get permittivity tensor for a specific frequency."""
-        parameters = self.permittivity_parameters()
-        frequency = tf.constant([[requested_frequency]], dtype=tf.complex128)
-        
-        eps_xx_bu, eps_xy_bu, eps_yy_bu = self._calculate_bu_components(parameters, frequency)
-        eps_zz_au = self._calculate_au_component(parameters, frequency)
-
-        eps_xx = parameters["Bu"]["high_freq"]["xx"] + eps_xx_bu[0]
-        eps_xy = parameters["Bu"]["high_freq"]["xy"] + eps_xy_bu[0]
-        eps_yy = parameters["Bu"]["high_freq"]["yy"] + eps_yy_bu[0]
-        eps_zz = parameters["Au"]["high_freq"] + eps_zz_au[0]
-
-        return self._create_permittivity_tensor(eps_xx, eps_yy, eps_zz, eps_xy)
+        """Get permittivity tensor for a frequency, or a tensor of frequencies of any shape."""
+        return permittivity_tensors([self], requested_frequency)[0]
 
 class ArbitraryMaterial(BaseMaterial):
     """Material with arbitrary permittivity and permeability tensor components."""
@@ -389,6 +493,95 @@ class ArbitraryMaterial(BaseMaterial):
         """Return frequency-independent magnetic tensor."""
         return self.fetch_magnetic_tensor()
 
+class TabulatedMaterial(BaseMaterial):
+    """
+    Material with measured permittivity, and optionally permeability, tensors
+    interpolated from a table file; see hyperbolic_optics.tabulated for the
+    layouts. The default frequency range is that of the table.
+    """
+
+    def __init__(self, table, frequency=None, interpolation="linear", mu_r=1.0,
+                 run_on_device_decorator=run_on_device):
+        """
+        Args:
+            table (str or Path): An .npz or .npy table file.
+            frequency (list or str, optional): The frequencies of an .npy table,
+                or the path of an .npy file holding them.
+            interpolation (str): "linear" or "cubic".
+            mu_r (complex): Isotropic permeability, for tables without one.
+        """
+        super().__init__(run_on_device_decorator=run_on_device_decorator)
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Interpolation must be one of {', '.join(INTERPOLATIONS)}, not {interpolation!r}")
+        self.table = load_table(table, frequency)
+        self.interpolation = interpolation
+        self.name = Path(table).stem
+        self.mu_r = mu_r
+        nodes = self.table["frequency"]
+        self._initialize_frequency_range(
+            {"frequency_range": {"default_min": float(nodes[0]), "default_max": float(nodes[-1])}}
+        )
+
+    @classmethod
+    def from_material_data(cls, material_data):
+        """Create the material from layer data such as {"table": "ellipsometry.npz", "interpolation": "cubic"}."""
+        unknown = set(material_data) - {"table", "frequency", "interpolation", "mu_r"}
+        if unknown:
+            raise ValueError(f"Unknown tabulated material keys {', '.join(sorted(unknown))}")
+        return cls(
+            material_data["table"],
+            frequency=material_data.get("frequency"),
+            interpolation=material_data.get("interpolation", "linear"),
+            mu_r=material_data.get("mu_r", 1.0),
+        )
+
+    def _interpolate(self, names, frequency):
+        """Interpolate tabulated tensors onto frequencies of any shape, with one set of weights."""
+        frequency = to_complex128(frequency)
+        nodes = self.table["frequency"]
+        tables = [self.table[name] for name in names]
+
+        def interpolate(requested):
+            return interpolate_tables(nodes, tables, np.real(requested), self.interpolation)
+
+        if tf.executing_eagerly():
+            return [tf.constant(tensor, dtype=tf.complex128) for tensor in interpolate(frequency.numpy())]
+        # Compiled graphs read the table when they run
+        tensors = tf.numpy_function(interpolate, [frequency], [tf.complex128] * len(names), stateful=False)
+        for tensor in tensors:
+            tensor.set_shape(frequency.shape.concatenate([3, 3]))
+        return tensors
+
+    @run_on_device
+    def fetch_permittivity_tensor(self):
+        """Interpolate the permittivity tensor onto the frequency range."""
+        return self.fetch_permittivity_tensor_for_freq(self.frequency)
+
+    @run_on_device
+    def fetch_permittivity_tensor_for_freq(self, requested_frequency):
+        """Interpolate the permittivity tensor onto a frequency, or a tensor of frequencies of any shape."""
+        return self._interpolate(["permittivity"], requested_frequency)[0]
+
+    @run_on_device
+    def fetch_magnetic_tensor(self):
+        """Interpolate the permeability tensor onto the frequency range, or return mu_r."""
+        return self.fetch_magnetic_tensor_for_freq(self.frequency)
+
+    @run_on_device
+    def fetch_magnetic_tensor_for_freq(self, requested_frequency):
+        """Interpolate the permeability tensor onto the given frequencies, or return the [3, 3] mu_r tensor."""
+        if self.table["permeability"] is None:
+            return self.isotropic_magnetic_tensor()
+        return self._interpolate(["permeability"], requested_frequency)[0]
+
+    @run_on_device
+    def fetch_tensors_for_freq(self, requested_frequency):
+        """Interpolate both tables from one set of rows and weights, or pair the permittivity with mu_r."""
+        if self.table["permeability"] is None:
+            return self.fetch_permittivity_tensor_for_freq(requested_frequency), self.isotropic_magnetic_tensor()
+        eps_tensor, mu_tensor = self._interpolate(["permittivity", "permeability"], requested_frequency)
+        return eps_tensor, mu_tensor
+
 class IsotropicMaterial(BaseMaterial):
     """Base class for isotropic materials like air."""
     
@@ -412,9 +605,16 @@ class IsotropicMaterial(BaseMaterial):
             return complex(permittivity)
         return permittivity
     
+    @staticmethod
+    def _diagonal_tensor(value):
+        """[..., 3, 3] diagonal tensor from a tensor of values, e.g. a batch of points."""
+        return to_complex128(value)[..., tf.newaxis, tf.newaxis] * tf.eye(3, dtype=tf.complex128)
+
     @run_on_device
     def construct_tensor_singular(self):
         """Create diagonal tensor with permittivity value."""
+        if tf.is_tensor(self.permittivity):
+            return self._diagonal_tensor(self.permittivity)
         return tf.constant(
             [[self.permittivity, 0.0, 0.0],
              [0.0, self.permittivity, 0.0],
@@ -436,6 +636,8 @@ class IsotropicMaterial(BaseMaterial):
     @run_on_device
     def fetch_magnetic_tensor(self):
         """Get magnetic tensor for isotropic material."""
+        if tf.is_tensor(self.permeability):
+            return self._diagonal_tensor(self.permeability)
         return tf.constant(
             [[self.permeability, 0.0, 0.0],
              [0.0, self.permeability, 0.0],
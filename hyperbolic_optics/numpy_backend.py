@@ -0,0 +1,569 @@
+"""
+NumPy backend for the transfer matrix pipeline.
+
+Executes the same payloads as Structure.execute for the Incident, Azimuthal,
+Dispersion, Simple, Points and Volume scenarios using only NumPy, so it can run in processes that
+never import TensorFlow. Every quantity is laid out directly on the output grid:
+
+- Incident: (frequency, incident angle)
+- Azimuthal: (frequency, azimuthal angle)
+- Dispersion: (incident angle, azimuthal angle)
+- Simple: scalar
+- Points: (point,)
+- Volume: (frequency, incident angle, azimuthal angle)
+
+and smaller arrays broadcast against it, which replaces the per-mode reshapes
+and permutations of the TensorFlow Wave class. Partial waves are always found
+with the general eigen-decomposition and sorted exactly as Wave does.
+"""
+
+import math as m
+from collections.abc import Mapping
+
+import numpy as np
+
+from hyperbolic_optics.grids import (
+    AZIMUTHAL_ANGLE_GRID,
+    DEFAULT_FREQUENCY_POINTS,
+    DISPERSION_AZIMUTHAL_ANGLE_GRID,
+    DISPERSION_INCIDENT_ANGLE_GRID,
+    INCIDENT_ANGLE_GRID,
+    VOLUME_AZIMUTHAL_ANGLE_GRID,
+    VOLUME_INCIDENT_ANGLE_GRID,
+    angle_grid,
+    axis_grid,
+    has_range,
+    is_grid_spec,
+    scattered_points,
+)
+from hyperbolic_optics.material_params import default_frequency_range, load_material_parameters, registered_material
+from hyperbolic_optics.tabulated import INTERPOLATIONS, interpolate_tables, load_table
+
+def _to_complex(value):
+    """Convert the payload formats of a tensor component to a complex number."""
+    if value is None:
+        return complex(0, 0)
+    if isinstance(value, dict):
+        return complex(value.get("real", 0), value.get("imag", 0))
+    if isinstance(value, str):
+        try:
+            return complex(value.replace(" ", ""))
+        except ValueError:
+            return complex(0, 0)
+    return complex(value)
+
+
+def _diagonal_tensor(xx, yy, zz):
+    """Stack diagonal components of any broadcastable shape into [..., 3, 3]."""
+    xx, yy, zz = np.broadcast_arrays(xx, yy, zz)
+    tensor = np.zeros(xx.shape + (3, 3), dtype=np.complex128)
+    tensor[..., 0, 0] = xx
+    tensor[..., 1, 1] = yy
+    tensor[..., 2, 2] = zz
+    return tensor
+
+
+def _uniaxial_permittivity(frequency, high_freq, omega_tn, gamma_tn, omega_ln, gamma_ln):
+    """Factorised Lorentz permittivity along one axis of a uniaxial crystal."""
+    frequency = np.asarray(frequency, dtype=np.complex128)[..., np.newaxis]
+    top_line = np.asarray(omega_ln) ** 2.0 - frequency ** 2.0 - 1j * frequency * np.asarray(gamma_ln)
+    bottom_line = np.asarray(omega_tn) ** 2.0 - frequency ** 2.0 - 1j * frequency * np.asarray(gamma_tn)
+    return high_freq * np.prod(top_line / bottom_line, axis=-1)
+
+
+def _monoclinic_permittivity(frequency, parameters):
+    """Permittivity tensor of Gallium Oxide from its Bu and Au oscillators."""
+    frequency = np.asarray(frequency, dtype=np.complex128)[..., np.newaxis]
+    bu = parameters["Bu"]
+    au = parameters["Au"]
+
+    partial_bu = np.asarray(bu["amplitude"]) ** 2.0 / (
+        np.asarray(bu["omega_tn"]) ** 2.0 - frequency ** 2.0 - 1j * frequency * np.asarray(bu["gamma_tn"])
+    )
+    alpha = np.radians(np.asarray(bu["alpha_tn"], dtype=np.float64))
+    partial_au = np.asarray(au["amplitude"]) ** 2.0 / (
+        np.asarray(au["omega_tn"]) ** 2.0 - frequency ** 2.0 - 1j * frequency * np.asarray(au["gamma_tn"])
+    )
+
+    eps_xx = bu["high_freq"]["xx"] + np.sum(partial_bu * np.cos(alpha) ** 2.0, axis=-1)
+    eps_xy = bu["high_freq"]["xy"] + np.sum(partial_bu * np.sin(alpha) * np.cos(alpha), axis=-1)
+    eps_yy = bu["high_freq"]["yy"] + np.sum(partial_bu * np.sin(alpha) ** 2.0, axis=-1)
+    eps_zz = au["high_freq"] + np.sum(partial_au, axis=-1)
+
+    tensor = _diagonal_tensor(eps_xx, eps_yy, eps_zz)
+    tensor[..., 0, 1] = eps_xy
+    tensor[..., 1, 0] = eps_xy
+    return tensor
+
+
+def _oscillator_permittivity(frequency, parameters):
+    """Permittivity tensor of an OscillatorMaterial from its oriented oscillators."""
+    frequency = np.asarray(frequency, dtype=np.complex128)[..., np.newaxis]
+    oscillators = parameters["oscillators"]
+    partial = np.asarray(oscillators["amplitude"]) ** 2.0 / (
+        np.asarray(oscillators["omega_tn"]) ** 2.0 - frequency ** 2.0
+        - 1j * frequency * np.asarray(oscillators["gamma_tn"])
+    )
+    polar = np.radians(np.asarray(oscillators["polar_angle"], dtype=np.float64))
+    azimuthal = np.radians(np.asarray(oscillators["azimuthal_angle"], dtype=np.float64))
+    # [3, oscillators] unit directions
+    direction = np.stack([np.sin(polar) * np.cos(azimuthal), np.sin(polar) * np.sin(azimuthal), np.cos(polar)])
+
+    high_freq = parameters.get("high_freq", 1.0)
+    if isinstance(high_freq, Mapping):
+        high_freq_tensor = np.eye(3, dtype=np.complex128)
+        for component, value in high_freq.items():
+            i, j = "xyz".index(component[0]), "xyz".index(component[1])
+            high_freq_tensor[i, j] = high_freq_tensor[j, i] = value
+    else:
+        high_freq_tensor = complex(high_freq) * np.eye(3, dtype=np.complex128)
+    return high_freq_tensor + np.einsum("...n,in,jn->...ij", partial, direction, direction)
+
+
+def _tabulated_tensors(material, frequency=None):
+    """Permittivity and permeability of a tabulated material, as TabulatedMaterial interpolates them."""
+    unknown = set(material) - {"table", "frequency", "interpolation", "mu_r"}
+    if unknown:
+        raise ValueError(f"Unknown tabulated material keys {', '.join(sorted(unknown))}")
+    interpolation = material.get("interpolation", "linear")
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Interpolation must be one of {', '.join(INTERPOLATIONS)}, not {interpolation!r}")
+    table = load_table(material["table"], material.get("frequency"))
+    if frequency is None:
+        frequency = axis_grid(None, table["frequency"][0], table["frequency"][-1], DEFAULT_FREQUENCY_POINTS)
+    if table["permeability"] is not None:
+        return tuple(interpolate_tables(
+            table["frequency"], [table["permittivity"], table["permeability"]], frequency, interpolation
+        ))
+    eps = interpolate_tables(table["frequency"], [table["permittivity"]], frequency, interpolation)[0]
+    mu = np.broadcast_to(complex(material.get("mu_r", 1.0)) * np.eye(3, dtype=np.complex128), eps.shape)
+    return eps, mu
+
+
+def material_tensors(material, frequency=None):
+    """
+    Permittivity and permeability tensors of a layer material.
+
+    Args:
+        material (str or dict): Material name or arbitrary tensor components.
+        frequency (float or np.ndarray, optional): Frequencies in cm^-1. Named
+            materials use their default frequency grid when omitted.
+
+    Returns:
+        tuple: (eps_tensor, mu_tensor), each of shape [..., 3, 3].
+    """
+    if isinstance(material, dict) and "table" in material:
+        return _tabulated_tensors(material, frequency)
+    if isinstance(material, dict):
+        eps = np.array(
+            [
+                [material.get("eps_xx", 1.0), material.get("eps_xy", 0.0), material.get("eps_xz", 0.0)],
+                [material.get("eps_xy", 0.0), material.get("eps_yy", 1.0), material.get("eps_yz", 0.0)],
+                [material.get("eps_xz", 0.0), material.get("eps_yz", 0.0), material.get("eps_zz", 1.0)],
+            ],
+            dtype=object,
+        )
+        mu = np.array(
+            [
+                [material.get("mu_xx", 1.0), material.get("mu_xy", 0.0), material.get("mu_xz", 0.0)],
+                [material.get("mu_xy", 0.0), material.get("mu_yy", 1.0), material.get("mu_yz", 0.0)],
+                [material.get("mu_xz", 0.0), material.get("mu_yz", 0.0), material.get("mu_zz", 1.0)],
+            ],
+            dtype=object,
+        )
+        eps = np.vectorize(_to_complex, otypes=[np.complex128])(eps)
+        mu = np.vectorize(_to_complex, otypes=[np.complex128])(mu)
+        if "mu_r" in material:
+            mu_r = _to_complex(material["mu_r"])
+            mu[0, 0] = mu[1, 1] = mu[2, 2] = mu_r
+        return eps, mu
+
+    entry = registered_material(material)
+    parameters = load_material_parameters()[entry["group"]][entry["key"]]["parameters"]
+    if frequency is None:
+        frequency = axis_grid(None, *default_frequency_range(entry), DEFAULT_FREQUENCY_POINTS)
+    if entry["group"] == "uniaxial_materials":
+        eps_ext = _uniaxial_permittivity(frequency, **parameters["extraordinary"])
+        eps_ord = _uniaxial_permittivity(frequency, **parameters["ordinary"])
+        eps = _diagonal_tensor(eps_ord, eps_ord, eps_ext)
+    elif entry["group"] == "monoclinic_materials":
+        eps = _monoclinic_permittivity(frequency, parameters)
+    elif entry["group"] == "oscillator_materials":
+        eps = _oscillator_permittivity(frequency, parameters)
+    else:
+        raise NotImplementedError(f"Material {material} is in group {entry['group']}, which has no material model")
+
+    return eps, np.broadcast_to(np.eye(3, dtype=np.complex128), eps.shape)
+
+
+def rotation_matrix(theta, phi, beta):
+    """Rotation Rz(beta) Ry(phi) Rx(theta) for broadcastable angle arrays."""
+    theta, phi, beta = np.broadcast_arrays(
+        np.asarray(theta, dtype=np.float64), np.asarray(phi, dtype=np.float64), np.asarray(beta, dtype=np.float64)
+    )
+    ones, zeros = np.ones_like(theta), np.zeros_like(theta)
+    rotation_x = np.stack(
+        [
+            np.stack([ones, zeros, zeros], axis=-1),
+            np.stack([zeros, np.cos(theta), -np.sin(theta)], axis=-1),
+            np.stack([zeros, np.sin(theta), np.cos(theta)], axis=-1),
+        ],
+        axis=-2,
+    )
+    rotation_y = np.stack(
+        [
+            np.stack([np.cos(phi), zeros, np.sin(phi)], axis=-1),
+            np.stack([zeros, ones, zeros], axis=-1),
+            np.stack([-np.sin(phi), zeros, np.cos(phi)], axis=-1),
+        ],
+        axis=-2,
+    )
+    rotation_z = np.stack(
+        [
+            np.stack([np.cos(beta), -np.sin(beta), zeros], axis=-1),
+            np.stack([np.sin(beta), np.cos(beta), zeros], axis=-1),
+            np.stack([zeros, zeros, ones], axis=-1),
+        ],
+        axis=-2,
+    )
+    return rotation_z @ rotation_y @ rotation_x
+
+
+def rotate_tensor(tensor, rotation):
+    """Rotate a [..., 3, 3] tensor, broadcasting the batch axes of both."""
+    return rotation @ tensor @ np.swapaxes(rotation, -1, -2)
+
+
+class NumpyScenario:
+    """NumPy counterpart of ScenarioSetup, with angles in radians."""
+
+    def __init__(self, data):
+        self.type = data.get("type")
+        self.incident_angle = data.get("incidentAngle", None)
+        self.azimuthal_angle = data.get("azimuthal_angle", None)
+        self.frequency = data.get("frequency", None)
+
+        self.frequency_spec = None
+        if self.type == "Incident":
+            self.incident_angle = angle_grid(self.incident_angle, INCIDENT_ANGLE_GRID, grazing=True)
+            self._frequency_grid()
+        elif self.type == "Azimuthal":
+            self.incident_angle = np.radians(np.float64(self.incident_angle))
+            self.azimuthal_angle = angle_grid(self.azimuthal_angle, AZIMUTHAL_ANGLE_GRID)
+            self._frequency_grid()
+        elif self.type == "Dispersion":
+            self.incident_angle = angle_grid(self.incident_angle, DISPERSION_INCIDENT_ANGLE_GRID, grazing=True)
+            self.azimuthal_angle = angle_grid(self.azimuthal_angle, DISPERSION_AZIMUTHAL_ANGLE_GRID)
+            self.frequency = np.float64(self.frequency)
+        elif self.type == "Simple":
+            self.incident_angle = np.radians(np.float64(self.incident_angle)) + 1.0e-15
+            self.azimuthal_angle = np.radians(np.float64(self.azimuthal_angle)) + 1.0e-15
+            self.frequency = np.float64(self.frequency)
+        elif self.type == "Points":
+            self.incident_angle, self.azimuthal_angle, self.frequency = scattered_points(
+                self.incident_angle, self.azimuthal_angle, self.frequency
+            )
+            self.incident_angle = self.incident_angle + 1.0e-15
+            self.azimuthal_angle = self.azimuthal_angle + 1.0e-15
+        elif self.type == "Volume":
+            self.incident_angle = angle_grid(self.incident_angle, VOLUME_INCIDENT_ANGLE_GRID, grazing=True)
+            self.azimuthal_angle = angle_grid(self.azimuthal_angle, VOLUME_AZIMUTHAL_ANGLE_GRID)
+            self._frequency_grid()
+        else:
+            raise NotImplementedError(f"Scenario type {self.type} not implemented")
+
+
+    def _frequency_grid(self):
+        """Frequencies from the payload grid spec, or None to use the material range."""
+        self.frequency_spec = self.frequency if is_grid_spec(self.frequency) else None
+        self.frequency = axis_grid(self.frequency_spec) if has_range(self.frequency_spec) else None
+
+    def grid_axes(self):
+        """Incident and azimuthal angles reshaped to broadcast over the output grid."""
+        if self.type == "Incident":
+            return self.incident_angle[np.newaxis, :], None
+        if self.type == "Azimuthal":
+            return self.incident_angle, self.azimuthal_angle[np.newaxis, :]
+        if self.type == "Dispersion":
+            return self.incident_angle[:, np.newaxis], self.azimuthal_angle[np.newaxis, :]
+        if self.type == "Volume":
+            return self.incident_angle[:, np.newaxis], self.azimuthal_angle[np.newaxis, np.newaxis, :]
+        return self.incident_angle, self.azimuthal_angle
+
+
+def berreman_matrix(k_x, eps, mu):
+    """The 4x4 Berreman matrix [..., 4, 4] for broadcastable k_x, eps and mu."""
+    e = lambda i, j: eps[..., i, j]
+    u = lambda i, j: mu[..., i, j]
+    k_x = np.asarray(k_x, dtype=np.complex128)
+    eps_22_inv = 1.0 / e(2, 2)
+    mu_22_inv = 1.0 / u(2, 2)
+    zeros = np.zeros_like(k_x * e(0, 0))
+
+    rows = [
+        [
+            -k_x * e(2, 0) * eps_22_inv,
+            k_x * (u(1, 2) * mu_22_inv - e(2, 1) * eps_22_inv),
+            u(1, 0) - u(1, 2) * u(2, 0) * mu_22_inv,
+            u(1, 1) - u(1, 2) * u(2, 1) * mu_22_inv - k_x ** 2 * eps_22_inv,
+        ],
+        [
+            zeros,
+            -k_x * u(0, 2) * mu_22_inv,
+            u(0, 2) * u(2, 0) * mu_22_inv - u(0, 0),
+            u(0, 2) * u(2, 1) * mu_22_inv - u(0, 1),
+        ],
+        [
+            e(1, 2) * e(2, 0) * eps_22_inv - e(1, 0),
+            k_x ** 2 * mu_22_inv - e(1, 1) + e(1, 2) * e(2, 1) * eps_22_inv,
+            -k_x * u(2, 0) * mu_22_inv,
+            k_x * (e(1, 2) * eps_22_inv - u(2, 1) * mu_22_inv),
+        ],
+        [
+            e(0, 0) - e(0, 2) * e(2, 0) * eps_22_inv,
+            e(0, 1) - e(0, 2) * e(2, 1) * eps_22_inv,
+            zeros,
+            -k_x * e(0, 2) * eps_22_inv,
+        ],
+    ]
+    return np.stack([np.stack(np.broadcast_arrays(*row), axis=-1) for row in rows], axis=-2)
+
+
+def _argsort(values, descending=False):
+    """Stable argsort along the last axis."""
+    return np.argsort(-values if descending else values, axis=-1, kind="stable")
+
+
+def _sort_by_poynting(k_z, fields, k_x, eps, mu):
+    """Order a pair of partial waves as Wave.sort_poynting_indices does."""
+    E_x, E_y, H_x, H_y = fields[..., 0, :], fields[..., 1, :], fields[..., 2, :], fields[..., 3, :]
+    k_x = k_x[..., np.newaxis]
+    E_z = (-1.0 / eps[..., 2, 2, np.newaxis]) * (
+        k_x * H_y + eps[..., 2, 0, np.newaxis] * E_x + eps[..., 2, 1, np.newaxis] * E_y
+    )
+    H_z = (1.0 / mu[..., 2, 2, np.newaxis]) * (
+        k_x * E_y - mu[..., 2, 0, np.newaxis] * H_x - mu[..., 2, 1, np.newaxis] * H_y
+    )
+    P_x = np.abs(E_y * H_z - E_z * H_y) ** 2
+    P_y = np.abs(E_z * H_x - E_x * H_z) ** 2
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        Cp_E = np.abs(E_x) ** 2 / (np.abs(E_x) ** 2 + np.abs(E_y) ** 2)
+        Cp_P = P_x / (P_x + P_y)
+
+    use_poynting = (np.abs(Cp_P[..., 1] - Cp_P[..., 0]) > 1e-6)[..., np.newaxis]
+    indices = np.where(use_poynting, _argsort(Cp_P, descending=True), _argsort(Cp_E))
+
+    k_z = np.take_along_axis(np.broadcast_to(k_z, indices.shape), indices, axis=-1)
+    fields = np.take_along_axis(fields, indices[..., np.newaxis, :], axis=-1)
+    return k_z, fields
+
+
+def partial_waves(k_x, eps, mu):
+    """
+    Transmitted and reflected partial waves of a layer.
+
+    Returns:
+        tuple: (k_z, fields) where k_z is [..., 4] and fields is [..., 4, 4] with
+            the (Ex, Ey, Hx, Hy) vector of each wave as a column; the first two
+            waves are transmitted and the last two reflected.
+    """
+    k_z, fields = np.linalg.eig(berreman_matrix(k_x, eps, mu))
+
+    # Per-element choice between the two orderings, as in Wave.wave_sorting
+    is_complex = np.abs(k_z.imag) > 1e-9
+    indices = np.where(is_complex, _argsort(k_z.imag, descending=True), _argsort(k_z.real, descending=True))
+    k_z = np.take_along_axis(k_z, indices, axis=-1)
+    fields = np.take_along_axis(fields, indices[..., np.newaxis, :], axis=-1)
+
+    k_x = np.asarray(k_x, dtype=np.complex128)
+    k_x = np.broadcast_to(k_x, np.broadcast_shapes(k_x.shape, eps.shape[:-2], mu.shape[:-2]))
+    k_z_t, fields_t = _sort_by_poynting(k_z[..., :2], fields[..., :2], k_x, eps, mu)
+    k_z_r, fields_r = _sort_by_poynting(k_z[..., 2:], fields[..., 2:], k_x, eps, mu)
+    return np.concatenate([k_z_t, k_z_r], axis=-1), np.concatenate([fields_t, fields_r], axis=-1)
+
+
+def layer_matrix(k_x, eps, mu, k_0=None, thickness=None):
+    """Transfer matrix of a finite layer, or the transmitted-wave matrix of a semi-infinite one."""
+    k_z, fields = partial_waves(k_x, eps, mu)
+    if thickness is None:
+        zeros = np.zeros_like(fields[..., 0])
+        return np.stack([fields[..., 0], zeros, fields[..., 1], zeros], axis=-1)
+
+    partial = np.exp(-1.0j * k_z * np.asarray(k_0)[..., np.newaxis] * thickness)
+    propagated = fields * partial[..., np.newaxis, :]
+    batch_shape = propagated.shape[:-2]
+    eigenvectors = np.broadcast_to(fields, batch_shape + (4, 4))
+    return np.swapaxes(
+        np.linalg.solve(np.swapaxes(eigenvectors, -1, -2), np.swapaxes(propagated, -1, -2)), -1, -2
+    )
+
+
+def prism_matrix(eps_prism, k_x):
+    """Matrix of the ambient incident medium, as AmbientIncidentMedium builds it."""
+    n = np.sqrt(eps_prism)
+    cos_theta = np.cos(np.arcsin(k_x / n))
+    zeros, ones = np.zeros_like(cos_theta), np.ones_like(cos_theta)
+    matrix = np.stack(
+        [
+            np.stack([zeros, ones, -1.0 / (n * cos_theta), zeros], axis=-1),
+            np.stack([zeros, ones, 1.0 / (n * cos_theta), zeros], axis=-1),
+            np.stack([1.0 / cos_theta, zeros, zeros, ones / n], axis=-1),
+            np.stack([-1.0 / cos_theta, zeros, zeros, ones / n], axis=-1),
+        ],
+        axis=-2,
+    )
+    return 0.5 * matrix.astype(np.complex128)
+
+
+def exit_matrix(incident_angle, eps_incident, eps_exit):
+    """Matrix of an isotropic semi-infinite exit medium, as AmbientExitMedium builds it."""
+    n_exit = np.sqrt(eps_exit)
+    cos_theta_f = np.sqrt(
+        (1.0 - (np.sqrt(eps_incident) / n_exit * np.sin(incident_angle)) ** 2.0).astype(np.complex128)
+    )
+    zeros, ones = np.zeros_like(cos_theta_f), np.ones_like(cos_theta_f)
+    return np.stack(
+        [
+            np.stack([zeros, zeros, cos_theta_f, -cos_theta_f], axis=-1),
+            np.stack([ones, ones, zeros, zeros], axis=-1),
+            np.stack([-n_exit * cos_theta_f, n_exit * cos_theta_f, zeros, zeros], axis=-1),
+            np.stack([zeros, zeros, n_exit * ones, n_exit * ones], axis=-1),
+        ],
+        axis=-2,
+    )
+
+
+class NumpyStructure:
+    """NumPy implementation of Structure, with the same result attributes."""
+
+    def __init__(self):
+        self.scenario = None
+        self.incident_angle = None
+        self.azimuthal_angle = None
+        self.frequency = None
+        self.eps_prism = None
+        self.k_x = None
+        self.k_0 = None
+        self.transfer_matrices = []
+        self.transfer_matrix = None
+        self.r_pp = None
+        self.r_ss = None
+        self.r_ps = None
+        self.r_sp = None
+
+    def get_frequency_range(self, last_layer):
+        """Get the frequency range based on the material of the last layer."""
+        material = last_layer["material"]
+        if isinstance(material, dict) and "table" in material:
+            nodes = load_table(material["table"], material.get("frequency"))["frequency"]
+            self.frequency = axis_grid(self.scenario.frequency_spec, nodes[0], nodes[-1], DEFAULT_FREQUENCY_POINTS)
+            return
+        if isinstance(material, dict):
+            raise NotImplementedError("Material not implemented")
+        self.frequency = axis_grid(
+            self.scenario.frequency_spec, *default_frequency_range(registered_material(material)), DEFAULT_FREQUENCY_POINTS
+        )
+
+    def layer_tensors(self, layer_data):
+        """Rotated permittivity and permeability tensors of a crystal layer on the output grid."""
+        scenario = self.scenario
+        if scenario.type in ("Incident", "Azimuthal", "Volume"):
+            eps, mu = material_tensors(layer_data["material"], self.frequency)
+        else:
+            eps, mu = material_tensors(layer_data["material"], scenario.frequency)
+
+        rotation_z = np.radians(np.float64(layer_data.get("rotationZ", 0))) + 1.0e-9
+        if scenario.type != "Incident":
+            _, azimuthal_angle = scenario.grid_axes()
+            if layer_data.get("rotationZType", "relative") == "relative":
+                rotation_z = azimuthal_angle + rotation_z
+
+        rotation = rotation_matrix(
+            np.radians(np.float64(layer_data.get("rotationX", 0))),
+            np.radians(np.float64(layer_data.get("rotationY", 0))) + 1.0e-8,
+            rotation_z,
+        )
+        if scenario.type in ("Incident", "Azimuthal") and eps.ndim > 2:
+            # Material frequencies run along the first output axis
+            eps, mu = eps[:, np.newaxis], mu[:, np.newaxis]
+        elif scenario.type == "Volume" and eps.ndim > 2:
+            eps, mu = eps[:, np.newaxis, np.newaxis], mu[:, np.newaxis, np.newaxis]
+        return rotate_tensor(eps, rotation), rotate_tensor(mu, rotation)
+
+    def layer_matrix(self, layer_data, k_x, k_0):
+        """Transfer matrix of one layer on the output grid."""
+        layer_type = layer_data.get("type")
+        thickness = layer_data.get("thickness", None)
+        thickness = None if thickness is None else float(thickness) * 1e-4
+
+        if layer_type == "Ambient Incident Layer":
+            return prism_matrix(np.float64(self.eps_prism), k_x)
+        if layer_type == "Isotropic Middle-Stack Layer":
+            permittivity = _to_complex(layer_data.get("permittivity", 1.0))
+            permeability = _to_complex(layer_data.get("permeability", 1.0))
+            eps = np.eye(3, dtype=np.complex128) * permittivity
+            mu = np.eye(3, dtype=np.complex128) * permeability
+            return layer_matrix(k_x, eps, mu, k_0, thickness)
+        if layer_type == "Crystal Layer":
+            eps, mu = self.layer_tensors(layer_data)
+            return layer_matrix(k_x, eps, mu, k_0, thickness)
+        if layer_type == "Semi Infinite Anisotropic Layer":
+            eps, mu = self.layer_tensors(layer_data)
+            return layer_matrix(k_x, eps, mu)
+        if layer_type == "Semi Infinite Isotropic Layer":
+            if layer_data.get("permittivity") is None:
+                raise ValueError("No exit permittivity provided for isotropic semi-infinite layer")
+            incident_angle, _ = self.scenario.grid_axes()
+            eps_incident = (k_x / np.sin(incident_angle)) ** 2
+            return exit_matrix(incident_angle, eps_incident, np.float64(layer_data["permittivity"]))
+        raise ValueError(f"Invalid layer type {layer_type}")
+
+    def calculate_reflectivity(self):
+        """Calculate the reflectivity for the given transfer matrix."""
+        t = self.transfer_matrix
+        bottom_line = t[..., 0, 0] * t[..., 2, 2] - t[..., 0, 2] * t[..., 2, 0]
+        self.r_pp = (t[..., 0, 0] * t[..., 3, 2] - t[..., 3, 0] * t[..., 0, 2]) / bottom_line
+        self.r_ps = (t[..., 0, 0] * t[..., 1, 2] - t[..., 1, 0] * t[..., 0, 2]) / bottom_line
+        self.r_sp = (t[..., 3, 0] * t[..., 2, 2] - t[..., 3, 2] * t[..., 2, 0]) / bottom_line
+        self.r_ss = (t[..., 1, 0] * t[..., 2, 2] - t[..., 1, 2] * t[..., 2, 0]) / bottom_line
+
+    def execute(self, payload):
+        """
+        Execute the calculation of reflectivity for the given scenario and layers.
+
+        Args:
+            payload (dict): A dictionary containing the scenario data and layers.
+        """
+        if payload.get("Sweep") is not None:
+            raise NotImplementedError("Sweeps are only supported by the tensorflow backend")
+        self.scenario = NumpyScenario(payload.get("ScenarioData"))
+        self.incident_angle = self.scenario.incident_angle
+        self.azimuthal_angle = self.scenario.azimuthal_angle
+        self.frequency = self.scenario.frequency
+
+        layer_data_list = payload.get("Layers", None)
+        self.eps_prism = layer_data_list[0].get("permittivity", None)
+        if self.frequency is None:
+            last_layer = layer_data_list[-1]
+            if last_layer.get("type") != "Semi Infinite Isotropic Layer":
+                self.get_frequency_range(last_layer)
+            else:
+                self.get_frequency_range(layer_data_list[-2])
+
+        incident_angle, _ = self.scenario.grid_axes()
+        self.k_x = np.sqrt(np.float64(self.eps_prism)) * np.sin(self.incident_angle)
+        self.k_0 = self.frequency * 2.0 * m.pi
+        k_x = np.sqrt(np.float64(self.eps_prism)) * np.sin(incident_angle)
+        k_0 = self.k_0
+        if self.scenario.type in ("Incident", "Azimuthal"):
+            k_0 = self.k_0[:, np.newaxis]
+        elif self.scenario.type == "Volume":
+            k_0 = self.k_0[:, np.newaxis, np.newaxis]
+
+        self.transfer_matrices = [self.layer_matrix(layer_data, k_x, k_0) for layer_data in layer_data_list]
+        self.transfer_matrix = self.transfer_matrices[0]
+        for matrix in self.transfer_matrices[1:]:
+            self.transfer_matrix = self.transfer_matrix @ matrix
+
+        self.calculate_reflectivity()
@@ -0,0 +1,305 @@
+"""
+Persistent on-disk cache of execution results, addressed by payload content.
+
+A result is stored under the SHA-256 of a canonical form of the payload: its
+ScenarioData, Layers and Sweep with keys sorted and every number written as a
+float, so that 45 and 45.0, or reordered keys, give the same entry. The key
+also covers the package version, the contents of material_params.json, the
+size and modification time of any material table files, and the options that
+change the numbers (backend, eigen and stack solver). Materials registered in
+code have no such content, so payloads that name them are not cached.
+
+Each entry is an uncompressed .npz file of complex128 coefficient arrays, in a
+two-level directory fan-out. Entries are written to a temporary file and
+renamed into place, so concurrent writers and readers in any number of
+processes only ever see complete files. Reads mark an entry as recently used,
+and after each write the least recently used entries are deleted until the
+cache is within its size and entry limits.
+
+    cache = ResultCache(max_bytes=500e6)
+    coefficients = cached_execute(payload, cache)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from collections.abc import Mapping
+from numbers import Real
+from pathlib import Path
+
+import numpy as np
+
+from hyperbolic_optics import __version__
+from hyperbolic_optics.backend import execute, get_backend
+from hyperbolic_optics.material_params import derived_cache
+
+REFLECTION_COEFFICIENTS = ("r_pp", "r_ss", "r_ps", "r_sp")
+TRANSMISSION_COEFFICIENTS = ("t_pp", "t_ss", "t_ps", "t_sp")
+
+# Payload entries that determine the result
+PAYLOAD_KEYS = ("ScenarioData", "Layers", "Sweep")
+
+# Structure options that change the numbers. The compiled and lazy_profiles
+# options, like the memory_budget argument of cached_execute, run lean, which
+# orders the transmitted waves of the exit layer as eager runs do, so both r_*
+# and t_* agree to rounding whichever is used; tests/test_transmission.py
+# compares them
+RESULT_OPTIONS = ("eigen_solver", "stack_solver")
+
+SUFFIX = ".npz"
+
+_material_digest = derived_cache()
+
+
+def default_directory():
+    """The HYPERBOLIC_OPTICS_CACHE_DIR environment variable, else the user cache directory."""
+    directory = os.environ.get("HYPERBOLIC_OPTICS_CACHE_DIR")
+    if directory:
+        return Path(directory)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "hyperbolic_optics"
+
+
+def material_parameters_digest():
+    """SHA-256 of material_params.json, recomputed after invalidate_material_parameters."""
+    if "digest" not in _material_digest:
+        path = Path(__file__).parent / "material_params.json"
+        _material_digest["digest"] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return _material_digest["digest"]
+
+
+def table_stamps(payload):
+    """Size and modification time of the material table files a payload reads, by absolute path."""
+    stamps = {}
+    for layer in payload.get("Layers") or []:
+        material = layer.get("material")
+        if not isinstance(material, Mapping) or "table" not in material:
+            continue
+        for path in (material["table"], material.get("frequency")):
+            if isinstance(path, (str, os.PathLike)):
+                status = os.stat(path)
+                stamps[os.path.abspath(path)] = [status.st_size, status.st_mtime_ns]
+    return stamps
+
+
+def canonical(value):
+    """
+    Normalise a payload value for hashing: mappings become dicts, sequences and
+    arrays become lists, and numbers other than booleans become floats.
+    """
+    if isinstance(value, Mapping):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [canonical(item) for item in value]
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, Real):
+        return float(value)
+    raise ValueError(f"Cannot hash payload value {value!r} of type {type(value).__name__}")
+
+
+def code_registered_materials(payload, backend=None):
+    """
+    Names of the materials registered in code (material_registry.register_material)
+    that a payload uses with the TensorFlow backend. Their factories have no
+    content the key could cover, so such payloads are not cached.
+    """
+    if (get_backend() if backend is None else backend) != "tensorflow":
+        return []
+    from hyperbolic_optics.material_registry import is_registered
+
+    names = [layer.get("material") for layer in payload.get("Layers") or []]
+    return [name for name in names if isinstance(name, str) and is_registered(name)]
+
+
+def payload_key(payload, backend=None, **options):
+    """
+    Cache key of a payload executed with a backend and structure options.
+
+    Args:
+        payload (dict or str): The payload or its JSON string.
+        backend (str, optional): The backend; the process default when omitted.
+        **options: Structure options. Only those in RESULT_OPTIONS enter the key.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest.
+    """
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    document = {
+        "payload": canonical({name: payload[name] for name in PAYLOAD_KEYS if payload.get(name) is not None}),
+        "options": canonical({name: options[name] for name in RESULT_OPTIONS if name in options}),
+        "backend": get_backend() if backend is None else backend,
+        "version": __version__,
+        "materials": material_parameters_digest(),
+    }
+    tables = table_stamps(payload)
+    if tables:
+        document["tables"] = tables
+    text = json.dumps(document, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    A directory of cached results with least-recently-used eviction.
+
+    Attributes:
+        hits (int): Number of get calls answered from disk by this instance.
+        misses (int): Number of get calls that found no entry.
+    """
+
+    def __init__(self, directory=None, max_bytes=2**30, max_entries=None):
+        """
+        Open, and create if needed, a cache directory.
+
+        Args:
+            directory (str or Path, optional): Where entries are stored; see
+                default_directory.
+            max_bytes (int, optional): Total size the entries are evicted down
+                to; None for no limit.
+            max_entries (int, optional): Number of entries they are evicted down
+                to; None for no limit.
+        """
+        self.directory = Path(directory) if directory is not None else default_directory()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        """File of the entry with the given key."""
+        return self.directory / key[:2] / (key + SUFFIX)
+
+    def get(self, key):
+        """
+        Return the cached arrays of a key as a dict, or None when there is no
+        usable entry. A hit marks the entry as recently used.
+        """
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            os.utime(path)
+        except FileNotFoundError:
+            # Never written, or evicted by another process meanwhile
+            self.misses += 1
+            return None
+        except (OSError, ValueError, zipfile.BadZipFile):
+            # Unreadable entry, e.g. from a disk that filled up; recompute it
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return arrays
+
+    def put(self, key, arrays):
+        """Store a dict of arrays under a key, replacing any previous entry, then evict."""
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=SUFFIX)
+        try:
+            with os.fdopen(handle, "wb") as file:
+                np.savez(file, **{name: np.asarray(value) for name, value in arrays.items()})
+            os.replace(temporary, path)
+        except BaseException:
+            self._remove(temporary)
+            raise
+        self.evict()
+
+    def entries(self):
+        """List (last use, size, path) of every entry, least recently used first."""
+        entries = []
+        for path in self.directory.glob("*/*" + SUFFIX):
+            if path.name.startswith("."):
+                continue
+            try:
+                status = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Delete least recently used entries until the cache is within its limits."""
+        if self.max_bytes is None and self.max_entries is None:
+            return
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            within_bytes = self.max_bytes is None or total <= self.max_bytes
+            within_entries = self.max_entries is None or count <= self.max_entries
+            if within_bytes and within_entries:
+                break
+            self._remove(path)
+            total -= size
+            count -= 1
+
+    def clear(self):
+        """Delete every entry."""
+        for _, _, path in self.entries():
+            self._remove(path)
+
+    def __len__(self):
+        return len(self.entries())
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def cached_execute(payload, cache=None, backend=None, transmission=False, memory_budget=None, **options):
+    """
+    Return the coefficients of a payload, from the cache when it holds them.
+    Payloads naming materials registered in code are always executed, and not
+    stored.
+
+    Args:
+        payload (dict or str): The payload or its JSON string.
+        cache (ResultCache, optional): The cache; one in default_directory when
+            omitted.
+        backend (str, optional): "tensorflow" or "numpy".
+        transmission (bool): Also compute and store the transmission
+            coefficients (TensorFlow backend).
+        memory_budget (int, optional): Memory budget of Structure.execute, in
+            bytes; it does not enter the key (TensorFlow backend).
+        **options: Keyword arguments for the structure.
+
+    Returns:
+        dict: Complex NumPy arrays of r_pp, r_ss, r_ps and r_sp, and of t_pp,
+            t_ss, t_ps and t_sp with transmission.
+
+    Raises:
+        ValueError: When transmission is requested from the NumPy backend.
+    """
+    if transmission and (get_backend() if backend is None else backend) == "numpy":
+        raise ValueError("Transmission coefficients are only computed by the tensorflow backend")
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    cache = ResultCache() if cache is None else cache
+    names = REFLECTION_COEFFICIENTS + (TRANSMISSION_COEFFICIENTS if transmission else ())
+    cacheable = not code_registered_materials(payload, backend)
+    key = payload_key(payload, backend, **options) if cacheable else None
+
+    if cacheable:
+        arrays = cache.get(key)
+        if arrays is not None and all(name in arrays for name in names):
+            return arrays
+
+    structure = execute(payload, backend, memory_budget, **options)
+    if transmission:
+        structure.calculate_transmissivity()
+    arrays = {name: np.asarray(getattr(structure, name)) for name in names}
+    if cacheable:
+        cache.put(key, arrays)
+    return arrays
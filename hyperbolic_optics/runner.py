@@ -0,0 +1,260 @@
+"""
+Parallel execution of many payloads on a pool of worker processes.
+
+PayloadRunner spreads payloads over worker processes. Each worker limits its
+TensorFlow (and OpenMP/BLAS) thread pools, so that the cores are shared out by
+the workers instead of contended by every worker's intra-op threads. Results
+stream back as payloads complete, in input order or in completion order, and
+the runner keeps throughput statistics:
+
+    with PayloadRunner(workers=8) as runner:
+        for result in runner.imap(payloads, ordered=False):
+            r_pp = result.value["r_pp"]
+        print(runner.stats.report())
+
+Workers are started with the "spawn" method, because forking a process in which
+TensorFlow is already initialised can deadlock. Scripts that use the runner
+must therefore guard their entry point with if __name__ == "__main__". Like
+hyperbolic_optics.backend, importing this module does not import TensorFlow.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+
+from hyperbolic_optics.backend import execute, get_backend
+
+# Environment variables read by the thread pools of the numerical libraries
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+)
+
+COEFFICIENTS = ("r_pp", "r_ss", "r_ps", "r_sp")
+
+# Settings of the current worker process, filled in by _init_worker
+_worker = {}
+
+
+def available_cores():
+    """Number of cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def reflection_coefficients(structure):
+    """Default result of a payload: its reflection coefficients as NumPy arrays."""
+    import numpy as np
+
+    return {name: np.asarray(getattr(structure, name)) for name in COEFFICIENTS}
+
+
+def limit_threads(threads, backend):
+    """
+    Limit the thread pools of the current process to the given number of threads.
+
+    TensorFlow only accepts the limits before it runs its first operation, so
+    this is called when a worker starts.
+    """
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    if backend == "tensorflow":
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+
+def _init_worker(backend, threads, structure_options, extract, warmup):
+    limit_threads(threads, backend)
+    _worker.update(backend=backend, structure_options=structure_options, extract=extract)
+    if warmup is not None:
+        _run_payload((None, warmup))
+
+
+def _run_payload(task):
+    index, payload = task
+    start = time.perf_counter()
+    try:
+        if isinstance(payload, (str, bytes)):
+            payload = json.loads(payload)
+        structure = execute(payload, _worker["backend"], **_worker["structure_options"])
+        value = _worker["extract"](structure)
+    except Exception as error:
+        raise RuntimeError(f"Payload {index} failed: {error!r}") from error
+    return PayloadResult(index, value, time.perf_counter() - start, os.getpid())
+
+
+class PayloadResult:
+    """
+    The result of one payload.
+
+    Attributes:
+        index (int): Position of the payload in the input.
+        value: What the extract function returned for the executed structure.
+        seconds (float): Time the worker spent on the payload.
+        worker (int): Process id of the worker.
+    """
+
+    __slots__ = ("index", "value", "seconds", "worker")
+
+    def __init__(self, index, value, seconds, worker):
+        self.index = index
+        self.value = value
+        self.seconds = seconds
+        self.worker = worker
+
+
+class RunnerStats:
+    """Throughput of one PayloadRunner.imap call, updated as results arrive."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.completed = 0
+        self.compute_seconds = 0.0
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def record(self, result):
+        """Count a completed payload."""
+        self.completed += 1
+        self.compute_seconds += result.seconds
+        self.elapsed = time.perf_counter() - self.start
+
+    @property
+    def throughput(self):
+        """Completed payloads per second of wall-clock time."""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def utilisation(self):
+        """Fraction of the wall-clock time the workers spent executing payloads."""
+        capacity = self.elapsed * self.workers
+        return self.compute_seconds / capacity if capacity > 0 else 0.0
+
+    def report(self):
+        """One-line summary of the run."""
+        return (
+            f"{self.completed} payloads in {self.elapsed:.2f}s, {self.throughput:.2f} payloads/s "
+            f"on {self.workers} workers ({self.utilisation:.0%} busy)"
+        )
+
+
+class PayloadRunner:
+    """
+    A pool of worker processes that execute payloads.
+
+    The pool is started on construction and kept warm until close, so several
+    imap and submit calls share the workers, and per-process caches such as
+    material parameters and the graphs of compiled structures.
+    """
+
+    def __init__(self, workers=None, threads_per_worker=None, backend=None, extract=reflection_coefficients,
+                 warmup=None, **structure_options):
+        """
+        Start the worker processes.
+
+        Args:
+            workers (int, optional): Number of worker processes; one per
+                available core by default.
+            threads_per_worker (int, optional): Thread pool size of each worker;
+                the available cores divided among the workers by default.
+            backend (str, optional): "tensorflow" or "numpy"; the process default
+                when omitted.
+            extract (callable, optional): Turns an executed structure into the
+                value sent back to the caller. It must be picklable, e.g. a module
+                level function. Returns the reflection coefficients by default.
+            warmup (dict or str, optional): A payload every worker executes once
+                when it starts, so that the first real payload does not pay for
+                loading the TensorFlow kernels.
+            **structure_options: Keyword arguments for the structure of every
+                payload, e.g. compiled=True or lazy_profiles=True.
+        """
+        cores = available_cores()
+        self.workers = workers or cores
+        if self.workers < 1:
+            raise ValueError("A runner needs at least one worker")
+        self.threads_per_worker = threads_per_worker or max(1, cores // self.workers)
+        self.backend = get_backend() if backend is None else backend
+        self.stats = RunnerStats(self.workers)
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self.backend, self.threads_per_worker, structure_options, extract, warmup),
+        )
+
+    def imap(self, payloads, ordered=True, chunksize=1):
+        """
+        Execute payloads and yield a PayloadResult for each as it completes.
+
+        Args:
+            payloads (iterable): Payload dicts, or their JSON strings, which are
+                cheaper to send to the workers.
+            ordered (bool): Yield the results in input order. Otherwise they are
+                yielded as soon as they complete, and PayloadResult.index tells
+                them apart.
+            chunksize (int): Number of payloads sent to a worker at a time. Larger
+                chunks cut the messaging overhead of many small payloads.
+
+        Raises:
+            RuntimeError: When a payload fails; the message names its index.
+        """
+        self.stats = RunnerStats(self.workers)
+        mapper = self._pool.imap if ordered else self._pool.imap_unordered
+        for result in mapper(_run_payload, enumerate(payloads), chunksize):
+            self.stats.record(result)
+            yield result
+
+    def submit(self, payload, callback=None, error_callback=None, index=0):
+        """
+        Execute one payload without waiting for it.
+
+        Args:
+            payload (dict or str): The payload or its JSON string.
+            callback (callable, optional): Called with the PayloadResult.
+            error_callback (callable, optional): Called with the RuntimeError
+                when the payload fails.
+            index (int): Index reported in the PayloadResult and error message.
+
+        Returns:
+            multiprocessing.pool.AsyncResult: Handle whose get() returns the
+                PayloadResult. Callbacks run on a thread of the pool and should
+                return quickly. Submitted payloads do not count towards stats.
+        """
+        return self._pool.apply_async(
+            _run_payload, ((index, payload),), callback=callback, error_callback=error_callback
+        )
+
+    def map(self, payloads, chunksize=1):
+        """Execute payloads and return the list of their values in input order."""
+        return [result.value for result in self.imap(payloads, ordered=True, chunksize=chunksize)]
+
+    def close(self):
+        """Let the workers finish their current payloads and stop them."""
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self):
+        """Stop the workers immediately."""
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+
+def run_payloads(payloads, workers=None, threads_per_worker=None, backend=None, chunksize=1, **structure_options):
+    """Execute payloads on a temporary PayloadRunner and return their reflection coefficients in input order."""
+    with PayloadRunner(workers, threads_per_worker, backend, **structure_options) as runner:
+        return runner.map(payloads, chunksize)
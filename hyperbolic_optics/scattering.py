@@ -0,0 +1,161 @@
+"""
+Scattering-matrix (S-matrix) solver for a layer stack.
+
+The transfer-matrix product multiplies V exp(-i k_z k_0 d) V^-1 for every finite
+layer, so at large k_x or for thick, lossy layers the growing exponentials of the
+partial waves overflow or swamp the decaying ones. Here every layer is instead
+described by a scattering matrix that maps incoming to outgoing partial-wave
+amplitudes, which only ever contains the decaying exponentials, and the layers
+are combined with the Redheffer star product.
+
+Amplitudes are ordered (down 0, down 1, up 0, up 1). In the prism the two waves
+of each pair are the s and p polarisations, in a finite layer they are its
+transmitted and reflected partial waves, and in the semi-infinite exit medium
+only the two transmitted (down) waves exist. Each scattering matrix is kept as
+its four [..., 2, 2] blocks (S11, S12, S21, S22): S11 reflects waves coming from
+above, S21 transmits them, S12 and S22 do the same for waves coming from below.
+"""
+
+import functools
+
+import tensorflow as tf
+
+# Rows of the prism matrix holding the incident (s, p) and reflected (s, p) amplitudes
+PRISM_AMPLITUDE_ORDER = [0, 2, 1, 3]
+
+# Columns of a semi-infinite layer matrix holding the transmitted fields
+EXIT_FIELD_COLUMNS = [0, 2]
+
+
+def inverse_2x2(matrix):
+    """Closed-form inverse of a batch of [..., 2, 2] matrices."""
+    a, b = matrix[..., 0, 0], matrix[..., 0, 1]
+    c, d = matrix[..., 1, 0], matrix[..., 1, 1]
+    determinant = a * d - b * c
+    inverse = tf.stack([tf.stack([d, -b], axis=-1), tf.stack([-c, a], axis=-1)], axis=-2)
+    return inverse / determinant[..., tf.newaxis, tf.newaxis]
+
+
+def solve(matrix, rhs):
+    """
+    Solve matrix @ x = rhs with broadcasting batch axes.
+
+    Uses a QR factorization and a triangular solve, like Wave.get_matrix, so the
+    solver also compiles under XLA.
+    """
+    orthogonal, upper = tf.linalg.qr(matrix)
+    return tf.linalg.triangular_solve(
+        upper, tf.linalg.matmul(orthogonal, rhs, adjoint_a=True), lower=False
+    )
+
+
+def interface_scattering_matrix(coupling):
+    """
+    Scattering matrix of an interface from its amplitude coupling matrix.
+
+    Args:
+        coupling (tf.Tensor): Q = V_above^-1 V_below, mapping the amplitudes
+            below the interface to those above it, [..., 4, 4]. For the exit
+            medium only the down columns [..., 4, 2] are needed.
+
+    Returns:
+        tuple: The (S11, S12, S21, S22) blocks. S12 and S22 are zero when only
+            the down columns are given, as nothing enters from the exit medium.
+    """
+    q11, q21 = coupling[..., :2, :2], coupling[..., 2:, :2]
+    q11_inverse = inverse_2x2(q11)
+    s11 = tf.linalg.matmul(q21, q11_inverse)
+
+    if coupling.shape[-1] == 2:
+        return s11, tf.zeros_like(s11), q11_inverse, tf.zeros_like(s11)
+
+    q12, q22 = coupling[..., :2, 2:], coupling[..., 2:, 2:]
+    s12 = q22 - tf.linalg.matmul(s11, q12)
+    s22 = -tf.linalg.matmul(q11_inverse, q12)
+    return s11, s12, q11_inverse, s22
+
+
+def propagation_scattering_matrix(phases):
+    """
+    Scattering matrix of the propagation across a finite layer.
+
+    Args:
+        phases (tf.Tensor): Exponents -i k_z k_0 d of the (transmitted,
+            reflected) partial waves, [..., 4].
+
+    Returns:
+        tuple: The (S11, S12, S21, S22) blocks. Down waves pick up
+            exp(+i k_z k_0 d) and up waves exp(-i k_z k_0 d), both of which
+            decay or keep their magnitude.
+    """
+    s12 = tf.linalg.diag(tf.exp(phases[..., 2:]))
+    s21 = tf.linalg.diag(tf.exp(-phases[..., :2]))
+    return tf.zeros_like(s12), s12, s21, tf.zeros_like(s12)
+
+
+def redheffer_star_product(upper, lower):
+    """
+    Combine the scattering matrices of two stacked sections.
+
+    Args:
+        upper (tuple): (S11, S12, S21, S22) blocks of the section above.
+        lower (tuple): (S11, S12, S21, S22) blocks of the section below.
+
+    Returns:
+        tuple: The (S11, S12, S21, S22) blocks of the combined section.
+    """
+    a11, a12, a21, a22 = upper
+    b11, b12, b21, b22 = lower
+    identity = tf.eye(2, dtype=a11.dtype)
+    matmul = tf.linalg.matmul
+
+    # Sums of the multiple reflections between the two sections
+    lower_loop = inverse_2x2(identity - matmul(b11, a22))
+    upper_loop = inverse_2x2(identity - matmul(a22, b11))
+
+    s11 = a11 + matmul(a12, matmul(lower_loop, matmul(b11, a21)))
+    s12 = matmul(a12, matmul(lower_loop, b12))
+    s21 = matmul(b21, matmul(upper_loop, a21))
+    s22 = b22 + matmul(b21, matmul(upper_loop, matmul(a22, b12)))
+    return s11, s12, s21, s22
+
+
+def stack_scattering_matrix(layers):
+    """
+    Scattering matrix of a layer stack from the prism to the exit medium.
+
+    Args:
+        layers (list): Created layers. The first is the prism, whose matrix maps
+            fields to incident and reflected amplitudes; finite layers provide
+            modes = (eigenvectors, phases); the last layer is semi-infinite and
+            its matrix holds the transmitted fields in columns 0 and 2.
+
+    Returns:
+        tuple: The (S11, S21) blocks. S11 maps the incident (s, p) amplitudes to
+            the reflected (s, p) amplitudes; S21 maps them to the amplitudes of
+            the two transmitted waves of the exit medium.
+    """
+    if layers[-1].modes is not None:
+        raise ValueError("The scattering stack solver requires a semi-infinite exit layer")
+
+    # V^-1 of the prism is its matrix, reordered to (incident s, p, reflected s, p)
+    prism_inverse = tf.gather(layers[0].matrix, PRISM_AMPLITUDE_ORDER, axis=-2)
+    above = None
+
+    def coupling(below):
+        if above is None:
+            return tf.linalg.matmul(prism_inverse, below)
+        return solve(above, below)
+
+    sections = []
+    for layer in layers[1:-1]:
+        eigenvectors, phases = layer.modes
+        sections.append(interface_scattering_matrix(coupling(eigenvectors)))
+        sections.append(propagation_scattering_matrix(phases))
+        above = eigenvectors
+
+    exit_fields = tf.gather(layers[-1].matrix, EXIT_FIELD_COLUMNS, axis=-1)
+    sections.append(interface_scattering_matrix(coupling(exit_fields)))
+
+    s11, _, s21, _ = functools.reduce(redheffer_star_product, sections)
+    return s11, s21
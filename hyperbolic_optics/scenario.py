@@ -6,22 +6,57 @@ Used for construction of four scenarios:
 2. Frequency vs. Azimuthal Rotation
 3. Dispersion at a given frequency
 4. Simple - Single incident angle, orientation, and frequency
+5. Points - Flat lists of (incident angle, orientation, frequency) points
+6. Volume - Frequency vs. Incident Angle vs. Azimuthal Rotation
+
+The swept axes take a grid spec from the payload (see hyperbolic_optics.grids);
+single numbers given for a swept axis are ignored.
 """
 
 from abc import ABC
-import math as m
-import tensorflow as tf
+import copy
+
+from hyperbolic_optics.grids import (
+    AZIMUTHAL_ANGLE_GRID,
+    DISPERSION_AZIMUTHAL_ANGLE_GRID,
+    DISPERSION_INCIDENT_ANGLE_GRID,
+    INCIDENT_ANGLE_GRID,
+    VOLUME_AZIMUTHAL_ANGLE_GRID,
+    VOLUME_INCIDENT_ANGLE_GRID,
+    angle_grid,
+    axis_grid,
+    has_range,
+    is_grid_spec,
+    scattered_points,
+)
+from hyperbolic_optics.tensor_utils import to_float64, to_radians
 
 
 class ScenarioSetup(ABC):
     """
     Abstract class for a scenario setup
     """
+
+    # Attributes that execution can split into chunks together, and the axis of
+    # the output grid they run along
+    CHUNK_AXES = {
+        "Incident": (("incident_angle",), 1),
+        "Azimuthal": (("azimuthal_angle",), 1),
+        "Dispersion": (("incident_angle",), 0),
+        "Points": (("incident_angle", "azimuthal_angle", "frequency"), 0),
+    }
+
+    # Axes of the Volume output grid, in order; it is chunked along the longest
+    VOLUME_AXES = ("frequency", "incident_angle", "azimuthal_angle")
+
     def __init__(self, data):
         self.type = data.get("type")
         self.incident_angle = data.get("incidentAngle", None)
         self.azimuthal_angle = data.get("azimuthal_angle", None)
         self.frequency = data.get("frequency", None)
+        # Frequency grid spec of the Incident and Azimuthal scenarios; when it has
+        # no range the structure samples the substrate material's default range
+        self.frequency_spec = None
         self.create_scenario()
 
     def create_scenario(self):
@@ -36,49 +71,103 @@ class ScenarioSetup(ABC):
             self.create_dispersion_scenario()
         elif self.type == 'Simple':
             self.create_simple_scenario()
+        elif self.type == 'Points':
+            self.create_points_scenario()
+        elif self.type == 'Volume':
+            self.create_volume_scenario()
         else:
             raise NotImplementedError(f"Scenario type {self.type} not implemented")
 
+    @staticmethod
+    def angle_grid(spec, default_grid, grazing=False):
+        """Angles in radians from a payload grid spec, in degrees, or the default grid."""
+        return to_float64(angle_grid(spec, default_grid, grazing))
+
+    def create_frequency_grid(self):
+        """
+        Creates the frequency grid of a scenario that sweeps frequency
+        """
+        self.frequency_spec = self.frequency if is_grid_spec(self.frequency) else None
+        if has_range(self.frequency_spec):
+            self.frequency = to_float64(axis_grid(self.frequency_spec))
+        else:
+            self.frequency = None
+
     def create_incident_scenario(self):
         """
         Creates the incident scenario
         """
-        self.incident_angle = tf.linspace(
-            tf.constant(-m.pi/2. + 1.e-9, dtype=tf.float64),
-            tf.constant(m.pi/2. - 1.e-9, dtype=tf.float64),
-            360)
+        self.incident_angle = self.angle_grid(self.incident_angle, INCIDENT_ANGLE_GRID, grazing=True)
+        self.create_frequency_grid()
 
     def create_azimuthal_scenario(self):
         """
         Creates the azimuthal scenario
         """
-        self.incident_angle = tf.cast(m.radians((self.incident_angle)), dtype = tf.float64)
-        self.azimuthal_angle = tf.linspace(
-            tf.constant(0. + 1.e-15, dtype=tf.float64),
-            tf.constant(2. * m.pi - 1.e-15, dtype=tf.float64),
-            360)
+        self.incident_angle = to_radians(self.incident_angle)
+        self.azimuthal_angle = self.angle_grid(self.azimuthal_angle, AZIMUTHAL_ANGLE_GRID)
+        self.create_frequency_grid()
 
     def create_dispersion_scenario(self):
         """
         Creates the dispersion scenario
         """
-        self.incident_angle = tf.linspace(
-            tf.constant(0. + 1.e-8, dtype=tf.float64),
-            tf.constant(m.pi/2. - 1.e-8, dtype=tf.float64),
-            180)
-
-        self.azimuthal_angle = tf.linspace(
-            tf.constant(1.e-5, dtype=tf.float64),
-            tf.constant(2. * m.pi - 1.e-5, dtype=tf.float64),
-            480)
-
-        self.frequency = float(self.frequency)
+        self.incident_angle = self.angle_grid(self.incident_angle, DISPERSION_INCIDENT_ANGLE_GRID, grazing=True)
+        self.azimuthal_angle = self.angle_grid(self.azimuthal_angle, DISPERSION_AZIMUTHAL_ANGLE_GRID)
+        self.frequency = to_float64(self.frequency)
 
     def create_simple_scenario(self):
         """
         Creates the simple scenario - single values for all parameters
         """
         # Convert to scalar tensors for consistency
-        self.incident_angle = tf.cast(m.radians(self.incident_angle) + 1.e-15, dtype=tf.float64)
-        self.azimuthal_angle = tf.cast(m.radians(self.azimuthal_angle) + 1.e-15, dtype=tf.float64)
-        self.frequency = float(self.frequency)
\ No newline at end of file
+        self.incident_angle = to_radians(self.incident_angle) + 1.e-15
+        self.azimuthal_angle = to_radians(self.azimuthal_angle) + 1.e-15
+        self.frequency = to_float64(self.frequency)
+
+    def create_points_scenario(self):
+        """
+        Creates the points scenario - one value of every parameter per point,
+        evaluated together and returned in the order given
+        """
+        incident_angle, azimuthal_angle, frequency = scattered_points(
+            self.incident_angle, self.azimuthal_angle, self.frequency
+        )
+        self.incident_angle = to_float64(incident_angle) + 1.e-15
+        self.azimuthal_angle = to_float64(azimuthal_angle) + 1.e-15
+        self.frequency = to_float64(frequency)
+
+    def create_volume_scenario(self):
+        """
+        Creates the volume scenario - every combination of frequency, incident
+        angle and azimuthal angle
+        """
+        self.incident_angle = self.angle_grid(self.incident_angle, VOLUME_INCIDENT_ANGLE_GRID, grazing=True)
+        self.azimuthal_angle = self.angle_grid(self.azimuthal_angle, VOLUME_AZIMUTHAL_ANGLE_GRID)
+        self.create_frequency_grid()
+
+    def chunk_axis(self):
+        """
+        Attributes that execution can split into chunks, and the output axis they
+        run along, or None when the scenario cannot be chunked. The Volume
+        frequency grid must be resolved first.
+        """
+        if self.type == "Volume":
+            lengths = [int(getattr(self, attribute).shape[0]) for attribute in self.VOLUME_AXES]
+            axis = lengths.index(max(lengths))
+            return (self.VOLUME_AXES[axis],), axis
+        return self.CHUNK_AXES.get(self.type)
+
+    def select(self, start, stop):
+        """
+        Return a copy of the scenario restricted to one chunk of its chunk axis.
+
+        Args:
+            start (int): First index of the chunk.
+            stop (int): One past the last index of the chunk.
+        """
+        attributes, _ = self.chunk_axis()
+        chunk = copy.copy(self)
+        for attribute in attributes:
+            setattr(chunk, attribute, getattr(self, attribute)[start:stop])
+        return chunk
@@ -0,0 +1,334 @@
+"""
+Local simulation service: payloads over HTTP/JSON, executed by warm workers.
+
+    python -m hyperbolic_optics.service --port 8000 --workers 4
+
+The service keeps a PayloadRunner pool whose workers have loaded TensorFlow
+and run a warm-up payload before the first request arrives. Endpoints:
+
+- POST /execute takes a payload and returns its reflection coefficients, each
+  as {"real": [...], "imag": [...]} in the layout of the scenario.
+- GET /stats returns request counts, queue depth, batching and latency
+  percentiles.
+- GET /health returns {"status": "ok"}.
+
+Simple payloads that arrive within batch_window of each other and share their
+layers are coalesced into one Points payload, evaluated in a single pass, and
+split back into per-request results. At most max_pending requests are queued or
+running; further requests are rejected with 503 and a Retry-After header until
+the queue drains. The service can also be used in process through
+SimulationService.execute, without HTTP.
+"""
+
+import argparse
+import collections
+import json
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from numbers import Real
+
+import numpy as np
+
+from hyperbolic_optics.runner import PayloadRunner
+
+# Executed once by every worker when it starts, so that the first request does
+# not pay for loading the eigen-decomposition kernels
+WARMUP_PAYLOAD = {
+    "ScenarioData": {"type": "Points", "incidentAngle": [30.0, 60.0], "azimuthal_angle": 0.0, "frequency": 460.0},
+    "Layers": [
+        {"type": "Ambient Incident Layer", "permittivity": 12.5},
+        {"type": "Isotropic Middle-Stack Layer", "thickness": 0.5},
+        {"type": "Semi Infinite Anisotropic Layer", "material": "Quartz", "rotationX": 0, "rotationY": 90,
+         "rotationZ": 0},
+    ],
+}
+
+SIMPLE_VALUES = ("incidentAngle", "azimuthal_angle", "frequency")
+
+PERCENTILES = (50, 90, 99)
+
+
+class ServiceBusy(Exception):
+    """Raised when the service already holds max_pending requests."""
+
+
+def batch_key(payload):
+    """
+    Key under which a payload can be batched with others, or None.
+
+    Simple payloads with numeric angles and frequency are batched with those
+    that have identical layers.
+    """
+    scenario = payload.get("ScenarioData")
+    if not isinstance(scenario, dict) or scenario.get("type") != "Simple" or payload.get("Sweep") is not None:
+        return None
+    for name in SIMPLE_VALUES:
+        value = scenario.get(name)
+        if not isinstance(value, Real) or isinstance(value, bool):
+            return None
+    return json.dumps(payload.get("Layers"), sort_keys=True)
+
+
+def encode_result(value):
+    """Reflection coefficients as JSON-ready {"real": ..., "imag": ...} entries."""
+    encoded = {}
+    for name, array in value.items():
+        array = np.asarray(array)
+        encoded[name] = {"real": array.real.tolist(), "imag": array.imag.tolist()}
+    return encoded
+
+
+class SimulationService:
+    """
+    Executes payloads on a warm worker pool, batching concurrent Simple payloads
+    and bounding the number of queued requests.
+    """
+
+    def __init__(self, workers=None, threads_per_worker=None, backend=None, max_pending=256, batch_window=0.005,
+                 max_batch=512, latency_window=10000, **structure_options):
+        """
+        Start the worker pool.
+
+        Args:
+            workers (int, optional): Number of worker processes.
+            threads_per_worker (int, optional): Thread pool size of each worker.
+            backend (str, optional): "tensorflow" or "numpy".
+            max_pending (int): Most requests queued or running at once.
+            batch_window (float): Seconds a Simple payload waits for others to
+                batch with. Zero disables batching.
+            max_batch (int): Most Simple payloads evaluated in one batch.
+            latency_window (int): Number of recent requests the latency
+                percentiles are computed over.
+            **structure_options: Keyword arguments for the structure of every
+                payload, as for PayloadRunner.
+        """
+        if max_pending < 1 or max_batch < 1:
+            raise ValueError("max_pending and max_batch must be at least one")
+        self.max_pending = max_pending
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.runner = PayloadRunner(workers, threads_per_worker, backend, warmup=WARMUP_PAYLOAD, **structure_options)
+
+        self._lock = threading.Lock()
+        self._batches = {}
+        self._pending = 0
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._counts = collections.Counter()
+
+    def submit(self, payload):
+        """
+        Queue a payload for execution.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the reflection coefficients of
+                the payload, or to the RuntimeError raised when it fails.
+
+        Raises:
+            ServiceBusy: When max_pending requests are already queued or running.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counts["rejected"] += 1
+                raise ServiceBusy(f"{self._pending} requests pending, retry later")
+            self._pending += 1
+
+        start = time.perf_counter()
+        future = Future()
+        future.add_done_callback(lambda done: self._finished(done, start))
+
+        key = batch_key(payload) if self.batch_window > 0 else None
+        if key is None:
+            self._run([payload], [future])
+        else:
+            self._add_to_batch(key, payload, future)
+        return future
+
+    def execute(self, payload, timeout=None):
+        """Execute a payload and return its reflection coefficients."""
+        return self.submit(payload).result(timeout)
+
+    def _finished(self, future, start):
+        with self._lock:
+            self._pending -= 1
+            self._counts["failed" if future.exception() else "completed"] += 1
+            self._latencies.append(time.perf_counter() - start)
+
+    def _add_to_batch(self, key, payload, future):
+        with self._lock:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = []
+                timer = threading.Timer(self.batch_window, self._flush, (key, batch))
+                timer.daemon = True
+                timer.start()
+            batch.append((payload, future))
+            full = len(batch) >= self.max_batch
+        if full:
+            self._flush(key, batch)
+
+    def _flush(self, key, batch):
+        with self._lock:
+            # The timer of a batch that was already flushed when it filled up
+            if self._batches.get(key) is not batch:
+                return
+            del self._batches[key]
+        payloads, futures = zip(*batch)
+        self._run(payloads, futures)
+
+    def _run(self, payloads, futures):
+        """Execute one payload, or several Simple payloads as one Points payload."""
+        if len(payloads) == 1:
+            payload = payloads[0]
+        else:
+            scenarios = [payload["ScenarioData"] for payload in payloads]
+            payload = {
+                "ScenarioData": {"type": "Points", **{
+                    name: [scenario[name] for scenario in scenarios] for name in SIMPLE_VALUES
+                }},
+                "Layers": payloads[0]["Layers"],
+            }
+        with self._lock:
+            self._counts["batches"] += 1
+            self._counts["batched"] += len(payloads)
+
+        def deliver(result):
+            if len(futures) == 1:
+                futures[0].set_result(result.value)
+                return
+            for index, future in enumerate(futures):
+                future.set_result({name: array[index] for name, array in result.value.items()})
+
+        def fail(error):
+            for future in futures:
+                future.set_exception(error)
+
+        self.runner.submit(payload, callback=deliver, error_callback=fail)
+
+    def stats(self):
+        """Request counts, queue depth, batching and latency percentiles in milliseconds."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1e3
+            counts = dict(self._counts)
+            pending = self._pending
+        batches = counts.get("batches", 0)
+        stats = {
+            "workers": self.runner.workers,
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "completed": counts.get("completed", 0),
+            "failed": counts.get("failed", 0),
+            "rejected": counts.get("rejected", 0),
+            "evaluations": batches,
+            "mean_batch_size": counts.get("batched", 0) / batches if batches else 0.0,
+        }
+        for percentile in PERCENTILES:
+            value = float(np.percentile(latencies, percentile)) if latencies.size else None
+            stats[f"latency_p{percentile}_ms"] = value
+        stats["latency_max_ms"] = float(latencies.max()) if latencies.size else None
+        return stats
+
+    def close(self):
+        """Stop the workers once the queued payloads are done."""
+        self.runner.close()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of the SimulationService held by the server."""
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self.send_json(200, self.server.service.stats())
+        else:
+            self.send_json(404, {"error": f"No endpoint {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/execute":
+            self.send_json(404, {"error": f"No endpoint {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            if not isinstance(payload, dict):
+                raise ValueError("The payload must be a JSON object")
+        except ValueError as error:
+            self.send_json(400, {"error": f"Invalid payload: {error}"})
+            return
+
+        try:
+            future = self.server.service.submit(payload)
+        except ServiceBusy as error:
+            self.send_json(503, {"error": str(error)}, {"Retry-After": "1"})
+            return
+        try:
+            result = future.result(self.server.request_timeout)
+        except FutureTimeoutError:
+            self.send_json(504, {"error": "Payload did not complete in time"})
+        except RuntimeError as error:
+            # Execution errors come from the payload, e.g. an unknown material
+            self.send_json(400, {"error": str(error)})
+        else:
+            self.send_json(200, encode_result(result))
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Request logging would dominate the output under load; see /stats instead
+        pass
+
+
+def make_server(service, host="127.0.0.1", port=8000, request_timeout=300.0):
+    """
+    Create an HTTP server in front of a service. Port 0 picks a free port,
+    available as server.server_address[1]. Call serve_forever to run it.
+    """
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.request_timeout = request_timeout
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads-per-worker", type=int)
+    parser.add_argument("--backend", choices=["tensorflow", "numpy"])
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--batch-window", type=float, default=5.0, help="milliseconds")
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--compiled", action="store_true", help="run payloads as cached graphs")
+    args = parser.parse_args()
+
+    options = {"compiled": True} if args.compiled else {}
+    service = SimulationService(
+        args.workers, args.threads_per_worker, args.backend, args.max_pending, args.batch_window / 1e3,
+        args.max_batch, **options,
+    )
+    server = make_server(service, args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {service.runner.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,103 @@ import functools
 import operator
 import tensorflow as tf
 
-from hyperbolic_optics.materials import CalciteUpper, Quartz, Sapphire, GalliumOxide
+from hyperbolic_optics.material_registry import get_material
+from hyperbolic_optics.materials import TabulatedMaterial
 
+from hyperbolic_optics.compilation import (
+    fill_payload,
+    get_compiled_function,
+    split_payload,
+    template_key,
+)
+from hyperbolic_optics.grids import axis_grid
 from hyperbolic_optics.layers import LayerFactory
+from hyperbolic_optics.scattering import stack_scattering_matrix
 from hyperbolic_optics.scenario import ScenarioSetup
+from hyperbolic_optics.sweeps import (
+    is_pointwise,
+    output_grid,
+    parse_sweep,
+    points_scenario,
+    pointwise_sweep,
+    sweep_axis,
+    sweep_shape,
+    swept_field,
+    swept_thickness,
+)
+from hyperbolic_optics.tensor_utils import to_float64
+
+# Structure attributes returned from a compiled execution
+COMPILED_OUTPUTS = (
+    "incident_angle",
+    "azimuthal_angle",
+    "frequency",
+    "eps_prism",
+    "k_x",
+    "k_0",
+    "transfer_matrix",
+    "scattering_matrix",
+    "r_pp",
+    "r_ss",
+    "r_ps",
+    "r_sp",
+)
+
+# Outputs stitched together after a chunked execution
+CHUNKED_OUTPUTS = ("transfer_matrix", "scattering_matrix", "r_pp", "r_ss", "r_ps", "r_sp")
+
+STACK_SOLVERS = ("transfer", "scattering")
+
+# Approximate peak memory per output grid point and layer during execution,
+# used to size chunks for a memory budget
+BYTES_PER_GRID_POINT_PER_LAYER = 1024
+
+# Memory budget in bytes applied to Volume grids when none is given
+VOLUME_MEMORY_BUDGET = 1e9
 
 
 class Structure:
     """Class for the structure of the optical system."""
 
-    def __init__(self):
+    def __init__(
+        self, eigen_solver="eig", compiled=False, jit_compile=False, lazy_profiles=False, stack_solver="transfer"
+    ):
+        """
+        Args:
+            eigen_solver (str): "eig" for the general eigen-decomposition of every
+                layer, or "analytic" to use closed-form partial waves for uniaxial
+                and isotropic layers. The path each layer took is reported in
+                eigen_solvers after execution.
+            compiled (bool): Run execute as a cached tf.function graph. Payloads
+                differing only in angles, frequency, thicknesses, rotations or
+                ambient permittivities reuse the same graph. Per-layer objects
+                are not kept, so layers stays empty.
+            jit_compile (bool): Additionally compile the graph with XLA. Only
+                used when compiled is True.
+            lazy_profiles (bool): Lean mode for reflectivity-only work. Layers
+                build their transfer matrix without a field profile, only sorting
+                the transmitted waves of a semi-infinite exit layer;
+                layer.profile is computed on first access instead.
+                Compiled and chunked runs keep no layers and are always lean.
+            stack_solver (str): "transfer" multiplies the 4x4 layer transfer
+                matrices. "scattering" combines layer scattering matrices with the
+                Redheffer star product, which stays stable for thick or lossy
+                layers at large k_x where the transfer matrices overflow; it
+                fills scattering_matrix instead of transfer_matrix and needs a
+                semi-infinite exit layer.
+        """
+        if stack_solver not in STACK_SOLVERS:
+            raise ValueError(f"Stack solver {stack_solver} not implemented")
+
         self.scenario = None
+        self.sweep = None
+        self.eigen_solver = eigen_solver
+        self.compiled = compiled
+        self.jit_compile = jit_compile
+        self.lazy_profiles = lazy_profiles
+        self.stack_solver = stack_solver
+        self.eigen_solvers = []
+        self.decoupled = False
         self.factory = LayerFactory()
         self.layers = []
         self.incident_angle = None
@@ -31,6 +117,7 @@ class Structure:
         self.r_ps = None
         self.r_sp = None
         self.transfer_matrix = None
+        self.scattering_matrix = None
 
     def get_scenario(self, scenario_data):
         """Get the scenario from the scenario_data."""
@@ -44,69 +131,158 @@ class Structure:
         self.frequency = self.scenario.frequency
 
     def get_frequency_range(self, last_layer):
-        """Get the frequency range based on the material of the last layer."""
+        """
+        Get the frequency grid over the default range of the last layer's material.
+
+        The scenario's frequency grid spec may set the number of points, the
+        spacing, or one end of the range.
+        """
         material = last_layer["material"]
 
-        if material == "Quartz":
-            self.frequency = Quartz().frequency
-        elif material == "Sapphire":
-            self.frequency = Sapphire().frequency
-        elif material == "Calcite":
-            self.frequency = CalciteUpper().frequency
-        elif material == "GalliumOxide":
-            self.frequency = GalliumOxide().frequency
-        else:
+        if isinstance(material, dict) and "table" in material:
+            material = TabulatedMaterial.from_material_data(material)
+        elif isinstance(material, dict):
             raise NotImplementedError("Material not implemented")
+        else:
+            material = get_material(material)
+
+        if material.frequency_range is None:
+            raise ValueError(f"Material {material.name} has no default frequency range; give the scenario a frequency")
+        freq_min, freq_max = material.frequency_range
+        self.frequency = to_float64(
+            axis_grid(self.scenario.frequency_spec, freq_min, freq_max, material.frequency_length)
+        )
 
     def calculate_kx_k0(self):
         """Calculate the k_x and k_0 values for the structure."""
-        self.k_x = tf.cast(
-            tf.sqrt(tf.cast(self.eps_prism, dtype=tf.float64))
-            * tf.sin(tf.cast(self.incident_angle, dtype=tf.float64)),
-            dtype=tf.float64,
-        )
+        self.k_x = tf.sqrt(to_float64(self.eps_prism)) * tf.sin(to_float64(self.incident_angle))
         self.k_0 = self.frequency * 2.0 * m.pi
 
-    def get_layers(self, layer_data_list):
-        """Create the layers from the layer_data_list."""
-        # First Layer is prism, so we parse it
-        self.eps_prism = layer_data_list[0].get("permittivity", None)
-        if not self.frequency:
+    def resolve_frequency(self, layer_data_list):
+        """
+        Use the frequency range of the substrate material when the scenario has
+        none, and share the grid with the scenario so that layers evaluate their
+        materials on it.
+        """
+        if self.frequency is None:
             last_layer = layer_data_list[-1]
             if last_layer.get("type") != "Semi Infinite Isotropic Layer":
                 self.get_frequency_range(last_layer)
             else:
                 self.get_frequency_range(layer_data_list[-2])
+            self.scenario.frequency = self.frequency
+
+    def get_layers(self, layer_data_list, lazy_profiles=None):
+        """
+        Create the layers from the layer_data_list.
+
+        Args:
+            layer_data_list (list): Layer data of the payload.
+            lazy_profiles (bool, optional): Overrides the structure's lean mode.
+        """
+        if lazy_profiles is None:
+            lazy_profiles = self.lazy_profiles
+
+        # First Layer is prism, so we parse it
+        prism_permittivity = layer_data_list[0].get("permittivity", None)
+        self.eps_prism = prism_permittivity
+        self.resolve_frequency(layer_data_list)
+        pointwise = pointwise_sweep(self.sweep)
+        if pointwise is not None and pointwise["layer"] == 0:
+            self.eps_prism = sweep_axis(pointwise["values"], len(to_float64(self.incident_angle).shape))
         self.calculate_kx_k0()
 
-        # Create prism layer and add it to layers list
-        self.layers.append(
-            self.factory.create_layer(
-                layer_data_list[0],
-                self.scenario,
-                self.k_x,
-                self.k_0,
-            )
+        points = None
+        if pointwise is not None:
+            points = self.get_sweep_points(prism_permittivity)
+
+        # Create the layers, starting with the prism, and add them to layers list
+        for index, layer_data in enumerate(layer_data_list):
+            self.layers.append(self.build_layer(index, layer_data, points, lazy_profiles))
+
+        self.eigen_solvers = [layer.eigen_solver for layer in self.layers]
+        self.decoupled = all(layer.decoupled for layer in self.layers)
+
+    def build_layer(self, index, layer_data, points, lazy_profiles):
+        """
+        Create one layer of the stack.
+
+        Args:
+            index (int): Position of the layer, the prism being 0.
+            layer_data (dict): Layer data of the payload.
+            points (tuple or None): What get_sweep_points returned, when sweeping
+                a field other than thickness.
+            lazy_profiles (bool): Lean mode of the layer.
+        """
+        scenario, k_x, k_0 = self.scenario, self.k_x, self.k_0
+        field = swept_field(self.sweep, index)
+        if is_pointwise(self.sweep, index):
+            scenario, k_x, k_0, values, grid_shape = points
+            if field is not None:
+                layer_data = dict(layer_data, **{field: values})
+        elif field == "thickness":
+            # Thickness sweep along a leading axis of the propagation phases
+            grid_rank = len(output_grid(self.scenario)[3])
+            layer_data = dict(layer_data, thickness=swept_thickness(self.sweep, index, grid_rank))
+
+        layer = self.factory.create_layer(
+            layer_data,
+            scenario,
+            k_x,
+            k_0,
+            self.eigen_solver,
+            lazy_profiles,
+            self.stack_solver,
         )
+        if is_pointwise(self.sweep, index):
+            layer.reshape_points(grid_shape)
+        return layer
 
-        # Create the rest of the layers and add them to layers list
-        for layer_data in layer_data_list[1:]:
-            self.layers.append(
-                self.factory.create_layer(
-                    layer_data,
-                    self.scenario,
-                    self.k_x,
-                    self.k_0,
-                )
-            )
+    def get_sweep_points(self, prism_permittivity):
+        """
+        Flatten the sweep and the output grid into points for the layers whose
+        partial waves change along the sweep.
+
+        Returns:
+            tuple: The points scenario, its k_x and k_0, the flat swept values and
+                the [sweep, *grid] shape to restore the layer results to.
+        """
+        sweep = pointwise_sweep(self.sweep)
+        scenario, values, grid_shape = points_scenario(self.scenario, sweep)
+        if sweep["layer"] == 0:
+            prism_permittivity = values
+        k_x = tf.sqrt(to_float64(prism_permittivity)) * tf.sin(scenario.incident_angle)
+        k_0 = scenario.frequency * 2.0 * m.pi
+        return scenario, k_x, k_0, values, grid_shape
 
     def calculate(self):
-        """Calculate the transfer matrix for the given layers."""
+        """Calculate the transfer matrix, or the scattering matrix, for the given layers."""
+        if self.stack_solver == "scattering":
+            # Reflected (s, p) amplitudes in rows 0-1, transmitted amplitudes in rows 2-3
+            self.scattering_matrix = tf.concat(stack_scattering_matrix(self.layers), axis=-2)
+            return
+
         self.transfer_matrices = [layer.matrix for layer in self.layers]
         self.transfer_matrix = functools.reduce(operator.matmul, self.transfer_matrices)
 
     def calculate_reflectivity(self):
         """Calculate the reflectivity for the given transfer matrix."""
+        if self.stack_solver == "scattering":
+            self.r_ss = self.scattering_matrix[..., 0, 0]
+            self.r_ps = self.scattering_matrix[..., 0, 1]
+            self.r_sp = self.scattering_matrix[..., 1, 0]
+            self.r_pp = self.scattering_matrix[..., 1, 1]
+            return
+
+        if self.decoupled:
+            # p and s do not mix: rows and columns 0-1 hold the s block and 2-3
+            # the p block, and the cross-polarised coefficients vanish
+            self.r_ss = self.transfer_matrix[..., 1, 0] / self.transfer_matrix[..., 0, 0]
+            self.r_pp = self.transfer_matrix[..., 3, 2] / self.transfer_matrix[..., 2, 2]
+            self.r_ps = tf.zeros_like(self.r_pp)
+            self.r_sp = tf.zeros_like(self.r_pp)
+            return
+
         bottom_line = (
             self.transfer_matrix[..., 0, 0] * self.transfer_matrix[..., 2, 2]
             - self.transfer_matrix[..., 0, 2] * self.transfer_matrix[..., 2, 0]
@@ -130,6 +306,20 @@ class Structure:
 
     def calculate_transmissivity(self):
         """Calculate the transmissivity for the given transfer matrix."""
+        if self.stack_solver == "scattering":
+            self.t_ss = self.scattering_matrix[..., 2, 0]
+            self.t_ps = self.scattering_matrix[..., 2, 1]
+            self.t_sp = self.scattering_matrix[..., 3, 0]
+            self.t_pp = self.scattering_matrix[..., 3, 1]
+            return
+
+        if self.decoupled:
+            self.t_ss = 1.0 / self.transfer_matrix[..., 0, 0]
+            self.t_pp = 1.0 / self.transfer_matrix[..., 2, 2]
+            self.t_ps = tf.zeros_like(self.t_pp)
+            self.t_sp = tf.zeros_like(self.t_pp)
+            return
+
         bottom_line = (
             self.transfer_matrix[..., 0, 0] * self.transfer_matrix[..., 2, 2]
             - self.transfer_matrix[..., 0, 2] * self.transfer_matrix[..., 2, 0]
@@ -148,18 +338,115 @@ class Structure:
 
         
 
-    def execute(self, payload):
+    def get_chunk_size(self, layer_data_list, memory_budget):
+        """
+        Number of indices of the scenario chunk axis that fit in the memory budget.
+
+        Args:
+            layer_data_list (list): Layer data of the payload.
+            memory_budget (int): Approximate peak memory in bytes.
+
+        Returns:
+            int or None: The chunk size, or None when the whole grid fits or the
+                scenario has no grid.
+        """
+        if memory_budget is None and self.scenario.type == "Volume":
+            memory_budget = VOLUME_MEMORY_BUDGET
+        if memory_budget is None:
+            return None
+
+        self.resolve_frequency(layer_data_list)
+        if self.scenario.chunk_axis() is None:
+            return None
+        attributes, axis = self.scenario.chunk_axis()
+        chunk_axis_length = int(getattr(self.scenario, attributes[0]).shape[0])
+        if self.scenario.type == "Dispersion":
+            other_axis_length = int(self.scenario.azimuthal_angle.shape[0])
+        elif self.scenario.type == "Points":
+            other_axis_length = 1
+        elif self.scenario.type == "Volume":
+            other_axis_length = functools.reduce(
+                operator.mul,
+                [int(getattr(self.scenario, name).shape[0]) for name in ScenarioSetup.VOLUME_AXES],
+            ) // chunk_axis_length
+        else:
+            other_axis_length = int(self.frequency.shape[0])
+
+        for size in sweep_shape(self.sweep):
+            other_axis_length *= size
+        bytes_per_index = BYTES_PER_GRID_POINT_PER_LAYER * len(layer_data_list) * other_axis_length
+        chunk_size = max(1, int(memory_budget // bytes_per_index))
+        return chunk_size if chunk_size < chunk_axis_length else None
+
+    def execute_chunked(self, layer_data_list, chunk_size):
+        """
+        Execute the layers chunk by chunk along the scenario chunk axis and stitch
+        the transfer matrix and reflection coefficients back together. Layers are
+        not kept, as each chunk builds its own.
+        """
+        scenario = self.scenario
+        attributes, axis = scenario.chunk_axis()
+        chunk_axis_length = int(getattr(scenario, attributes[0]).shape[0])
+
+        results = {name: [] for name in CHUNKED_OUTPUTS}
+        # The stitched matrices only take the 2x2 path when every chunk did
+        decoupled = True
+        for start in range(0, chunk_axis_length, chunk_size):
+            self.scenario = scenario.select(start, start + chunk_size)
+            self.setup_attributes()
+            self.layers = []
+            self.get_layers(layer_data_list, lazy_profiles=True)
+            decoupled &= self.decoupled
+            self.calculate()
+            self.calculate_reflectivity()
+            for name in CHUNKED_OUTPUTS:
+                results[name].append(getattr(self, name))
+
+        # Results carry the sweep axes in front of the grid axes
+        axis += len(sweep_shape(self.sweep))
+        for name in CHUNKED_OUTPUTS:
+            if results[name][0] is not None:
+                setattr(self, name, tf.concat(results[name], axis=axis))
+        self.decoupled = decoupled
+        self.scenario = scenario
+        self.setup_attributes()
+        self.resolve_frequency(layer_data_list)
+        self.calculate_kx_k0()
+        self.layers = []
+        self.transfer_matrices = []
+
+    def execute(self, payload, memory_budget=None):
         """
         Execute the calculation of reflectivity for the given scenario and layers.
 
         Args:
-            payload (dict): A dictionary containing the scenario data and layers.
+            payload (dict): A dictionary containing the scenario data and layers,
+                and optionally a Sweep over one numeric layer field, or over the
+                thicknesses of several layers, that adds leading axes to the
+                results (see hyperbolic_optics.sweeps).
+            memory_budget (int, optional): Approximate peak memory in bytes for the
+                grid tensors. When the Incident, Azimuthal or Dispersion grid would
+                exceed it, its angle axis is evaluated in chunks and the results
+                are stitched together, as are blocks of the Points scenario;
+                layers is then left empty. Volume grids are always split
+                along their longest axis, with VOLUME_MEMORY_BUDGET by default.
         """
+        if self.compiled:
+            self._execute_compiled(payload, memory_budget)
+            return
+
         # Get the scenario data
         self.get_scenario(payload.get("ScenarioData"))
 
+        layer_data_list = payload.get("Layers", None)
+        self.sweep = parse_sweep(payload.get("Sweep"), layer_data_list)
+        chunk_size = self.get_chunk_size(layer_data_list, memory_budget)
+        if chunk_size is not None:
+            self.execute_chunked(layer_data_list, chunk_size)
+            return
+
         # Get the layers
-        self.get_layers(payload.get("Layers", None))
+        self.get_layers(layer_data_list)
 
         # Calculate the transfer matrix
         self.calculate()
@@ -167,6 +454,54 @@ class Structure:
         # Calculate the reflectivity
         self.calculate_reflectivity()
 
+    def _execute_compiled(self, payload, memory_budget=None):
+        """Execute the payload through the graph cached for its template."""
+        template, paths, values = split_payload(payload)
+        key = template_key(
+            template, self.eigen_solver, self.jit_compile, memory_budget, self.stack_solver
+        )
+        compiled = get_compiled_function(
+            key, lambda: self._build_compiled_function(template, paths, len(values), memory_budget)
+        )
+        outputs = compiled(tf.constant(values, shape=[len(values)], dtype=tf.float64))
+
+        self.scenario = ScenarioSetup(payload.get("ScenarioData"))
+        self.sweep = parse_sweep(payload.get("Sweep"), payload.get("Layers", None))
+        self.eigen_solvers = list(compiled.eigen_solvers)
+        self.decoupled = compiled.decoupled[0]
+        self.layers = []
+        for name, value in outputs.items():
+            setattr(self, name, value)
+
+    def _build_compiled_function(self, template, paths, size, memory_budget=None):
+        """Trace Structure.execute with the dynamic payload fields as graph inputs."""
+        eigen_solver = self.eigen_solver
+        stack_solver = self.stack_solver
+        eigen_solvers = []
+        decoupled = [False]
+
+        @tf.function(
+            input_signature=[tf.TensorSpec([size], dtype=tf.float64)],
+            jit_compile=self.jit_compile,
+        )
+        def compiled(values):
+            structure = Structure(eigen_solver=eigen_solver, lazy_profiles=True, stack_solver=stack_solver)
+            structure.execute(
+                fill_payload(template, paths, tf.unstack(values, num=size)), memory_budget
+            )
+            eigen_solvers[:] = structure.eigen_solvers
+            decoupled[0] = structure.decoupled
+            outputs = {}
+            for name in COMPILED_OUTPUTS:
+                value = getattr(structure, name)
+                if value is not None:
+                    outputs[name] = tf.convert_to_tensor(value, dtype_hint=tf.float64)
+            return outputs
+
+        compiled.eigen_solvers = eigen_solvers
+        compiled.decoupled = decoupled
+        return compiled
+
     # def plot(self):
     #     """Plot the reflectivity for the given scenario."""
     #     if self.scenario.type == "Incident":
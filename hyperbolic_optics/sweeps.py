@@ -0,0 +1,200 @@
+"""
+Batched sweeps over numeric layer fields.
+
+A payload may declare a sweep next to its scenario and layers:
+
+    "Sweep": {"layer": 1, "field": "thickness", "values": [0.1, 0.2, 0.5]}
+
+The sweep becomes a leading axis of every result, so r_pp and the other
+outputs have shape [sweep, *grid] where grid is the output grid of the scenario.
+Thickness only enters the propagation phases, so a thickness sweep solves the
+partial waves once and adds the sweep axis to the phases. Any other field
+changes the partial waves of its layer; that layer is then solved over every
+(sweep value, grid point) pair at once as a flat batch of points and reshaped
+back onto the grid, while the other layers are solved once. Sweeping the prism
+permittivity changes k_x, and with it every layer.
+
+Thicknesses of several layers are swept jointly by giving a list of thickness
+sweeps, one per layer:
+
+    "Sweep": [
+        {"layer": 1, "field": "thickness", "values": [0.1, 0.2, 0.5]},
+        {"layer": 2, "field": "thickness", "values": [1.0, 2.0]},
+    ]
+
+Each adds its own leading axis, in list order, so the results have shape
+[3, 2, *grid] and hold every combination, still from a single eigen
+decomposition per layer.
+"""
+
+import copy
+
+import tensorflow as tf
+
+from hyperbolic_optics.tensor_utils import to_float64
+
+# Numeric fields that can be swept, by layer type
+SWEEP_FIELDS = {
+    "Ambient Incident Layer": ("permittivity",),
+    "Isotropic Middle-Stack Layer": ("thickness", "permittivity", "permeability"),
+    "Crystal Layer": ("thickness", "rotationX", "rotationY", "rotationZ"),
+    "Semi Infinite Anisotropic Layer": ("rotationX", "rotationY", "rotationZ"),
+    "Semi Infinite Isotropic Layer": ("permittivity",),
+}
+
+
+def parse_sweep(sweep_data, layer_data_list):
+    """
+    Validate the sweep entry of a payload.
+
+    Args:
+        sweep_data (dict, list or None): The "Sweep" entry of the payload, one
+            sweep or a list of thickness sweeps of different layers.
+        layer_data_list (list): Layer data of the payload.
+
+    Returns:
+        list or None: One {"layer": index, "field": name, "values": float64
+            tensor} per sweep axis, or None when the payload declares no sweep.
+    """
+    if sweep_data is None:
+        return None
+    if not isinstance(sweep_data, (list, tuple)):
+        sweep_data = [sweep_data]
+    if not sweep_data:
+        raise ValueError("Sweep list must not be empty")
+
+    sweeps = [parse_sweep_axis(axis_data, layer_data_list) for axis_data in sweep_data]
+    if len(sweeps) > 1:
+        if any(sweep["field"] != "thickness" for sweep in sweeps):
+            raise ValueError("Only thickness sweeps can be combined")
+        if len({sweep["layer"] for sweep in sweeps}) < len(sweeps):
+            raise ValueError("Each layer can only be swept once")
+    return sweeps
+
+
+def parse_sweep_axis(sweep_data, layer_data_list):
+    """Validate one sweep of a payload and return it as a dict."""
+    if not isinstance(sweep_data, dict):
+        raise ValueError("A sweep must be a dict with layer, field and values")
+
+    layer = sweep_data.get("layer")
+    field = sweep_data.get("field")
+    values = sweep_data.get("values")
+    if not isinstance(layer, int) or not 0 <= layer < len(layer_data_list):
+        raise ValueError(f"Sweep layer {layer} is not an index into the layers")
+
+    layer_type = layer_data_list[layer].get("type")
+    if field not in SWEEP_FIELDS.get(layer_type, ()):
+        raise ValueError(f"Field {field} of a {layer_type} cannot be swept")
+
+    values = to_float64(values)
+    if len(values.shape) != 1 or values.shape[0] == 0:
+        raise ValueError("Sweep values must be a non-empty list of numbers")
+
+    return {"layer": layer, "field": field, "values": values}
+
+
+def sweep_shape(sweeps):
+    """Shape of the leading sweep axes of the results; empty without a sweep."""
+    return [int(sweep["values"].shape[0]) for sweep in sweeps or ()]
+
+
+def pointwise_sweep(sweeps):
+    """The sweep of a field other than thickness, or None."""
+    if sweeps is None or sweeps[0]["field"] == "thickness":
+        return None
+    return sweeps[0]
+
+
+def swept_field(sweeps, index):
+    """Name of the field swept on layer index, or None."""
+    for sweep in sweeps or ():
+        if sweep["layer"] == index:
+            return sweep["field"]
+    return None
+
+
+def is_pointwise(sweeps, index):
+    """True when layer index must be solved point by point over the sweep."""
+    sweep = pointwise_sweep(sweeps)
+    return sweep is not None and sweep["layer"] in (0, index)
+
+
+def swept_thickness(sweeps, index, grid_rank):
+    """
+    Thicknesses of layer index along its sweep axis, shaped to broadcast against
+    propagation phases of shape [*grid, 4] with every sweep axis in front.
+    """
+    for axis, sweep in enumerate(sweeps):
+        if sweep["layer"] == index:
+            shape = [1] * (len(sweeps) + grid_rank + 1)
+            shape[axis] = -1
+            return tf.reshape(sweep["values"], shape)
+    raise ValueError(f"Layer {index} has no thickness sweep")
+
+
+def output_grid(scenario):
+    """
+    Incident angle, azimuthal angle and frequency of a scenario laid out on its
+    output grid.
+
+    Returns:
+        tuple: The three float64 tensors, broadcastable against each other to
+            the output grid shape, which is also returned.
+    """
+    incident_angle = to_float64(scenario.incident_angle)
+    frequency = to_float64(scenario.frequency)
+    if scenario.azimuthal_angle is None:
+        azimuthal_angle = tf.zeros([], dtype=tf.float64)
+    else:
+        azimuthal_angle = to_float64(scenario.azimuthal_angle)
+
+    if scenario.type == "Incident":
+        incident_angle, frequency = incident_angle[tf.newaxis, :], frequency[:, tf.newaxis]
+    elif scenario.type == "Azimuthal":
+        azimuthal_angle, frequency = azimuthal_angle[tf.newaxis, :], frequency[:, tf.newaxis]
+    elif scenario.type == "Dispersion":
+        incident_angle, azimuthal_angle = incident_angle[:, tf.newaxis], azimuthal_angle[tf.newaxis, :]
+    elif scenario.type == "Volume":
+        frequency = frequency[:, tf.newaxis, tf.newaxis]
+        incident_angle = incident_angle[tf.newaxis, :, tf.newaxis]
+        azimuthal_angle = azimuthal_angle[tf.newaxis, tf.newaxis, :]
+
+    grid_shape = tf.broadcast_static_shape(
+        tf.broadcast_static_shape(incident_angle.shape, azimuthal_angle.shape), frequency.shape
+    )
+    return incident_angle, azimuthal_angle, frequency, grid_shape.as_list()
+
+
+def sweep_axis(values, grid_rank):
+    """Sweep values shaped [sweep, 1, ...] to broadcast against [sweep, *grid, extra]."""
+    return tf.reshape(values, [-1] + [1] * grid_rank)
+
+
+def flatten_points(tensor, shape):
+    """Broadcast a tensor to shape and flatten it to one axis of points."""
+    return tf.reshape(tf.broadcast_to(tensor, shape), [-1])
+
+
+def points_scenario(scenario, sweep):
+    """
+    Flatten every (sweep value, grid point) pair of a scenario into points.
+
+    Args:
+        scenario (ScenarioSetup): The scenario, with its frequency resolved.
+        sweep (dict): The sweep returned by parse_sweep.
+
+    Returns:
+        tuple: A copy of the scenario of type "Points", the flat swept values,
+            and the [sweep, *grid] shape to restore the results to.
+    """
+    incident_angle, azimuthal_angle, frequency, grid_shape = output_grid(scenario)
+    shape = [int(sweep["values"].shape[0])] + grid_shape
+
+    points = copy.copy(scenario)
+    points.type = "Points"
+    points.incident_angle = flatten_points(incident_angle, shape)
+    points.azimuthal_angle = flatten_points(azimuthal_angle, shape)
+    points.frequency = flatten_points(frequency, shape)
+    values = flatten_points(sweep_axis(sweep["values"], len(grid_shape)), shape)
+    return points, values, shape
@@ -0,0 +1,234 @@
+"""
+Tables of measured material tensors: memory-mapped loading and interpolation.
+
+Kept free of TensorFlow, like material_params, so that the NumPy backend reads
+tables the same way. A table holds complex 3x3 tensors sampled at increasing
+frequencies in cm^-1, stored either as
+
+- an .npz file with a "frequency" array [F], a "permittivity" array [F, 3, 3]
+  and, optionally, a "permeability" array [F, 3, 3], or
+- an .npy file holding the [F, 3, 3] permittivity, with the frequencies given
+  separately as a list or as the path of another .npy file.
+
+.npy files, and the members of .npz files stored without compression (as
+np.savez writes them), are memory-mapped, so interpolating reads only the rows
+around the requested frequencies. Compressed members are read into memory.
+"""
+
+import os
+import threading
+import zipfile
+
+import numpy as np
+
+INTERPOLATIONS = ("linear", "cubic")
+
+TENSOR_NAMES = ("permittivity", "permeability")
+
+_lock = threading.Lock()
+# Loaded tables by path, frequency source and file modification
+_tables = {}
+
+
+def memory_map_npz(path):
+    """
+    Open the arrays of an .npz file, memory-mapping those stored uncompressed.
+
+    Returns:
+        dict: Array name to np.memmap, or to np.ndarray for compressed members.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as file:
+        for info in archive.infolist():
+            name = info.filename[: -len(".npy")] if info.filename.endswith(".npy") else info.filename
+            header = None
+            if info.compress_type == zipfile.ZIP_STORED:
+                # The local file header is 30 bytes followed by the name and extra field
+                file.seek(info.header_offset + 26)
+                name_length, extra_length = np.frombuffer(file.read(4), dtype="<u2")
+                file.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+                version = np.lib.format.read_magic(file)
+                if version == (1, 0):
+                    header = np.lib.format.read_array_header_1_0(file)
+                elif version == (2, 0):
+                    header = np.lib.format.read_array_header_2_0(file)
+            if header is None or header[2].hasobject:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            shape, fortran_order, dtype = header
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode="r", offset=file.tell(), shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return arrays
+
+
+def _check_tensors(name, values, length, path):
+    if values.shape != (length, 3, 3):
+        raise ValueError(f"The {name} table of {path} must have shape ({length}, 3, 3), not {values.shape}")
+
+
+def load_table(path, frequency=None):
+    """
+    Open a table, checking its layout once per file modification.
+
+    Args:
+        path (str or Path): An .npz or .npy file, as described above.
+        frequency (list or str, optional): The frequencies of an .npy table, or
+            the path of an .npy file holding them.
+
+    Returns:
+        dict: "frequency" as a float64 array, and "permittivity" and
+            "permeability" (None when absent) as memory-mapped [F, 3, 3] arrays.
+    """
+    path = os.fspath(path)
+    status = os.stat(path)
+    key = (os.path.abspath(path), str(frequency), status.st_mtime_ns, status.st_size)
+    with _lock:
+        table = _tables.get(key)
+    if table is not None:
+        return table
+
+    if path.endswith(".npz"):
+        if frequency is not None:
+            raise ValueError(f"The frequencies of {path} are read from its 'frequency' array")
+        arrays = memory_map_npz(path)
+        missing = {"frequency", "permittivity"} - set(arrays)
+        if missing:
+            raise ValueError(f"{path} has no {' or '.join(sorted(missing))} array")
+        table_frequency = arrays["frequency"]
+        tensors = {name: arrays.get(name) for name in TENSOR_NAMES}
+    elif path.endswith(".npy"):
+        if frequency is None:
+            raise ValueError(f"The frequencies of the .npy table {path} must be given")
+        if isinstance(frequency, (str, os.PathLike)):
+            frequency = np.load(frequency, mmap_mode="r")
+        table_frequency = frequency
+        tensors = {"permittivity": np.load(path, mmap_mode="r"), "permeability": None}
+    else:
+        raise ValueError(f"A material table must be an .npz or .npy file, not {path}")
+
+    table_frequency = np.asarray(table_frequency, dtype=np.float64)
+    if table_frequency.ndim != 1 or table_frequency.size < 2:
+        raise ValueError(f"The frequencies of {path} must be a list of at least two values")
+    if not np.all(np.diff(table_frequency) > 0):
+        raise ValueError(f"The frequencies of {path} must be strictly increasing")
+    for name, values in tensors.items():
+        if values is not None:
+            _check_tensors(name, values, table_frequency.size, path)
+
+    table = {"frequency": table_frequency, **tensors}
+    with _lock:
+        _tables[key] = table
+    return table
+
+
+def _tangent_weights(nodes, index):
+    """
+    Weights of the values at index - 1, index and index + 1 in the slope at
+    index: the average of the two neighbouring secants weighted by the other's
+    width, or the one secant at the ends of the table.
+    """
+    last = nodes.size - 1
+    before = np.maximum(index - 1, 0)
+    after = np.minimum(index + 1, last)
+    width_before = nodes[index] - nodes[before]
+    width_after = nodes[after] - nodes[index]
+    total = width_before + width_after
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight_before = np.where(index > 0, -width_after / (total * width_before), 0.0)
+        weight_after = np.where(index < last, width_before / (total * width_after), 0.0)
+    # One-sided secants at the first and last nodes
+    weight_before = np.where(index == last, -1.0 / width_before, weight_before)
+    weight_after = np.where(index == 0, 1.0 / width_after, weight_after)
+    return weight_before, -(weight_before + weight_after), weight_after
+
+
+def interpolation_weights(nodes, frequency, interpolation="linear"):
+    """
+    Rows of a table and their weights in the interpolant at each frequency.
+
+    Linear interpolation uses the two rows around a frequency. Cubic
+    interpolation is the piecewise cubic Hermite interpolant with the slopes of
+    _tangent_weights, which needs the four rows around a frequency and has a
+    continuous first derivative.
+
+    Args:
+        nodes (np.ndarray): The increasing table frequencies [F].
+        frequency (np.ndarray): Frequencies of any shape within the table.
+        interpolation (str): "linear" or "cubic".
+
+    Returns:
+        tuple: Row indices and float64 weights, both of shape frequency.shape + [2]
+            for linear and frequency.shape + [4] for cubic interpolation.
+    """
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Interpolation must be one of {', '.join(INTERPOLATIONS)}, not {interpolation!r}")
+    frequency = np.asarray(frequency, dtype=np.float64)
+    outside = (frequency < nodes[0]) | (frequency > nodes[-1]) | np.isnan(frequency)
+    if np.any(outside):
+        raise ValueError(
+            f"Frequency {frequency[outside].flat[0]:g} outside the table range {nodes[0]:g}-{nodes[-1]:g} cm^-1"
+        )
+
+    start = np.clip(np.searchsorted(nodes, frequency, side="right") - 1, 0, nodes.size - 2)
+    width = nodes[start + 1] - nodes[start]
+    t = (frequency - nodes[start]) / width
+    if interpolation == "linear":
+        return np.stack([start, start + 1], axis=-1), np.stack([1.0 - t, t], axis=-1)
+
+    h00 = (1.0 + 2.0 * t) * (1.0 - t) ** 2
+    h10 = t * (1.0 - t) ** 2 * width
+    h01 = t**2 * (3.0 - 2.0 * t)
+    h11 = t**2 * (t - 1.0) * width
+    start_before, start_self, start_after = _tangent_weights(nodes, start)
+    end_before, end_self, end_after = _tangent_weights(nodes, start + 1)
+    weights = np.stack(
+        [
+            h10 * start_before,
+            h00 + h10 * start_self + h11 * end_before,
+            h01 + h10 * start_after + h11 * end_self,
+            h11 * end_after,
+        ],
+        axis=-1,
+    )
+    rows = np.clip(start[..., np.newaxis] + np.arange(-1, 3), 0, nodes.size - 1)
+    return rows, weights
+
+
+def interpolate_tables(nodes, tables, frequency, interpolation="linear"):
+    """
+    Interpolate several tables of tensors sampled at the same frequencies, such
+    as a permittivity and a permeability, with one set of rows and weights.
+
+    Only the rows the interpolant needs are read from the tables, which may be
+    memory-mapped.
+
+    Args:
+        nodes (np.ndarray): The increasing table frequencies [F].
+        tables (list): The tabulated tensors, each [F, 3, 3].
+        frequency (float or np.ndarray): Frequencies in cm^-1.
+        interpolation (str): "linear" or "cubic".
+
+    Returns:
+        list: complex128 tensors of shape frequency.shape + [3, 3], one per table.
+    """
+    rows, weights = interpolation_weights(nodes, frequency, interpolation)
+    needed, positions = np.unique(rows, return_inverse=True)
+    positions = np.reshape(positions, rows.shape)
+    return [
+        np.einsum("...k,...kij->...ij", weights, np.asarray(values[needed], dtype=np.complex128)[positions])
+        for values in tables
+    ]
+
+
+def interpolate_table(nodes, values, frequency, interpolation="linear"):
+    """
+    Interpolate a table of tensors onto frequencies of any shape; see
+    interpolate_tables.
+
+    Returns:
+        np.ndarray: complex128 tensors of shape frequency.shape + [3, 3].
+    """
+    return interpolate_tables(nodes, [values], frequency, interpolation)[0]
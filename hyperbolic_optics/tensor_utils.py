@@ -0,0 +1,29 @@
+"""
+Conversions of payload values to tensors.
+
+Payload numbers arrive either as Python numbers (eager execution) or as float64
+scalar tensors (compiled execution). These helpers treat both alike and never
+round Python floats through float32, which tf.cast does for non-tensor inputs.
+"""
+
+import math as m
+import tensorflow as tf
+
+
+def to_float64(value):
+    """Convert a Python number or real tensor to a float64 tensor."""
+    if tf.is_tensor(value):
+        return tf.cast(value, dtype=tf.float64)
+    return tf.convert_to_tensor(value, dtype=tf.float64)
+
+
+def to_complex128(value):
+    """Convert a Python number or tensor to a complex128 tensor."""
+    if tf.is_tensor(value):
+        return tf.cast(value, dtype=tf.complex128)
+    return tf.convert_to_tensor(value, dtype=tf.complex128)
+
+
+def to_radians(degrees):
+    """Convert an angle in degrees to a float64 tensor in radians."""
+    return to_float64(degrees) * (m.pi / 180.0)
@@ -1,5 +1,7 @@
 import tensorflow as tf
 
+from hyperbolic_optics.tensor_utils import to_complex128
+
 
 class WaveProfile:
     """Class representing the wave profile."""
@@ -27,10 +29,31 @@ class WaveProfile:
         self.reflected_Pz = profile["reflected"]["Pz_physical"]
         self.reflected_k_z = profile["reflected"]["propagation"]
 
+    def reshape_batch(self, batch_shape):
+        """Reshape the batch axes of every field to batch_shape, in place."""
+        for name, value in vars(self).items():
+            setattr(self, name, tf.reshape(value, list(batch_shape) + [value.shape[-1]]))
+
 
 class Wave:
     """Class representing the four partial waves in a layer of the structure."""
 
+    # Permutation taking the stacked Berreman matrix to [batch..., 4, 4], and the
+    # resulting number of batch dimensions, for each mode
+    mode_permutations = {
+        "Incident": ([2, 1, 3, 0], 2),
+        "Azimuthal": ([1, 2, 3, 0], 2),
+        "Dispersion": ([1, 2, 3, 0], 2),
+        "Simple": ([0, 1], 0),  # Identity permutation for [4,4] matrix - NO transpose
+        "Points": ([1, 2, 0], 1),
+        "Volume": ([1, 2, 3, 4, 0], 3),
+        "volume_airgap": ([1, 2, 0], 1),
+        "airgap": ([1, 2, 0], 1),
+        "simple_airgap": ([1, 2, 0], 1),
+        "azimuthal_airgap": ([1, 0], 0),
+        "simple_scalar_airgap": ([1,0], 0),
+    }
+
     def __init__(
         self,
         kx,
@@ -41,6 +64,9 @@ class Wave:
         thickness=None,
         semi_infinite=False,
         magnet=False,
+        eigen_solver="eig",
+        principal_permittivities=None,
+        stack_solver="transfer",
     ):
         self.k_x = tf.cast(kx, dtype=tf.complex128)
         self.eps_tensor = eps_tensor  # Now pre-shaped from materials
@@ -54,6 +80,18 @@ class Wave:
         self.semi_infinite = semi_infinite
         self.magnet = magnet
 
+        if eigen_solver not in ("eig", "analytic"):
+            raise ValueError(f"Eigen solver {eigen_solver} not implemented")
+        if eigen_solver == "analytic" and principal_permittivities is None:
+            raise ValueError("The analytic eigen solver requires the principal permittivities")
+        self.eigen_solver = eigen_solver
+        self.principal_permittivities = principal_permittivities
+
+        if stack_solver not in ("transfer", "scattering"):
+            raise ValueError(f"Stack solver {stack_solver} not implemented")
+        self.stack_solver = stack_solver
+        self.modes = None
+
         self.eigenvalues = None
         self.eigenvectors = None
         self.berreman_matrix = None
@@ -73,7 +111,9 @@ class Wave:
         # Determine batch dimensions based on mode
         if self.mode in ["Incident", "Azimuthal", "Dispersion"]:
             self.batch_dims = 2
-        elif self.mode in ["airgap", "simple_airgap"]:
+        elif self.mode == "Volume":
+            self.batch_dims = 3
+        elif self.mode in ["airgap", "simple_airgap", "Points", "volume_airgap"]:
             self.batch_dims = 1
         elif self.mode == "azimuthal_airgap":
             self.batch_dims = 0
@@ -102,9 +142,9 @@ class Wave:
             tf.debugging.assert_equal(mu_shape[-2:], [3, 3], 
                                     message="mu_tensor must have shape [..., 3, 3]")
             
-            # Check that batch dimensions match
-            tf.debugging.assert_equal(eps_shape[:-2], mu_shape[:-2], 
-                                    message="eps_tensor and mu_tensor must have matching batch dimensions")
+            # Check that the batch dimensions broadcast, which raises otherwise: the
+            # mu of a non-magnetic material is a constant with size-1 batch dimensions
+            tf.broadcast_dynamic_shape(eps_shape[:-2], mu_shape[:-2])
 
     def _get_tensor_shapes_for_mode(self):
         """Get properly shaped tensors for the current mode.
@@ -132,6 +172,19 @@ class Wave:
             # k_x: scalar, tensors: [3, 3]
             return self.k_x, self.eps_tensor, self.mu_tensor
             
+        elif self.mode == "Points":
+            # k_x: [N], tensors [N, 3, 3], or [3, 3] for frequency-independent media
+            return self.k_x, self.eps_tensor, self.mu_tensor
+
+        elif self.mode == "Volume":
+            # k_x: [inc] -> [inc, 1], tensors [freq, az, 3, 3] -> [freq, 1, az, 3, 3]
+            k_x = self.k_x[:, tf.newaxis]
+            return k_x, self.eps_tensor[:, tf.newaxis, ...], self.mu_tensor[:, tf.newaxis, ...]
+
+        elif self.mode == "volume_airgap":
+            # k_x: [inc], tensors [3, 3]; frequency and azimuth are added with k_0
+            return self.k_x, self.eps_tensor, self.mu_tensor
+
         elif self.mode == "airgap":
             # For airgap modes, tensors should already match k_x shape
             return self.k_x, self.eps_tensor, self.mu_tensor
@@ -184,14 +237,14 @@ class Wave:
             
         elif self.mode == "simple_scalar_airgap":
             # For simple scalar airgap, add minimal dimensions for consistency
-            k_x = self.k_x[tf.newaxis] if tf.rank(self.k_x) == 0 else self.k_x
+            k_x = self.k_x[tf.newaxis] if len(self.k_x.shape) == 0 else self.k_x
             eps_tensor = self.eps_tensor[tf.newaxis, ...]
             mu_tensor = self.mu_tensor[tf.newaxis, ...]
             return k_x, eps_tensor, mu_tensor
             
         elif self.mode == "Simple":
             # For simple mode, add minimal dimensions for Poynting calculation
-            k_x = self.k_x[tf.newaxis] if tf.rank(self.k_x) == 0 else self.k_x
+            k_x = self.k_x[tf.newaxis] if len(self.k_x.shape) == 0 else self.k_x
             eps_tensor = self.eps_tensor[tf.newaxis, ...]
             mu_tensor = self.mu_tensor[tf.newaxis, ...]
             return k_x, eps_tensor, mu_tensor
@@ -201,6 +254,22 @@ class Wave:
             eps_tensor = self.eps_tensor[tf.newaxis, :, tf.newaxis, ...]
             mu_tensor = self.mu_tensor[tf.newaxis, :, tf.newaxis, ...]
             return k_x, eps_tensor, mu_tensor
+
+        elif self.mode == "Points":
+            k_x = self.k_x[:, tf.newaxis]
+            eps_tensor = self.eps_tensor[..., tf.newaxis, :, :]
+            mu_tensor = self.mu_tensor[..., tf.newaxis, :, :]
+            return k_x, eps_tensor, mu_tensor
+
+        elif self.mode == "Volume":
+            k_x = self.k_x[:, tf.newaxis, tf.newaxis]
+            eps_tensor = self.eps_tensor[:, tf.newaxis, :, tf.newaxis, ...]
+            mu_tensor = self.mu_tensor[:, tf.newaxis, :, tf.newaxis, ...]
+            return k_x, eps_tensor, mu_tensor
+
+        elif self.mode == "volume_airgap":
+            k_x = self.k_x[:, tf.newaxis]
+            return k_x, self.eps_tensor, self.mu_tensor
             
         else:
             raise NotImplementedError(f"Mode {self.mode} not implemented")
@@ -213,45 +282,58 @@ class Wave:
             eigenvectors: Eigenvectors tensor
             
         Returns:
-            tuple: (k_0, eigenvalues_diag, eigenvectors) with proper shapes
+            tuple: (k_0, eigenvalues, eigenvectors) with proper shapes
         """
-        eigenvalues_diag = tf.linalg.diag(eigenvalues)
-        
         if self.mode == "Incident":
-            k_0 = self.k_0[:, tf.newaxis, tf.newaxis, tf.newaxis]
-            return k_0, eigenvalues_diag, eigenvectors
+            k_0 = self.k_0[:, tf.newaxis, tf.newaxis]
+            return k_0, eigenvalues, eigenvectors
             
         elif self.mode == "airgap":
-            k_0 = self.k_0[:, tf.newaxis, tf.newaxis, tf.newaxis] if tf.is_tensor(self.k_0) else self.k_0
-            eigenvalues_diag = eigenvalues_diag[tf.newaxis, ...]
+            k_0 = self.k_0[:, tf.newaxis, tf.newaxis] if tf.is_tensor(self.k_0) else self.k_0
+            eigenvalues = eigenvalues[tf.newaxis, ...]
             eigenvectors = eigenvectors[tf.newaxis, ...]
-            return k_0, eigenvalues_diag, eigenvectors
+            return k_0, eigenvalues, eigenvectors
             
         elif self.mode == "simple_airgap":
-            eigenvalues_diag = eigenvalues_diag[:, tf.newaxis, ...]
+            eigenvalues = eigenvalues[:, tf.newaxis, ...]
             eigenvectors = eigenvectors[:, tf.newaxis, ...]
-            return self.k_0, eigenvalues_diag, eigenvectors
+            return self.k_0, eigenvalues, eigenvectors
             
         elif self.mode == "Azimuthal":
-            k_0 = self.k_0[:, tf.newaxis, tf.newaxis, tf.newaxis]
-            return k_0, eigenvalues_diag, eigenvectors
+            k_0 = self.k_0[:, tf.newaxis, tf.newaxis]
+            return k_0, eigenvalues, eigenvectors
             
         elif self.mode == "azimuthal_airgap":
-            k_0 = self.k_0[:, tf.newaxis, tf.newaxis, tf.newaxis]
-            eigenvalues_diag = eigenvalues_diag[tf.newaxis, tf.newaxis, ...]
+            k_0 = self.k_0[:, tf.newaxis, tf.newaxis]
+            eigenvalues = eigenvalues[tf.newaxis, tf.newaxis, ...]
             eigenvectors = eigenvectors[tf.newaxis, tf.newaxis, ...]
-            return k_0, eigenvalues_diag, eigenvectors
+            return k_0, eigenvalues, eigenvectors
             
         elif self.mode == "simple_scalar_airgap":
             # For simple scalar airgap, k_0 is scalar, no extra dimensions needed
-            return self.k_0, eigenvalues_diag, eigenvectors
+            return self.k_0, eigenvalues, eigenvectors
 
         elif self.mode == "Simple":
-            # For simple mode, k_0 is scalar, eigenvalues/vectors are [4, 4]
-            return self.k_0, eigenvalues_diag, eigenvectors
+            # For simple mode, k_0 is scalar, eigenvalues are [4] and eigenvectors [4, 4]
+            return self.k_0, eigenvalues, eigenvectors
             
         elif self.mode == "Dispersion":
-            return self.k_0, eigenvalues_diag, eigenvectors
+            return self.k_0, eigenvalues, eigenvectors
+
+        elif self.mode == "Points":
+            # One k_0 per point, eigenvalues are [N, 4]
+            return self.k_0[:, tf.newaxis], eigenvalues, eigenvectors
+
+        elif self.mode == "Volume":
+            k_0 = self.k_0[:, tf.newaxis, tf.newaxis, tf.newaxis]
+            return k_0, eigenvalues, eigenvectors
+
+        elif self.mode == "volume_airgap":
+            # [inc, ...] -> [1, inc, 1, ...], broadcasting over frequency and azimuth
+            k_0 = self.k_0[:, tf.newaxis, tf.newaxis, tf.newaxis]
+            eigenvalues = eigenvalues[tf.newaxis, :, tf.newaxis, ...]
+            eigenvectors = eigenvectors[tf.newaxis, :, tf.newaxis, ...]
+            return k_0, eigenvalues, eigenvectors
             
         else:
             raise NotImplementedError(f"Mode {self.mode} not implemented")
@@ -280,7 +362,8 @@ class Wave:
         k_x_sq = k_x ** 2
         eps_22_inv = 1.0 / eps_22
         mu_22_inv = 1.0 / mu_22
-        ones_like_k_x = tf.ones_like(k_x)
+        # Ones over the batch of k_x, eps and mu, which may not all have the same shape
+        ones_like_k_x = tf.ones_like(k_x * eps_22_inv * mu_22_inv)
 
         # Construct the matrix elements
         m00 = -k_x * eps_20 * eps_22_inv
@@ -289,13 +372,13 @@ class Wave:
         m03 = mu_11 - mu_12 * mu_21 * mu_22_inv - k_x_sq * eps_22_inv
 
         m10 = tf.zeros_like(m00)
-        m11 = -k_x * mu_02 * mu_22_inv
+        m11 = -k_x * mu_02 * mu_22_inv * ones_like_k_x
         m12 = (mu_02 * mu_20 * mu_22_inv - mu_00) * ones_like_k_x
         m13 = (mu_02 * mu_21 * mu_22_inv - mu_01) * ones_like_k_x
 
         m20 = (eps_12 * eps_20 * eps_22_inv - eps_10) * ones_like_k_x
         m21 = k_x_sq * mu_22_inv - eps_11 + eps_12 * eps_21 * eps_22_inv
-        m22 = -k_x * mu_20 * mu_22_inv
+        m22 = -k_x * mu_20 * mu_22_inv * ones_like_k_x
         m23 = k_x * (eps_12 * eps_22_inv - mu_21 * mu_22_inv)
 
         m30 = (eps_00 - eps_02 * eps_20 * eps_22_inv) * ones_like_k_x
@@ -324,25 +407,28 @@ class Wave:
     def delta_permutations(self):
         """Perform permutations on the Berreman matrix based on the mode."""
 
-        mode_permutations = {
-            "Incident": ([2, 1, 3, 0], 2),
-            "Azimuthal": ([1, 2, 3, 0], 2),
-            "Dispersion": ([1, 2, 3, 0], 2),
-            "Simple": ([0, 1], 0),  # Identity permutation for [4,4] matrix - NO transpose
-            "airgap": ([1, 2, 0], 1),
-            "simple_airgap": ([1, 2, 0], 1),
-            "azimuthal_airgap": ([1, 0], 0),
-            "simple_scalar_airgap": ([1,0], 0),
-        }
-
-        if self.mode not in mode_permutations:
+        if self.mode not in self.mode_permutations:
             raise NotImplementedError(f"Mode {self.mode} not implemented")
 
-        permutation, self.batch_dims = mode_permutations[self.mode]
+        permutation, self.batch_dims = self.mode_permutations[self.mode]
         
         if permutation is not None:
             self.berreman_matrix = tf.transpose(self.berreman_matrix, perm=permutation)
 
+    @staticmethod
+    def fix_phase(vectors):
+        """
+        Scale each vector along the last axis so that its largest component is real
+        and positive.
+
+        The transmission into a semi-infinite layer depends on the phase of its
+        partial waves, so eig, the closed-form solvers and the decoupled blocks all
+        return fields in this one convention, as LAPACK does.
+        """
+        largest = tf.one_hot(tf.argmax(tf.math.abs(vectors), axis=-1), vectors.shape[-1], dtype=tf.complex128)
+        pivot = tf.reduce_sum(vectors * largest, axis=-1, keepdims=True)
+        return vectors * (tf.cast(tf.math.abs(pivot), dtype=tf.complex128) / pivot)
+
     def wave_sorting(self):
         """
         Sort the wavevectors and fields based on the eigenvalues.
@@ -350,6 +436,10 @@ class Wave:
 
         wavevectors, fields = tf.linalg.eig(self.berreman_matrix)
 
+        # eig fixes each eigenvector only up to a phase, which rounding differences,
+        # e.g. between eager and compiled runs, can change
+        fields = tf.linalg.matrix_transpose(self.fix_phase(tf.linalg.matrix_transpose(fields)))
+
         def sort_vector(waves):
             """Sort the wavevectors based on their real and imaginary parts."""
 
@@ -360,14 +450,9 @@ class Wave:
     
             return indices
 
-        # Sort the wavevectors based on their rank
-        if self.mode == "Simple":
-            # For simple mode, no mapping needed, just direct sorting
-            indices = sort_vector(wavevectors)
-        elif tf.rank(wavevectors) > 1:
-            indices = tf.map_fn(sort_vector, wavevectors, dtype=tf.int32)
-        else:
-            indices = sort_vector(wavevectors)
+        # The sort only acts on the last axis, so all batch axes are ordered in one call
+        indices = sort_vector(wavevectors)
+        self.batch_dims = len(wavevectors.shape) - 1
 
         # Gather the sorted wavevectors and fields
         sorted_waves = tf.gather(wavevectors, indices, axis=-1, batch_dims=self.batch_dims)
@@ -381,6 +466,256 @@ class Wave:
 
         return transmitted_wavevectors, reflected_wavevectors, transmitted_fields, reflected_fields
 
+    def analytic_wave_sorting(self):
+        """
+        Solve for the partial waves of a uniaxial or isotropic layer in closed form.
+
+        For eps = eps_o * I + (eps_e - eps_o) * c c^T and an isotropic mu, the ordinary
+        waves have k_z^2 = mu * eps_o - k_x^2 with E along k x c, and the extraordinary
+        waves satisfy k.eps.k = mu * eps_o * eps_e with E along mu * eps_o * c - (k.c) k.
+        This replaces the eigen-decomposition of the Berreman matrix and returns the
+        same forward/backward split as wave_sorting.
+
+        Returns:
+            tuple: Transmitted and reflected wavevectors and fields.
+        """
+        k_x, eps_tensor, mu_tensor = self.mode_reshaping()
+        mu = mu_tensor[..., 0, 0]
+
+        # Align the principal permittivities with the batch axes of the rotated tensor
+        eps_ord, eps_ext = [
+            tf.cast(value, dtype=tf.complex128) for value in self.principal_permittivities
+        ]
+        for _ in range(len(eps_tensor.shape) - 2 - len(eps_ord.shape)):
+            eps_ord = eps_ord[..., tf.newaxis]
+            eps_ext = eps_ext[..., tf.newaxis]
+
+        # Optic axis (up to scale) from the rank-one anisotropic part of the tensor.
+        # Isotropic media have none, so the y axis is used to split s and p waves
+        anisotropy = eps_tensor - eps_ord[..., tf.newaxis, tf.newaxis] * tf.eye(3, dtype=tf.complex128)
+        diagonal = tf.math.abs(tf.linalg.diag_part(anisotropy))
+        column = tf.one_hot(tf.argmax(diagonal, axis=-1), 3, dtype=tf.complex128)
+        optic_axis = tf.linalg.matvec(anisotropy, column)
+        is_isotropic = tf.reduce_max(diagonal, axis=-1) <= 1e-12 * tf.math.abs(eps_ord)
+        optic_axis = tf.where(
+            is_isotropic[..., tf.newaxis], tf.constant([0.0, 1.0, 0.0], dtype=tf.complex128), optic_axis
+        )
+        c_x, c_y, c_z = optic_axis[..., 0], optic_axis[..., 1], optic_axis[..., 2]
+
+        # Ordinary and extraordinary dispersion relations
+        k_z_ord = tf.sqrt(mu * eps_ord - k_x ** 2)
+        linear = (eps_tensor[..., 0, 2] + eps_tensor[..., 2, 0]) * k_x
+        discriminant = tf.sqrt(
+            linear ** 2 - 4.0 * eps_tensor[..., 2, 2] * (eps_tensor[..., 0, 0] * k_x ** 2 - mu * eps_ord * eps_ext)
+        )
+        k_z_ext = (-linear + discriminant) / (2.0 * eps_tensor[..., 2, 2])
+        k_z_ext_other = (-linear - discriminant) / (2.0 * eps_tensor[..., 2, 2])
+
+        def split_pair(k_z_a, k_z_b):
+            """Order a pair of roots as (transmitted, reflected), as in wave_sorting."""
+            is_complex = tf.math.abs(tf.math.imag(k_z_a)) > 1e-9
+            a_first = tf.where(
+                is_complex,
+                tf.math.imag(k_z_a) >= tf.math.imag(k_z_b),
+                tf.math.real(k_z_a) >= tf.math.real(k_z_b),
+            )
+            return tf.where(a_first, k_z_a, k_z_b), tf.where(a_first, k_z_b, k_z_a)
+
+        def berreman_field(k_z, E_x, E_y, E_z):
+            """Normalised (Ex, Ey, Hx, Hy) vector of a plane wave, with H = k x E / mu."""
+            H_x = -k_z * E_y / mu
+            H_y = (k_z * E_x - k_x * E_z) / mu
+            shape = tf.shape(k_z)
+            field = tf.stack([tf.broadcast_to(component, shape) for component in (E_x, E_y, H_x, H_y)], axis=-1)
+            norm = tf.sqrt(tf.reduce_sum(tf.math.abs(field) ** 2, axis=-1, keepdims=True))
+            return self.fix_phase(field / tf.cast(norm, dtype=tf.complex128))
+
+        def ordinary_field(k_z):
+            return berreman_field(k_z, -k_z * c_y, k_z * c_x - k_x * c_z, k_x * c_y)
+
+        def extraordinary_field(k_z):
+            k_dot_c = k_x * c_x + k_z * c_z
+            return berreman_field(
+                k_z, mu * eps_ord * c_x - k_dot_c * k_x, mu * eps_ord * c_y, mu * eps_ord * c_z - k_dot_c * k_z
+            )
+
+        shape = tf.shape(k_z_ext)
+        k_z_ord_t, k_z_ord_r = split_pair(tf.broadcast_to(k_z_ord, shape), tf.broadcast_to(-k_z_ord, shape))
+        k_z_ext_t, k_z_ext_r = split_pair(k_z_ext, k_z_ext_other)
+
+        transmitted_wavevectors = tf.stack([k_z_ord_t, k_z_ext_t], axis=-1)
+        reflected_wavevectors = tf.stack([k_z_ord_r, k_z_ext_r], axis=-1)
+        transmitted_fields = tf.stack([ordinary_field(k_z_ord_t), extraordinary_field(k_z_ext_t)], axis=-1)
+        reflected_fields = tf.stack([ordinary_field(k_z_ord_r), extraordinary_field(k_z_ext_r)], axis=-1)
+
+        # Reorder the batch axes as delta_permutations would for the Berreman matrix,
+        # whose stacked layout puts the row index first and the column index last
+        permutation, self.batch_dims = self.mode_permutations[self.mode]
+        batch_permutation = [axis - 1 for axis in permutation[:-2]]
+        waves_permutation = batch_permutation + [self.batch_dims]
+        fields_permutation = batch_permutation + [self.batch_dims, self.batch_dims + 1]
+
+        return (
+            tf.transpose(transmitted_wavevectors, perm=waves_permutation),
+            tf.transpose(reflected_wavevectors, perm=waves_permutation),
+            tf.transpose(transmitted_fields, perm=fields_permutation),
+            tf.transpose(reflected_fields, perm=fields_permutation),
+        )
+
+    def isotropic_transfer_matrix(self):
+        """
+        Transfer matrix of a finite isotropic layer in closed form.
+
+        For scalar eps and mu the Berreman matrix splits into a p block on (Ex, Hy)
+        and an s block on (Ey, Hx), each of the form [[0, b], [c, 0]] with
+        b c = k_z^2 = eps mu - k_x^2. Its exponential is then
+        cos(k_z k_0 d) I - i sin(k_z k_0 d) / k_z * Delta, which needs no eigen
+        decomposition, sorting or inversion and does not depend on the branch of
+        k_z.
+
+        Returns:
+            tf.Tensor: The transfer matrix, shaped as get_matrix would return it.
+        """
+        k_x, eps_tensor, mu_tensor = self.mode_reshaping()
+        eps, mu = eps_tensor[..., 0, 0], mu_tensor[..., 0, 0]
+        k_x = k_x + tf.zeros_like(eps)
+        eps = eps + tf.zeros_like(k_x)
+        mu = mu + tf.zeros_like(k_x)
+        zeros = tf.zeros_like(k_x)
+        return self.block_exponential(
+            (zeros, mu - k_x ** 2 / eps, eps, zeros), (zeros, -mu, k_x ** 2 / mu - eps, zeros)
+        )
+
+    def decoupled_transfer_matrix(self):
+        """
+        Layer matrix of a medium in which p and s waves do not mix.
+
+        When eps and mu have no xy or yz entries the Berreman matrix has a p block
+        on (Ex, Hy) and an s block on (Ey, Hx), and any coupling entries are
+        dropped. A finite layer takes the exponential of each 2x2 block in closed
+        form; a semi-infinite layer takes the forward eigenvector of each block,
+        the s wave in column 0 and the p wave in column 2, as for an isotropic
+        exit medium.
+
+        Returns:
+            tf.Tensor: The layer matrix, shaped as get_matrix would return it.
+        """
+        self.delta_matrix_calc()
+        self.delta_permutations()
+        delta = self.berreman_matrix
+        self.berreman_matrix = None
+        p_block = (delta[..., 0, 0], delta[..., 0, 3], delta[..., 3, 0], delta[..., 3, 3])
+        s_block = (delta[..., 1, 1], delta[..., 1, 2], delta[..., 2, 1], delta[..., 2, 2])
+        if not self.semi_infinite:
+            return self.block_exponential(p_block, s_block)
+
+        def forward_wave(a, b, c, e):
+            """Unit (first, second) eigenvector of [[a, b], [c, e]] of the transmitted root."""
+            mean = 0.5 * (a + e)
+            root = tf.sqrt((0.5 * (a - e)) ** 2 + b * c)
+            k_z_a, k_z_b = mean + root, mean - root
+            # The same forward/backward split as wave_sorting
+            is_complex = tf.math.abs(tf.math.imag(k_z_a)) > 1e-9
+            a_first = tf.where(
+                is_complex,
+                tf.math.imag(k_z_a) >= tf.math.imag(k_z_b),
+                tf.math.real(k_z_a) >= tf.math.real(k_z_b),
+            )
+            k_z = tf.where(a_first, k_z_a, k_z_b)
+            # Either row of [[a - k_z, b], [c, e - k_z]] gives the eigenvector;
+            # take the larger, which only vanishes for a multiple of the identity
+            first = tf.stack([b, k_z - a], axis=-1)
+            second = tf.stack([k_z - e, c], axis=-1)
+            norm_first = tf.norm(first, axis=-1, keepdims=True)
+            norm_second = tf.norm(second, axis=-1, keepdims=True)
+            vector = tf.where(
+                tf.math.real(norm_first) >= tf.math.real(norm_second), first / norm_first, second / norm_second
+            )
+            vector = self.fix_phase(vector)
+            return vector[..., 0], vector[..., 1]
+
+        E_x, H_y = forward_wave(*p_block)
+        E_y, H_x = forward_wave(*s_block)
+        zeros = tf.zeros_like(E_x)
+        return tf.stack(
+            [
+                tf.stack([zeros, zeros, E_x, zeros], axis=-1),
+                tf.stack([E_y, zeros, zeros, zeros], axis=-1),
+                tf.stack([H_x, zeros, zeros, zeros], axis=-1),
+                tf.stack([zeros, zeros, H_y, zeros], axis=-1),
+            ],
+            axis=-2,
+        )
+
+    def block_exponential(self, p_block, s_block):
+        """
+        exp(-i k_0 d Delta) of a Berreman matrix made of a p block on (Ex, Hy) and
+        an s block on (Ey, Hx).
+
+        With A = [[a, b], [c, e]], m = (a + e) / 2 and q^2 = ((a - e) / 2)^2 + b c,
+        exp(-i x A) = exp(-i x m) (cos(q x) I - i sin(q x) / q (A - m I)), which is
+        even in q and so does not depend on the branch of the square root.
+
+        Args:
+            p_block (tuple): The entries (a, b, c, e) of the p block, laid out like
+                the eigenvalue batch axes of the mode.
+            s_block (tuple): The entries of the s block.
+
+        Returns:
+            tf.Tensor: The transfer matrix, shaped as get_matrix would return it.
+        """
+        # Lay the entries out like eigenvalues, with a trailing axis standing in for
+        # the four partial waves, so k_0 and the thickness broadcast as in get_matrix
+        entries = tf.stack(list(p_block) + list(s_block), axis=-1)[..., tf.newaxis, :]
+        k_0, entries, _ = self._get_matrix_calculation_shapes(entries, entries)
+        path = to_complex128(k_0) * to_complex128(self.thickness)
+
+        def exponential(a, b, c, e):
+            mean = 0.5 * (a + e)
+            half_difference = 0.5 * (a - e)
+            root = tf.sqrt(half_difference ** 2 + b * c)
+            phase = tf.exp(-1.0j * mean * path)
+            cosine = phase * tf.cos(root * path)
+            # sin(q x) / q, which tends to x where the two roots meet
+            sine = tf.where(
+                root == 0,
+                path + tf.zeros_like(root),
+                tf.sin(root * path) / tf.where(root == 0, 1.0 + 0.0j, root),
+            )
+            sine = -1.0j * phase * sine
+            return cosine + sine * half_difference, sine * b, sine * c, cosine - sine * half_difference
+
+        p_00, p_01, p_10, p_11 = exponential(*[entries[..., index] for index in range(4)])
+        s_00, s_01, s_10, s_11 = exponential(*[entries[..., index] for index in range(4, 8)])
+        zeros = tf.zeros_like(p_00 + s_00)
+
+        matrix = tf.stack(
+            [
+                tf.stack([p_00 + zeros, zeros, zeros, p_01 + zeros], axis=-1),
+                tf.stack([zeros, s_00 + zeros, s_01 + zeros, zeros], axis=-1),
+                tf.stack([zeros, s_10 + zeros, s_11 + zeros, zeros], axis=-1),
+                tf.stack([p_10 + zeros, zeros, zeros, p_11 + zeros], axis=-1),
+            ],
+            axis=-2,
+        )
+        # Drop the stand-in partial wave axis
+        return matrix[..., 0, :, :]
+
+    def get_modes(self, eigenvalues, eigenvectors):
+        """
+        Get the partial-wave fields and propagation phases of a finite layer.
+
+        Args:
+            eigenvalues (tf.Tensor): The eigenvalues of the Berreman matrix.
+            eigenvectors (tf.Tensor): The eigenvectors of the Berreman matrix.
+
+        Returns:
+            tuple: The eigenvectors and the exponents -i k_z k_0 d, shaped for the mode.
+        """
+        k_0, eigenvalues, eigenvectors = self._get_matrix_calculation_shapes(eigenvalues, eigenvectors)
+        phases = -1.0j * eigenvalues * to_complex128(k_0) * to_complex128(self.thickness)
+        return eigenvectors, phases
+
     def get_matrix(self, eigenvalues, eigenvectors):
         """
         Get the transfer matrix based on the mode.
@@ -395,14 +730,28 @@ class Wave:
         if self.semi_infinite:
             return eigenvectors
 
-        # Get the mode shapes for matrix calculation
-        k_0, eigenvalues_diag, eigenvectors = self._get_matrix_calculation_shapes(eigenvalues, eigenvectors)
-
-        # Calculate the partial matrix
-        partial = tf.linalg.expm(-1.0j * eigenvalues_diag * k_0 * self.thickness)
-
-        # Calculate the transfer matrix
-        transfer_matrix = tf.matmul(eigenvectors, tf.matmul(partial, tf.linalg.inv(eigenvectors)))
+        # Propagation phase of each partial wave; the exponential of the diagonal
+        # matrix is taken elementwise
+        eigenvectors, phases = self.get_modes(eigenvalues, eigenvectors)
+        partial = tf.exp(phases)
+
+        # V diag(partial) V^-1, with V^-1 applied through a QR solve of
+        # V^T X^T = (V diag(partial))^T. The factorization is done before the
+        # eigenvectors are broadcast, so modes that share eigenvectors across
+        # frequencies factorize them only once. QR and triangular solves also
+        # compile under XLA, which has no complex LU kernel
+        orthogonal, upper = tf.linalg.qr(tf.linalg.matrix_transpose(eigenvectors))
+        transfer_matrix = tf.linalg.matrix_transpose(
+            tf.linalg.triangular_solve(
+                upper,
+                tf.linalg.matmul(
+                    orthogonal,
+                    tf.linalg.matrix_transpose(eigenvectors * partial[..., tf.newaxis, :]),
+                    adjoint_a=True,
+                ),
+                lower=False,
+            )
+        )
 
         return transfer_matrix
 
@@ -548,6 +897,24 @@ class Wave:
         Returns:
             dict: The updated wave profile with sorted indices.
         """
+        sorting_indices = self.poynting_sorting_indices(profile)
+
+        for element in profile:
+            profile[element] = tf.gather(profile[element], sorting_indices, axis=-1, batch_dims=self.batch_dims)
+
+        return profile
+
+    def poynting_sorting_indices(self, profile):
+        """
+        Order of a pair of partial waves by their Poynting vector, or by their
+        electric field when the Poynting vector does not separate them.
+
+        Args:
+            profile (dict): At least the Px, Py, Ex and Ey of the pair.
+
+        Returns:
+            tf.Tensor: Indices along the last axis of the profile.
+        """
         poynting_x = tf.math.abs(profile["Px"]) ** 2
         poynting_y = tf.math.abs(profile["Py"]) ** 2
 
@@ -567,50 +934,128 @@ class Wave:
         thresh = 1e-6
         overall_condition = condition_P > thresh
 
-        sorting_indices = tf.where(overall_condition, indices_P, indices_E)
+        return tf.where(overall_condition, indices_P, indices_E)
 
-        for element in profile:
-            profile[element] = tf.gather(profile[element], sorting_indices, axis=-1, batch_dims=self.batch_dims)
+    def sort_transmitted_pair(self, transmitted_waves, transmitted_fields):
+        """
+        Order the transmitted partial waves as the Poynting-sorted profile does,
+        without building the profile.
 
-        return profile
+        The transmission coefficients into a semi-infinite layer refer to its
+        transmitted waves in this order; reflection and the matrices of finite
+        layers do not depend on it. Only Ez and Hz, and the x and y Poynting
+        components, of the transmitted pair are computed.
 
-    def sort_profile_back_to_matrix(self):
-        """Sort the wave profile back to the transfer matrix."""
-        transmitted_new_profile = tf.stack(
-            [self.profile.transmitted_Ex, self.profile.transmitted_Ey, self.profile.transmitted_Hx, self.profile.transmitted_Hy],
-            axis=-2,
+        Args:
+            transmitted_waves (tf.Tensor): The transmitted wavevectors [..., 2].
+            transmitted_fields (tf.Tensor): The transmitted (Ex, Ey, Hx, Hy) columns [..., 4, 2].
+
+        Returns:
+            tuple: The reordered transmitted wavevectors and fields.
+        """
+        k_x, eps_tensor, mu_tensor = self.poynting_reshaping()
+        Ex, Ey = transmitted_fields[..., 0, :], transmitted_fields[..., 1, :]
+        Hx, Hy = transmitted_fields[..., 2, :], transmitted_fields[..., 3, :]
+        # As in get_poynting
+        Ez = (-1.0 / eps_tensor[..., 2, 2]) * (k_x * Hy + eps_tensor[..., 2, 0] * Ex + eps_tensor[..., 2, 1] * Ey)
+        Hz = (1.0 / mu_tensor[..., 2, 2]) * (k_x * Ey - mu_tensor[..., 2, 0] * Hx - mu_tensor[..., 2, 1] * Hy)
+        indices = self.poynting_sorting_indices(
+            {"Px": Ey * Hz - Ez * Hy, "Py": Ez * Hx - Ex * Hz, "Ex": Ex, "Ey": Ey}
+        )
+
+        batch_dims = len(indices.shape) - 1
+        transmitted_waves = tf.gather(
+            tf.broadcast_to(transmitted_waves, tf.shape(indices)), indices, axis=-1, batch_dims=batch_dims
         )
+        field_indices = tf.broadcast_to(indices[..., tf.newaxis, :], tf.shape(transmitted_fields))
+        transmitted_fields = tf.gather(transmitted_fields, field_indices, axis=-1, batch_dims=batch_dims + 1)
+        return transmitted_waves, transmitted_fields
+
+    def assemble_matrix(self, transmitted_waves, reflected_waves, transmitted_fields, reflected_fields):
+        """
+        Build the layer matrix from the transmitted and reflected partial waves.
 
+        Args:
+            transmitted_waves (tf.Tensor): The transmitted wavevectors [..., 2].
+            reflected_waves (tf.Tensor): The reflected wavevectors [..., 2].
+            transmitted_fields (tf.Tensor): The transmitted (Ex, Ey, Hx, Hy) columns [..., 4, 2].
+            reflected_fields (tf.Tensor): The reflected (Ex, Ey, Hx, Hy) columns [..., 4, 2].
+
+        Returns:
+            tf.Tensor: The transfer matrix, or the transmitted-wave matrix of a
+                semi-infinite layer. With the scattering stack solver a finite
+                layer returns None and keeps its modes instead.
+        """
         if self.semi_infinite:
             transfer_matrix = tf.stack(
                 [
-                    transmitted_new_profile[..., 0],
-                    tf.zeros_like(transmitted_new_profile[..., 1]),
-                    transmitted_new_profile[..., 1],
-                    tf.zeros_like(transmitted_new_profile[..., 1]),
+                    transmitted_fields[..., 0],
+                    tf.zeros_like(transmitted_fields[..., 1]),
+                    transmitted_fields[..., 1],
+                    tf.zeros_like(transmitted_fields[..., 1]),
                 ],
                 axis=-1,
             )
             return transfer_matrix
-        else:
-            reflected_new_profile = tf.stack(
-                [self.profile.reflected_Ex, self.profile.reflected_Ey, self.profile.reflected_Hx, self.profile.reflected_Hy],
-                axis=-2,
-            )
 
-            eigenvalues = tf.concat([self.profile.transmitted_k_z, self.profile.reflected_k_z], axis=-1)
-            eigenvectors = tf.concat([transmitted_new_profile, reflected_new_profile], axis=-1)
+        eigenvalues = tf.concat([transmitted_waves, reflected_waves], axis=-1)
+        eigenvectors = tf.concat([transmitted_fields, reflected_fields], axis=-1)
 
-            transfer_matrix = self.get_matrix(eigenvalues, eigenvectors)
+        if self.stack_solver == "scattering":
+            self.modes = self.get_modes(eigenvalues, eigenvectors)
+            return None
 
-            return transfer_matrix
+        return self.get_matrix(eigenvalues, eigenvectors)
 
-    def execute(self):
-        """Execute the wave calculations."""
-        self.delta_matrix_calc()
-        self.delta_permutations()
+    def sort_profile_back_to_matrix(self):
+        """Sort the wave profile back to the transfer matrix."""
+        transmitted_new_profile = tf.stack(
+            [self.profile.transmitted_Ex, self.profile.transmitted_Ey, self.profile.transmitted_Hx, self.profile.transmitted_Hy],
+            axis=-2,
+        )
+        reflected_new_profile = tf.stack(
+            [self.profile.reflected_Ex, self.profile.reflected_Ey, self.profile.reflected_Hx, self.profile.reflected_Hy],
+            axis=-2,
+        )
+
+        return self.assemble_matrix(
+            self.profile.transmitted_k_z,
+            self.profile.reflected_k_z,
+            transmitted_new_profile,
+            reflected_new_profile,
+        )
+
+    def execute(self, with_profile=True):
+        """
+        Execute the wave calculations.
+
+        Args:
+            with_profile (bool): Build the Poynting-sorted field profile. Without
+                it the full profile is not computed: the transmitted pair of a
+                semi-infinite layer is ordered by sort_transmitted_pair, and the
+                other pairs keep their eigenvalue order, on which neither the
+                reflection nor the transmission coefficients depend.
+
+        Returns:
+            tuple: The WaveProfile (None without with_profile) and the layer matrix.
+        """
+        if self.eigen_solver == "analytic":
+            transmitted_waves, reflected_waves, transmitted_fields, reflected_fields = self.analytic_wave_sorting()
+        else:
+            self.delta_matrix_calc()
+            self.delta_permutations()
+            transmitted_waves, reflected_waves, transmitted_fields, reflected_fields = self.wave_sorting()
+
+        if not with_profile:
+            self.berreman_matrix = None
+            if self.semi_infinite:
+                transmitted_waves, transmitted_fields = self.sort_transmitted_pair(
+                    transmitted_waves, transmitted_fields
+                )
+            return None, self.assemble_matrix(
+                transmitted_waves, reflected_waves, transmitted_fields, reflected_fields
+            )
 
-        transmitted_waves, reflected_waves, transmitted_fields, reflected_fields = self.wave_sorting()
         transmitted_wave_profile, reflected_wave_profile = self.get_poynting(
             transmitted_waves, reflected_waves, transmitted_fields, reflected_fields
         )
@@ -626,4 +1071,4 @@ class Wave:
 
         matrix = self.sort_profile_back_to_matrix()
 
-        return self.profile, matrix
\ No newline at end of file
+        return self.profile, matrix
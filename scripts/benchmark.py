@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Time Structure.execute on the reference payloads.
+
+Run from the repository root:
+
+    python scripts/benchmark.py --repeat 5 Incident Dispersion
+
+With --compiled the first call of each scenario, which traces the graph, is
+reported separately from the timed runs. With --workers the --repeat copies of
+each payload are spread over a PayloadRunner pool instead, and its throughput
+is reported:
+
+    python scripts/benchmark.py --workers 4 --repeat 64 Incident
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from payloads import mock_simple_payload, updating_payload
+from hyperbolic_optics.runner import PayloadRunner
+from hyperbolic_optics.structure import Structure
+
+
+def thick_crystal_payload():
+    """Incident sweep through a 10 um Quartz film on a Quartz substrate."""
+    return json.dumps({
+        "ScenarioData": {"type": "Incident"},
+        "Layers": [
+            {"type": "Ambient Incident Layer", "permittivity": 12.5},
+            {"type": "Isotropic Middle-Stack Layer", "thickness": 0.5},
+            {"type": "Crystal Layer", "material": "Quartz", "rotationX": 0, "rotationY": 70,
+             "rotationZ": 30.0, "thickness": 10.0},
+            {"type": "Semi Infinite Anisotropic Layer", "material": "Quartz", "rotationX": 0,
+             "rotationY": 90, "rotationZ": 0},
+        ],
+    })
+
+
+BENCHMARK_PAYLOADS = {
+    "Incident": lambda: updating_payload("Incident", "Calcite", 5.5, 0.5, 90.0, 0.0, None, None),
+    "Azimuthal": lambda: updating_payload("Azimuthal", "Calcite", 5.5, 0.5, 90.0, 0.0, 40.0, None),
+    "Dispersion": lambda: updating_payload("Dispersion", "Calcite", 50.0, 0.5, 90.0, 0.0, None, 1460.0),
+    "ThickCrystal": thick_crystal_payload,
+    "Simple": mock_simple_payload,
+}
+
+
+def time_payload(payload, repeat, **structure_options):
+    """Return the wall-clock time of each Structure.execute call on the payload."""
+    timings = []
+    for _ in range(repeat):
+        structure = Structure(**structure_options)
+        start = time.perf_counter()
+        structure.execute(json.loads(payload))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_pool(payload, repeat, workers, threads_per_worker, **structure_options):
+    """Execute repeat copies of the payload on a worker pool and return its statistics."""
+    with PayloadRunner(workers, threads_per_worker, **structure_options) as runner:
+        # Warm up every worker, so the timed run does not include TensorFlow start-up
+        runner.map([payload] * runner.workers)
+        for _ in runner.imap([payload] * repeat, ordered=False):
+            pass
+        return runner.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", default=["Incident", "Dispersion"],
+                        help=f"any of {', '.join(sorted(BENCHMARK_PAYLOADS))}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--eigen-solver", default="eig", choices=["eig", "analytic"])
+    parser.add_argument("--compiled", action="store_true", help="run execute as a cached graph")
+    parser.add_argument("--jit-compile", action="store_true", help="compile the graph with XLA")
+    parser.add_argument("--lazy-profiles", action="store_true",
+                        help="skip the Poynting sort and field profiles")
+    parser.add_argument("--stack-solver", default="transfer", choices=["transfer", "scattering"])
+    parser.add_argument("--workers", type=int, help="run the repeats on a pool of worker processes")
+    parser.add_argument("--threads-per-worker", type=int, help="thread pool size of each worker")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(BENCHMARK_PAYLOADS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    structure_options = {
+        "eigen_solver": args.eigen_solver,
+        "compiled": args.compiled or args.jit_compile,
+        "jit_compile": args.jit_compile,
+        "lazy_profiles": args.lazy_profiles,
+        "stack_solver": args.stack_solver,
+    }
+    if args.workers:
+        for scenario in args.scenarios:
+            stats = run_pool(BENCHMARK_PAYLOADS[scenario](), args.repeat, args.workers,
+                             args.threads_per_worker, **structure_options)
+            print(f"{scenario:<12} {stats.report()}")
+        return
+
+    # Warm up TensorFlow so the first timing does not include kernel loading
+    time_payload(BENCHMARK_PAYLOADS["Dispersion"](), 1)
+
+    for scenario in args.scenarios:
+        payload = BENCHMARK_PAYLOADS[scenario]()
+        if structure_options["compiled"]:
+            (trace_time,) = time_payload(payload, 1, **structure_options)
+            print(f"{scenario:<12} trace  {trace_time:.3f}s")
+        timings = time_payload(payload, args.repeat, **structure_options)
+        print(
+            f"{scenario:<12} median {statistics.median(timings):.3f}s  "
+            f"min {min(timings):.3f}s  ({args.repeat} runs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
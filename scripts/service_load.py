@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Load the local simulation service with concurrent Simple requests.
+
+Run from the repository root:
+
+    python scripts/service_load.py --clients 32 --requests 20
+
+Starts a SimulationService behind an HTTP server on a free localhost port,
+sends requests from several client threads, checks a sample of the responses
+against Structure.execute, and prints the service statistics. Rejected
+requests (503) are counted and retried after their Retry-After delay.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from payloads import mock_simple_payload
+from hyperbolic_optics.backend import execute
+from hyperbolic_optics.service import SimulationService, make_server
+
+ATOL = 1e-9
+
+
+def simple_payload(rng):
+    """The mock Simple payload at a random incident angle, azimuth and frequency."""
+    payload = json.loads(mock_simple_payload())
+    payload["ScenarioData"].update(
+        incidentAngle=rng.uniform(5.0, 85.0), azimuthal_angle=rng.uniform(0.0, 360.0),
+        frequency=rng.uniform(420.0, 520.0),
+    )
+    return payload
+
+
+def post(url, payload):
+    """POST a payload until it is accepted; return the decoded response and the number of 503s."""
+    data = json.dumps(payload).encode()
+    rejected = 0
+    while True:
+        request = urllib.request.Request(url, data, {"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read()), rejected
+        except urllib.error.HTTPError as error:
+            if error.code != 503:
+                raise
+            rejected += 1
+            time.sleep(float(error.headers.get("Retry-After", 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--batch-window", type=float, default=5.0, help="milliseconds")
+    parser.add_argument("--check", type=int, default=5, help="responses to compare with Structure.execute")
+    args = parser.parse_args()
+
+    service = SimulationService(args.workers, max_pending=args.max_pending, batch_window=args.batch_window / 1e3)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Wait for the workers to finish their warm-up
+    post(f"{url}/execute", simple_payload(random.Random(0)))
+
+    responses = []
+    rejected = []
+
+    def client(seed):
+        rng = random.Random(seed)
+        for _ in range(args.requests):
+            payload = simple_payload(rng)
+            response, retries = post(f"{url}/execute", payload)
+            responses.append((payload, response))
+            rejected.append(retries)
+
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(seed,)) for seed in range(1, args.clients + 1)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    worst = 0.0
+    for payload, response in responses[:args.check]:
+        expected = execute(payload, service.runner.backend)
+        for name, value in response.items():
+            actual = complex(value["real"], value["imag"])
+            worst = max(worst, abs(actual - complex(np.asarray(getattr(expected, name)))))
+
+    with urllib.request.urlopen(f"{url}/stats") as response:
+        stats = json.loads(response.read())
+    server.shutdown()
+    service.close()
+
+    print(f"{len(responses)} requests in {elapsed:.2f}s, {len(responses) / elapsed:.1f} requests/s, "
+          f"{sum(rejected)} rejected and retried")
+    print(f"max |dr| against Structure.execute on {min(args.check, len(responses))} responses: {worst:.1e}")
+    print(json.dumps(stats, indent=2))
+    if worst > ATOL:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Layers, payloads and comparisons shared by the test modules.
+
+The layer dicts are plain module constants rather than fixtures, so that test
+modules can build their parametrized payloads from them at collection time:
+
+    from conftest import AIR_GAP, PRISM, QUARTZ, assert_coefficients_close
+"""
+
+import copy
+
+import numpy as np
+
+from hyperbolic_optics.backend import create_structure
+
+REFLECTION = ("r_pp", "r_ss", "r_ps", "r_sp")
+TRANSMISSION = ("t_pp", "t_ss", "t_ps", "t_sp")
+
+PRISM = {"type": "Ambient Incident Layer", "permittivity": 12.5}
+HIGH_INDEX_PRISM = {"type": "Ambient Incident Layer", "permittivity": 50.0}
+DIELECTRIC_PRISM = {"type": "Ambient Incident Layer", "permittivity": 22.5}
+AIR_GAP = {"type": "Isotropic Middle-Stack Layer", "thickness": 0.5}
+QUARTZ_FILM = {"type": "Crystal Layer", "material": "Quartz", "rotationX": 10, "rotationY": 70,
+               "rotationZ": 30.0, "thickness": 1.0}
+CALCITE_FILM = {"type": "Crystal Layer", "material": "Calcite", "rotationX": 0, "rotationY": 70,
+                "rotationZ": 30.0, "thickness": 1.0}
+QUARTZ = {"type": "Semi Infinite Anisotropic Layer", "material": "Quartz", "rotationX": 0,
+          "rotationY": 60, "rotationZ": 20}
+CALCITE = {"type": "Semi Infinite Anisotropic Layer", "material": "Calcite", "rotationX": 0,
+           "rotationY": 60, "rotationZ": 20}
+GALLIUM_OXIDE = {"type": "Semi Infinite Anisotropic Layer", "material": "GalliumOxide", "rotationX": 10,
+                 "rotationY": 60, "rotationZ": 20}
+ISOTROPIC_EXIT = {"type": "Semi Infinite Isotropic Layer", "permittivity": 2.0}
+# Arbitrary diagonal permittivity, hyperbolic in y and z
+DIELECTRIC = {"type": "Semi Infinite Anisotropic Layer", "rotationY": 30, "material": {
+    "eps_xx": {"real": 2.2652, "imag": 0.00065},
+    "eps_yy": {"real": -4.8, "imag": 0.75},
+    "eps_zz": {"real": -4.8, "imag": 0.75},
+}}
+
+# Frequency bands, in cm^-1, around resonances where the eigenvector matrix of a
+# crystal is ill-conditioned and equivalent calculations round differently
+QUARTZ_RESONANCE = (515.0, 517.0)
+CALCITE_RESONANCE = (1533.0, 1539.0)
+
+# Scattered points of the Points scenario
+POINTS = {"type": "Points", "incidentAngle": [10.0, 35.0, 60.0, 80.0], "azimuthal_angle": [0.0, 45.0, 135.0, 270.0],
+          "frequency": [430.0, 460.0, 490.0, 1460.0]}
+
+
+def payload(scenario_data, layer_data, sweep=None):
+    """A payload of the given scenario data and layers, with an optional Sweep."""
+    payload = {"ScenarioData": scenario_data, "Layers": layer_data}
+    if sweep is not None:
+        payload["Sweep"] = sweep
+    return copy.deepcopy(payload)
+
+
+def run(payload, backend=None, memory_budget=None, transmission=False, **options):
+    """Execute a copy of a payload and return the structure."""
+    structure = create_structure(backend, **options)
+    if memory_budget is None:
+        structure.execute(copy.deepcopy(payload))
+    else:
+        structure.execute(copy.deepcopy(payload), memory_budget)
+    if transmission:
+        structure.calculate_transmissivity()
+    return structure
+
+
+def band_tolerance(structure, band, band_atol, atol):
+    """
+    Per-point tolerance of a grid that runs along frequency first: band_atol in
+    the (min, max) frequency band and atol elsewhere.
+    """
+    frequency = np.asarray(structure.frequency)
+    in_band = (frequency >= band[0]) & (frequency <= band[1])
+    return np.where(in_band[:, np.newaxis], band_atol, atol)
+
+
+def assert_coefficients_close(reference, candidate, coefficients, atol):
+    """
+    Assert that each coefficient of two structures is finite at the same points
+    and agrees to atol at every point where it is finite.
+
+    Args:
+        reference: The structure holding the expected coefficients.
+        candidate: The structure holding the actual coefficients.
+        coefficients (tuple): Names of the coefficients, e.g. REFLECTION.
+        atol (float or np.ndarray): Absolute tolerance; an array broadcasting
+            against the coefficients gives each point its own.
+    """
+    for name in coefficients:
+        expected = np.asarray(getattr(reference, name))
+        actual = np.asarray(getattr(candidate, name))
+        assert actual.shape == expected.shape, f"{name}: shape {actual.shape} != {expected.shape}"
+        finite = np.isfinite(expected)
+        mismatched = np.count_nonzero(np.isfinite(actual) != finite)
+        assert not mismatched, f"{name}: {mismatched} points are finite in only one run"
+        difference = np.where(finite, np.abs(actual - expected), 0.0)
+        beyond = difference > atol
+        assert not beyond.any(), (
+            f"{name}: {np.count_nonzero(beyond)} of {beyond.size} points differ by more than the "
+            f"tolerance, up to {np.max(difference):.1e}"
+        )
@@ -0,0 +1,96 @@
+"""
+The 2x2 path of stacks that do not mix p and s against the 4x4 path.
+
+Each payload is executed twice: as is, where every layer is detected as
+decoupled and built from its 2x2 blocks, and with detection turned off, so that
+every crystal layer goes through the 4x4 eigen-decomposition. r_pp and r_ss,
+and t_pp and t_ss for an isotropic exit, must agree to ATOL at every grid
+point, and r_ps and r_sp must be zero on the 2x2 path. Transmission into a
+crystal is left out: near normal incidence its two transmitted waves can be
+degenerate, and any pair spanning them is a valid basis.
+"""
+
+import numpy as np
+import pytest
+
+from conftest import (
+    AIR_GAP,
+    DIELECTRIC,
+    DIELECTRIC_PRISM,
+    HIGH_INDEX_PRISM,
+    ISOTROPIC_EXIT,
+    POINTS,
+    PRISM,
+    assert_coefficients_close,
+    payload,
+    run,
+)
+from hyperbolic_optics import layers
+
+ATOL = 1e-6
+
+LOSSY_GAP = {"type": "Isotropic Middle-Stack Layer", "thickness": 0.3,
+             "permittivity": {"real": 2.1, "imag": 0.3}, "permeability": 1.3}
+# Optic axis along z, so p and s stay apart at every azimuth
+QUARTZ_FILM_Z = {"type": "Crystal Layer", "material": "Quartz", "rotationX": 0, "rotationY": 0,
+                 "rotationZ": 0, "thickness": 1.0}
+CALCITE_Z = {"type": "Semi Infinite Anisotropic Layer", "material": "Calcite", "rotationX": 0,
+             "rotationY": 0, "rotationZ": 0}
+# Optic axis in the plane of incidence
+QUARTZ_FILM_XZ = {"type": "Crystal Layer", "material": "Quartz", "rotationX": 0, "rotationY": 70,
+                  "rotationZ": 0, "thickness": 1.0}
+QUARTZ_XZ = {"type": "Semi Infinite Anisotropic Layer", "material": "Quartz", "rotationX": 0,
+             "rotationY": 40, "rotationZ": 0}
+# Optic axis along y, normal to the plane of incidence
+SAPPHIRE_Y = {"type": "Semi Infinite Anisotropic Layer", "material": "Sapphire", "rotationX": 90,
+              "rotationY": 0, "rotationZ": 0}
+
+INCIDENT_XZ = ({"type": "Incident"}, [PRISM, AIR_GAP, QUARTZ_FILM_XZ, QUARTZ_XZ])
+AZIMUTHAL_Z = ({"type": "Azimuthal", "incidentAngle": 40}, [PRISM, AIR_GAP, QUARTZ_FILM_Z, CALCITE_Z])
+
+PAYLOADS = {
+    "Incident-isotropic": payload(
+        {"type": "Incident", "frequency": {"min": 400, "max": 1600, "points": 300}},
+        [PRISM, AIR_GAP, LOSSY_GAP, ISOTROPIC_EXIT],
+    ),
+    "Incident-xz": payload(*INCIDENT_XZ),
+    "Incident-xz-sweep": payload(*INCIDENT_XZ, {"layer": 2, "field": "thickness", "values": [0.2, 1.0, 3.0]}),
+    "Incident-y": payload({"type": "Incident"}, [PRISM, AIR_GAP, QUARTZ_FILM_XZ, SAPPHIRE_Y]),
+    "Azimuthal-z": payload(*AZIMUTHAL_Z),
+    "Azimuthal-z-sweep": payload(*AZIMUTHAL_Z, {"layer": 1, "field": "permittivity", "values": [1.0, 3.0]}),
+    "Dispersion-z": payload({"type": "Dispersion", "frequency": 1460}, [HIGH_INDEX_PRISM, AIR_GAP, CALCITE_Z]),
+    "Points-z": payload(POINTS, [PRISM, AIR_GAP, QUARTZ_FILM_Z, ISOTROPIC_EXIT]),
+    "Volume-z": payload(
+        {"type": "Volume", "incidentAngle": {"points": 6}, "azimuthal_angle": {"points": 12},
+         "frequency": {"points": 40}},
+        [PRISM, AIR_GAP, QUARTZ_FILM_Z, CALCITE_Z],
+    ),
+    "Simple-xz": payload(
+        {"type": "Simple", "incidentAngle": 45.0, "azimuthal_angle": 0.0, "frequency": 460},
+        [HIGH_INDEX_PRISM, AIR_GAP, QUARTZ_FILM_XZ, QUARTZ_XZ],
+    ),
+    "Simple-dielectric": payload(
+        {"type": "Simple", "incidentAngle": 45.0, "azimuthal_angle": 0.0, "frequency": 1460.0},
+        [DIELECTRIC_PRISM, DIELECTRIC],
+    ),
+}
+
+# The 4x4 transfer product loses precision through a 3 um film, so that sweep is
+# compared with the scattering-matrix solver, which also keeps the 4x4 path
+REFERENCE_OPTIONS = {"Incident-xz-sweep": {"stack_solver": "scattering"}}
+
+
+@pytest.mark.parametrize("name", list(PAYLOADS))
+def test_decoupled_stack_matches_4x4(name, monkeypatch):
+    candidate = run(PAYLOADS[name], transmission=True)
+    with monkeypatch.context() as patch:
+        patch.setattr(layers, "DECOUPLING_TOLERANCE", -1.0)
+        reference = run(PAYLOADS[name], transmission=True, **REFERENCE_OPTIONS.get(name, {}))
+
+    assert candidate.decoupled
+    for coefficient in ("r_ps", "r_sp"):
+        assert not np.any(np.asarray(getattr(candidate, coefficient))), f"non-zero {coefficient}"
+    coefficients = ("r_pp", "r_ss")
+    if PAYLOADS[name]["Layers"][-1]["type"] == "Semi Infinite Isotropic Layer":
+        coefficients += ("t_pp", "t_ss")
+    assert_coefficients_close(reference, candidate, coefficients, ATOL)
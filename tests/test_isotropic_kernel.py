@@ -0,0 +1,113 @@
+"""
+The closed-form isotropic layer kernel against the eigen-decomposition path.
+
+For every payload, the matrix of each isotropic middle-stack layer must agree
+with the matrix built from tf.linalg.eig and the Poynting sort to RTOL of its
+largest entry at every grid point. Stacks run with the scattering stack solver
+must give the reflection coefficients of the transfer-matrix run to ATOL.
+"""
+
+import numpy as np
+import pytest
+
+from conftest import (
+    AIR_GAP,
+    ISOTROPIC_EXIT,
+    PRISM,
+    QUARTZ,
+    QUARTZ_FILM,
+    REFLECTION,
+    assert_coefficients_close,
+    payload,
+    run,
+)
+from hyperbolic_optics.layers import AirGapLayer
+from hyperbolic_optics.waves import Wave
+
+RTOL = 1e-12
+ATOL = 1e-6
+
+LOSSY_MAGNETIC_GAP = {"type": "Isotropic Middle-Stack Layer", "thickness": 0.8,
+                      "permittivity": {"real": 2.1, "imag": 0.3}, "permeability": 1.3}
+NEGATIVE_GAP = {"type": "Isotropic Middle-Stack Layer", "thickness": 0.2,
+                "permittivity": {"real": -3.0, "imag": 0.2}}
+
+GAPS = [PRISM, AIR_GAP, LOSSY_MAGNETIC_GAP, NEGATIVE_GAP, QUARTZ]
+
+# Points up to near-grazing incidence
+POINTS = {"type": "Points", "incidentAngle": [10.0, 35.0, 60.0, 89.0], "azimuthal_angle": [0.0, 45.0, 135.0, 270.0],
+          "frequency": [430.0, 460.0, 490.0, 1460.0]}
+
+PAYLOADS = {
+    "Incident": payload({"type": "Incident", "incidentAngle": {"points": 61}, "frequency": {"points": 41}}, GAPS),
+    "Azimuthal": payload(
+        {"type": "Azimuthal", "incidentAngle": 40, "azimuthal_angle": {"points": 36}, "frequency": {"points": 41}}, GAPS
+    ),
+    "Dispersion": payload(
+        {"type": "Dispersion", "frequency": 460, "incidentAngle": {"points": 31}, "azimuthal_angle": {"points": 36}},
+        GAPS,
+    ),
+    "Simple": payload({"type": "Simple", "incidentAngle": 45.0, "azimuthal_angle": 90.0, "frequency": 460.0}, GAPS),
+    "Points": payload(POINTS, GAPS),
+    "Volume": payload(
+        {"type": "Volume", "incidentAngle": {"points": 6}, "azimuthal_angle": {"points": 12},
+         "frequency": {"points": 20}},
+        GAPS,
+    ),
+    "Sweep-thickness": payload(
+        {"type": "Incident", "incidentAngle": {"points": 31}, "frequency": {"points": 21}}, GAPS,
+        {"layer": 2, "field": "thickness", "values": [0.0, 0.1, 1.0, 3.0]},
+    ),
+    "Sweep-permittivity": payload(
+        {"type": "Incident", "incidentAngle": {"points": 31}, "frequency": {"points": 21}}, GAPS,
+        {"layer": 1, "field": "permittivity", "values": [1.0, 2.5, 6.0]},
+    ),
+    "Sweep-permeability": payload(
+        {"type": "Dispersion", "frequency": 460, "incidentAngle": {"points": 21}, "azimuthal_angle": {"points": 12}},
+        GAPS,
+        {"layer": 2, "field": "permeability", "values": [0.5, 1.0, 2.0]},
+    ),
+    "Joint-sweep": payload(
+        {"type": "Simple", "incidentAngle": 45.0, "azimuthal_angle": 90.0, "frequency": 460.0}, GAPS,
+        [{"layer": 1, "field": "thickness", "values": [0.1, 0.5]},
+         {"layer": 3, "field": "thickness", "values": [0.1, 0.2, 0.4]}],
+    ),
+}
+
+SCATTERING_PAYLOADS = {
+    "Incident": payload(
+        {"type": "Incident", "incidentAngle": {"points": 61}, "frequency": {"points": 41}},
+        [PRISM, AIR_GAP, LOSSY_MAGNETIC_GAP, QUARTZ_FILM, ISOTROPIC_EXIT],
+    ),
+    "Points": payload(POINTS, [PRISM, AIR_GAP, NEGATIVE_GAP, QUARTZ]),
+}
+
+
+def eig_matrix(layer):
+    """The matrix of an isotropic layer built through tf.linalg.eig, as before the closed form."""
+    wave = Wave(layer.kx, layer.eps_tensor, layer.mu_tensor, layer.mode, k_0=layer.k0, thickness=layer.thickness)
+    _, matrix = wave.execute()
+    if layer.grid_shape is not None:
+        matrix = np.reshape(matrix, layer.grid_shape + [4, 4])
+    return np.asarray(matrix)
+
+
+@pytest.mark.parametrize("name", list(PAYLOADS))
+def test_isotropic_matrices_match_eig(name):
+    structure = run(PAYLOADS[name])
+    for index, layer in enumerate(structure.layers):
+        if not isinstance(layer, AirGapLayer):
+            continue
+        expected = eig_matrix(layer)
+        actual = np.asarray(layer.matrix)
+        assert actual.shape == expected.shape, f"layer {index}: shape {actual.shape} != {expected.shape}"
+        scale = np.max(np.abs(expected), axis=(-2, -1))
+        error = np.max(np.max(np.abs(actual - expected), axis=(-2, -1)) / scale)
+        assert error <= RTOL, f"layer {index}: relative error {error:.1e}"
+
+
+@pytest.mark.parametrize("name", list(SCATTERING_PAYLOADS))
+def test_scattering_matches_transfer(name):
+    reference = run(SCATTERING_PAYLOADS[name])
+    candidate = run(SCATTERING_PAYLOADS[name], stack_solver="scattering")
+    assert_coefficients_close(reference, candidate, REFLECTION, ATOL)
@@ -0,0 +1,110 @@
+"""
+Transmission and reflection of lean, compiled and chunked runs against eager runs.
+
+Each payload is executed eagerly with full profiles, which is the reference,
+and then in lean mode (lazy_profiles=True), as a compiled graph and in chunks
+of a small memory budget. Lean, compiled and chunked runs skip the Poynting
+profiles, so they must still order and phase the transmitted partial waves of
+the exit layer as the reference does. All eight r_* and t_* must agree to ATOL
+at every grid point, except at the Quartz resonance of the Incident payload,
+where compiled runs round differently by up to 2e-6.
+"""
+
+import functools
+
+import pytest
+
+from conftest import (
+    AIR_GAP,
+    CALCITE,
+    GALLIUM_OXIDE,
+    HIGH_INDEX_PRISM,
+    ISOTROPIC_EXIT,
+    POINTS,
+    PRISM,
+    QUARTZ,
+    QUARTZ_FILM,
+    QUARTZ_RESONANCE,
+    REFLECTION,
+    TRANSMISSION,
+    assert_coefficients_close,
+    band_tolerance,
+    payload,
+    run,
+)
+
+ATOL = 1e-6
+# Small enough to split the angle grids into several chunks; a Simple payload is
+# a single point and never chunked
+MEMORY_BUDGET = 1e7
+
+# Optic axis in the plane of incidence: in Incident runs the exit layer is built
+# from its 2x2 blocks when eager, and through the 4x4 path when compiled
+QUARTZ_XZ = {"type": "Semi Infinite Anisotropic Layer", "material": "Quartz", "rotationX": 0,
+             "rotationY": 70, "rotationZ": 0}
+# Decoupled at an azimuth of 0 only, so chunks of one point mix 2x2 and 4x4 layers
+QUARTZ_Y = {"type": "Semi Infinite Anisotropic Layer", "material": "Quartz", "rotationX": 0,
+            "rotationY": 90, "rotationZ": 0}
+
+PAYLOADS = {
+    "Incident": payload({"type": "Incident", "frequency": {"points": 80}}, [PRISM, AIR_GAP, QUARTZ_FILM, QUARTZ_XZ]),
+    "Incident-exit": payload(
+        {"type": "Incident", "frequency": {"points": 80}}, [PRISM, AIR_GAP, QUARTZ_FILM, ISOTROPIC_EXIT]
+    ),
+    "Azimuthal": payload(
+        {"type": "Azimuthal", "incidentAngle": 40, "frequency": {"points": 80}}, [PRISM, AIR_GAP, QUARTZ_FILM, CALCITE]
+    ),
+    "Dispersion": payload(
+        {"type": "Dispersion", "frequency": 500, "incidentAngle": {"points": 45}},
+        [HIGH_INDEX_PRISM, AIR_GAP, GALLIUM_OXIDE],
+    ),
+    "Points": payload(POINTS, [PRISM, AIR_GAP, QUARTZ_FILM, QUARTZ]),
+    "Points-mixed": payload(
+        {"type": "Points", "incidentAngle": [40.0, 40.0, 40.0], "azimuthal_angle": [45.0, 30.0, 0.0],
+         "frequency": [460.0, 460.0, 460.0]},
+        [PRISM, AIR_GAP, QUARTZ_Y],
+    ),
+    "Volume": payload(
+        {"type": "Volume", "incidentAngle": {"points": 6}, "azimuthal_angle": {"points": 12},
+         "frequency": {"points": 40}},
+        [PRISM, AIR_GAP, QUARTZ_FILM, QUARTZ],
+    ),
+    "Simple": payload(
+        {"type": "Simple", "incidentAngle": 45.0, "azimuthal_angle": 20.0, "frequency": 460},
+        [HIGH_INDEX_PRISM, AIR_GAP, QUARTZ_FILM, QUARTZ],
+    ),
+}
+
+# Frequency band and its tolerance, of payloads whose grid runs along frequency first
+RESONANCES = {"Incident": (QUARTZ_RESONANCE, 1e-5)}
+
+# Payloads chunked one point per chunk
+CHUNK_BUDGETS = {"Points": 1, "Points-mixed": 1}
+
+# Options and memory budget of each run, and the stack solver of its reference
+RUNS = {
+    "lean": ({"lazy_profiles": True}, None, "transfer"),
+    "compiled": ({"compiled": True}, None, "transfer"),
+    "chunked": ({}, MEMORY_BUDGET, "transfer"),
+    "scattering-lean": ({"lazy_profiles": True, "stack_solver": "scattering"}, None, "scattering"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def reference(name, stack_solver):
+    """The eager run of a payload with full profiles, shared by the runs compared with it."""
+    return run(PAYLOADS[name], transmission=True, stack_solver=stack_solver)
+
+
+@pytest.mark.parametrize("label", list(RUNS))
+@pytest.mark.parametrize("name", list(PAYLOADS))
+def test_run_matches_eager(name, label):
+    options, memory_budget, stack_solver = RUNS[label]
+    if memory_budget is not None:
+        memory_budget = CHUNK_BUDGETS.get(name, memory_budget)
+    candidate = run(PAYLOADS[name], memory_budget=memory_budget, transmission=True, **options)
+    expected = reference(name, stack_solver)
+    atol = ATOL
+    if name in RESONANCES:
+        atol = band_tolerance(expected, *RESONANCES[name], ATOL)
+    assert_coefficients_close(expected, candidate, REFLECTION + TRANSMISSION, atol)